@@ -22,11 +22,14 @@
 
 import logging
 
+import numpy as np
+
 ####################################################################################################
 
-from .FinancialPeriod import AccountBalance
+from .FinancialPeriod import AccountBalance, AccountChartBalance
 from FinancialSimulator.Tools.Currency import format_currency
-from FinancialSimulator.Tools.DateIndexer import DateIndexer
+from FinancialSimulator.Tools.GrowableArray import GrowableArray
+from FinancialSimulator.Units import Money
 
 ####################################################################################################
 
@@ -36,19 +39,20 @@ _module_logger = logging.getLogger(__name__)
 
 class AccountBalanceSnapshot:
 
+    __slots__ = ('_imputation', '_account', '_debit', '_credit')
+
     ##############################################
 
-    def __init__(self, imputation, account):
+    def __init__(self, imputation, account, debit=None, credit=None):
 
         # imputation holds account/analytic_account
 
-        # Fixme: pass debit, credit ???
-        # debit or inner_debit
+        # debit or inner_debit, by default the current inner debit and credit of the account
 
         self._imputation = imputation
         self._account = account
-        self._debit = account.inner_debit
-        self._credit = account.inner_credit
+        self._debit = account.inner_debit if debit is None else debit
+        self._credit = account.inner_credit if credit is None else credit
 
     ##############################################
 
@@ -123,8 +127,8 @@ class AccountBalanceSnapshot:
         d = {
             'journal': self.journal_label,
             'sequence_number': self.sequence_number,
-            'debit': self._debit,
-            'credit': self._credit,
+            'debit': float(self._debit),
+            'credit': float(self._credit),
             'date': str(self.date),
         }
         if with_account:
@@ -134,7 +138,7 @@ class AccountBalanceSnapshot:
 
 ####################################################################################################
 
-class AccountBalanceHistory(DateIndexer):
+class AccountBalanceHistory:
 
     # purpose
     #  - cache balance for each imputation
@@ -146,11 +150,33 @@ class AccountBalanceHistory(DateIndexer):
 
     ##############################################
 
+    # The history stores the imputed amounts as columns: the sorted date ordinals and the
+    # cumulative inner debit/credit in minor units, thus the balance as of a date is found by
+    # binary search.  Imputations are usually saved in date order and are then appended, else they
+    # are queued and merged at the next query.  The snapshots are built on demand from the columns.
+    # A forced balance is stored as a reset point, a row without imputation whose cumulative
+    # amounts are the forced ones.
+
+    __initial_capacity__ = 16
+
+    ##############################################
+
     def __init__(self, account):
 
-        super(). __init__()
         self._account = account
 
+        self._imputations = []
+        self._imputation_ordinals = GrowableArray(np.int64, self.__initial_capacity__)
+        self._cumulative_debits = GrowableArray(np.int64, self.__initial_capacity__)
+        self._cumulative_credits = GrowableArray(np.int64, self.__initial_capacity__)
+        self._resets = GrowableArray(np.bool_, self.__initial_capacity__)
+        self._number_of_resets = 0
+        self._last_ordinal = None
+        self._last_debit = 0
+        self._last_credit = 0
+        # out of order (ordinal, debit, credit, imputation)
+        self._unsorted = []
+
     ##############################################
 
     @property
@@ -159,10 +185,196 @@ class AccountBalanceHistory(DateIndexer):
 
     ##############################################
 
+    def __len__(self):
+
+        """Return the number of imputations"""
+
+        return len(self._imputations) + len(self._unsorted) - self._number_of_resets
+
+    ##############################################
+
     def save(self, imputation):
 
-        snapshot = AccountBalanceSnapshot(imputation, self._account)
-        self.append(snapshot)
+        amount = imputation.amount.minor_units
+        if imputation.is_debit():
+            debit, credit = amount, 0
+        else:
+            debit, credit = 0, amount
+        self._save(imputation.date.toordinal(), debit, credit, imputation)
+
+    ##############################################
+
+    def save_forced_balance(self, debit, credit, date=None):
+
+        """Save a reset point of the inner debit and credit, in minor units, at the end of *date*,
+        by default after the last saved imputation.
+
+        """
+
+        if date is not None:
+            ordinal = date.toordinal()
+        elif self._last_ordinal is not None:
+            ordinal = self._last_ordinal
+        else:
+            ordinal = 0
+        self._number_of_resets += 1
+        self._save(ordinal, debit, credit, None)
+
+    ##############################################
+
+    def _save(self, ordinal, debit, credit, imputation):
+
+        # *debit* and *credit* are deltas, or the forced amounts if *imputation* is None
+        if self._unsorted or (self._last_ordinal is not None and ordinal < self._last_ordinal):
+            self._unsorted.append((ordinal, debit, credit, imputation))
+        else:
+            self._imputations.append(imputation)
+            self._last_ordinal = ordinal
+            if imputation is None:
+                self._last_debit = debit
+                self._last_credit = credit
+            else:
+                self._last_debit += debit
+                self._last_credit += credit
+            self._imputation_ordinals.append(ordinal)
+            self._cumulative_debits.append(self._last_debit)
+            self._cumulative_credits.append(self._last_credit)
+            self._resets.append(imputation is None)
+
+    ##############################################
+
+    @staticmethod
+    def _cumulate(values, resets):
+
+        """Return the cumulative sum of *values*, a value is a delta or the cumulative amount at a
+        reset point.
+
+        """
+
+        cumulative = np.cumsum(np.where(resets, 0, values))
+        # forward fill the offset of the last reset point
+        last_resets = np.maximum.accumulate(np.where(resets, np.arange(len(values)), -1))
+        offsets = np.where(last_resets >= 0, (values - cumulative)[last_resets], 0)
+        return cumulative + offsets
+
+    ##############################################
+
+    def _merge_unsorted(self):
+
+        ordinals = self._imputation_ordinals.array
+        cumulative_debits = self._cumulative_debits.array
+        cumulative_credits = self._cumulative_credits.array
+        resets = self._resets.array
+        unsorted_ordinals, unsorted_debits, unsorted_credits, unsorted_imputations = zip(*self._unsorted)
+        self._unsorted = []
+
+        # the deltas of the imputations and the amounts of the reset points
+        ordinals = np.concatenate((ordinals, unsorted_ordinals))
+        debits = np.concatenate((np.where(resets, cumulative_debits, np.diff(cumulative_debits, prepend=0)),
+                                 np.array(unsorted_debits, dtype=np.int64)))
+        credits = np.concatenate((np.where(resets, cumulative_credits, np.diff(cumulative_credits, prepend=0)),
+                                  np.array(unsorted_credits, dtype=np.int64)))
+        resets = np.concatenate((resets, [imputation is None for imputation in unsorted_imputations]))
+        order = np.argsort(ordinals, kind='stable')
+
+        imputations = self._imputations + list(unsorted_imputations)
+        self._imputations = [imputations[i] for i in order]
+
+        resets = resets[order]
+        for array, values in (
+                (self._imputation_ordinals, ordinals[order]),
+                (self._cumulative_debits, self._cumulate(debits[order], resets)),
+                (self._cumulative_credits, self._cumulate(credits[order], resets)),
+                (self._resets, resets),
+        ):
+            array.clear()
+            array.extend(values)
+        self._last_ordinal = int(ordinals[order[-1]])
+        self._last_debit = int(self._cumulative_debits[-1])
+        self._last_credit = int(self._cumulative_credits[-1])
+
+    ##############################################
+
+    def _cumulative_at(self, ordinal):
+
+        """Return the cumulative inner debit and credit in minor units up to *ordinal* included."""
+
+        if self._unsorted:
+            self._merge_unsorted()
+        index = int(np.searchsorted(self._imputation_ordinals.array, ordinal, side='right'))
+        if index:
+            return int(self._cumulative_debits[index -1]), int(self._cumulative_credits[index -1])
+        else:
+            return 0, 0
+
+    ##############################################
+
+    def minor_units_at(self, date):
+
+        """Return the cumulative inner debit and credit in minor units at the end of *date*."""
+
+        return self._cumulative_at(date.toordinal())
+
+    ##############################################
+
+    def _to_money(self, minor_units):
+        return Money(minor_units, self._account.devise)
+
+    ##############################################
+
+    def snapshots(self, start=None, stop=None):
+
+        """Iterate in date order over the balance snapshots of the imputations from *start* to *stop*
+        included.
+
+        """
+
+        if self._unsorted:
+            self._merge_unsorted()
+        ordinals = self._imputation_ordinals.array
+        lower = 0 if start is None else int(np.searchsorted(ordinals, start.toordinal(), side='left'))
+        upper = len(ordinals) if stop is None else int(np.searchsorted(ordinals, stop.toordinal(), side='right'))
+        for i in range(lower, upper):
+            if self._imputations[i] is None:
+                # reset point
+                continue
+            yield AccountBalanceSnapshot(self._imputations[i], self._account,
+                                         self._to_money(int(self._cumulative_debits[i])),
+                                         self._to_money(int(self._cumulative_credits[i])))
+
+    ##############################################
+
+    def __iter__(self):
+        return self.snapshots()
+
+    ##############################################
+
+    def debit_credit_at(self, date):
+
+        """Return the inner debit and credit at the end of *date*, only imputations are accounted."""
+
+        debit, credit = self._cumulative_at(date.toordinal())
+        return self._to_money(debit), self._to_money(credit)
+
+    ##############################################
+
+    def balance_at(self, date):
+
+        debit, credit = self._cumulative_at(date.toordinal())
+        return self._to_money(credit - debit)
+
+    ##############################################
+
+    def balance_between(self, start, stop):
+
+        """Return the balance of the imputations from *start* to *stop* included, the forced balances
+        in between are accounted.
+
+        """
+
+        debit1, credit1 = self._cumulative_at(start.toordinal() -1)
+        debit2, credit2 = self._cumulative_at(stop.toordinal())
+        return self._to_money((credit2 - credit1) - (debit2 - debit1))
 
 ####################################################################################################
 
@@ -185,3 +397,44 @@ class AccountBalanceWithHistory(AccountBalance):
             # Lazy creation
             self._history = AccountBalanceHistory(self)
         return self._history
+
+    ##############################################
+
+    def has_history(self):
+        return self._history is not None
+
+    ##############################################
+
+    def force_balance(self, debit=0, credit=0, date=None):
+
+        """Force the inner debit and credit and save a reset point in the history at the end of
+        *date*, by default after the last saved imputation.
+
+        """
+
+        super().force_balance(debit, credit)
+        self.history.save_forced_balance(self._inner_debit, self._inner_credit, date)
+
+####################################################################################################
+
+class AccountChartBalanceWithHistory(AccountChartBalance):
+
+    __account_balance_factory__ = AccountBalanceWithHistory
+
+    ##############################################
+
+    def balances_at(self, date):
+
+        """Return the :class:`AccountChartBalances` at the end of *date* computed from the histories,
+        i.e. without replaying the journals.
+
+        """
+
+        flat_hierarchy = self.flatten()
+        inner_debits = np.zeros(len(flat_hierarchy), dtype=np.int64)
+        inner_credits = np.zeros(len(flat_hierarchy), dtype=np.int64)
+        for i, account in enumerate(flat_hierarchy):
+            if account.has_history():
+                inner_debits[i], inner_credits[i] = account.history.minor_units_at(date)
+
+        return self.__account_chart_balances_factory__(self, inner_debits, inner_credits)
@@ -21,10 +21,11 @@
 ####################################################################################################
 
 import logging
+from bisect import bisect_left
 
 ####################################################################################################
 
-from FinancialSimulator.Tools.Hierarchy import Node, Hierarchy
+from FinancialSimulator.Tools.Hierarchy import Node, Hierarchy, NonExistingNodeError
 
 ####################################################################################################
 
@@ -129,3 +130,59 @@ class AccountChart(Hierarchy):
     def name(self):
 
         return self._name
+
+    ##############################################
+
+    def _invalidate_indexes(self):
+
+        super()._invalidate_indexes()
+        self._sorted_numbers = None
+
+    ##############################################
+
+    def numbers_in_range(self, inf, sup):
+
+        """Return the sorted numbers of the accounts in the interval [inf, sup]."""
+
+        return self.hashes_in_range(inf, sup)
+
+    ##############################################
+
+    def accounts_in_range(self, inf, sup):
+
+        return self.nodes_in_range(inf, sup)
+
+    ##############################################
+
+    def accounts_with_prefix(self, prefix):
+
+        """Return the accounts whose number starts with *prefix*, e.g. 60 matches 60, 601, 6011."""
+
+        if self._sorted_numbers is None:
+            self._sorted_numbers = sorted(str(number) for number in self._nodes)
+        numbers = self._sorted_numbers
+        prefix = str(prefix)
+
+        accounts = []
+        for i in range(bisect_left(numbers, prefix), len(numbers)):
+            number = numbers[i]
+            if not number.startswith(prefix):
+                break
+            accounts.append(self._nodes[int(number)])
+        return accounts
+
+    ##############################################
+
+    def nearest_account(self, number):
+
+        """Return the account *number* if it exists, else its nearest existing ancestor according to
+        the prefix numbering of the chart, e.g. 6011 for 601100.
+
+        """
+
+        number = str(number)
+        for i in range(len(number), 0, -1):
+            account = self._nodes.get(int(number[:i]), None)
+            if account is not None:
+                return account
+        raise NonExistingNodeError(number)
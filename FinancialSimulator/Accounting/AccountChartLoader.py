@@ -20,6 +20,9 @@
 
 ####################################################################################################
 
+import hashlib
+import json
+import logging
 import os
 import yaml
 
@@ -30,10 +33,18 @@ import FinancialSimulator.Config.ConfigInstall as ConfigInstall
 
 ####################################################################################################
 
-def load_account_chart(yaml_path):
+_module_logger = logging.getLogger(__name__)
 
-    with open(yaml_path, 'r') as f:
-        data = yaml.load(f.read())
+####################################################################################################
+
+def _parse_account_chart(yaml_text):
+
+    """Parse a YAML account chart and return its name and the list of account definitions
+    ``(number, description, comment, system, parent_number)`` in depth first search order.
+
+    """
+
+    data = yaml.load(yaml_text)
 
     metadata = data['metadata']
     account_chart = AccountChart(name=metadata['name'])
@@ -62,16 +73,159 @@ def load_account_chart(yaml_path):
     for account in account_chart:
         account.sort_siblings()
 
+    definitions = [(account.number, account.description, account.comment, account.system,
+                    account.parent.number if account.parent is not None else None)
+                   for account in account_chart]
+
+    return account_chart.name, definitions
+
+####################################################################################################
+
+def _build_account_chart(name, definitions):
+
+    # Definitions are in depth first search order, thus siblings are already sorted
+    account_chart = AccountChart(name=name)
+    for number, description, comment, system, parent_number in definitions:
+        if parent_number is not None:
+            parent = account_chart[parent_number]
+        else:
+            parent = None
+        account_chart.add_node(Account(number, description, parent=parent, comment=comment, system=system))
+
     return account_chart
 
 ####################################################################################################
 
+class AccountChartCache:
+
+    """This class implements a compiled cache for account charts.
+
+    A chart is compiled to a JSON file of its account definitions, stored in the cache directory and
+    keyed by the path of the YAML source.  The compiled file records the content hash of the source
+    and is only used if it matches, it is plain data thus reading a tampered file cannot execute
+    code.  The definitions are also kept in memory, and each load builds a new chart from them.
+
+    """
+
+    _logger = _module_logger.getChild('AccountChartCache')
+
+    __version__ = 2
+
+    ##############################################
+
+    def __init__(self, cache_directory=None):
+
+        if cache_directory is None:
+            cache_directory = ConfigInstall.Path.cache_directory
+        self._cache_directory = cache_directory
+        # (path, content hash) -> (name, definitions)
+        self._compiled_charts = {}
+
+    ##############################################
+
+    @property
+    def cache_directory(self):
+        return self._cache_directory
+
+    ##############################################
+
+    def clear(self):
+
+        self._compiled_charts.clear()
+
+    ##############################################
+
+    def _cache_path(self, yaml_path):
+
+        path_hash = hashlib.sha1(yaml_path.encode('utf-8')).hexdigest()
+        return os.path.join(self._cache_directory, 'account-chart-{}.json'.format(path_hash))
+
+    ##############################################
+
+    def _read_compiled(self, cache_path, content_hash):
+
+        try:
+            with open(cache_path, 'r') as f:
+                compiled = json.load(f)
+            if compiled['version'] != self.__version__ or compiled['source_hash'] != content_hash:
+                return None
+            return compiled['name'], [tuple(definition) for definition in compiled['definitions']]
+        except FileNotFoundError:
+            return None
+        except Exception as exception:
+            self._logger.warning("Cannot read {}: {}".format(cache_path, exception))
+            return None
+
+    ##############################################
+
+    def _write_compiled(self, cache_path, content_hash, name, definitions):
+
+        try:
+            os.makedirs(self._cache_directory, exist_ok=True)
+            tmp_path = cache_path + '.{}.tmp'.format(os.getpid())
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': self.__version__,
+                           'source_hash': content_hash,
+                           'name': name,
+                           'definitions': definitions}, f)
+            os.replace(tmp_path, cache_path)
+        except OSError as exception:
+            self._logger.warning("Cannot write {}: {}".format(cache_path, exception))
+
+    ##############################################
+
+    def load(self, yaml_path):
+
+        """Return a new account chart built from the compiled definitions of *yaml_path*."""
+
+        yaml_path = os.path.abspath(yaml_path)
+        with open(yaml_path, 'rb') as f:
+            content = f.read()
+        content_hash = hashlib.sha256(content).hexdigest()
+
+        key = (yaml_path, content_hash)
+        compiled = self._compiled_charts.get(key, None)
+        if compiled is None:
+            cache_path = self._cache_path(yaml_path)
+            compiled = self._read_compiled(cache_path, content_hash)
+            if compiled is None:
+                self._logger.info("Compile {}".format(yaml_path))
+                compiled = _parse_account_chart(content.decode('utf-8'))
+                self._write_compiled(cache_path, content_hash, *compiled)
+            self._compiled_charts[key] = compiled
+
+        # the callers modify the balances, thus the chart is not shared
+        return _build_account_chart(*compiled)
+
+####################################################################################################
+
+account_chart_cache = AccountChartCache()
+
+####################################################################################################
+
+def load_account_chart(yaml_path, use_cache=True):
+
+    """Load an account chart from a YAML file.
+
+    When *use_cache* is set, the chart is built from the compiled cache, else the YAML file is
+    parsed.  A new chart is returned in both cases.
+
+    """
+
+    if use_cache:
+        return account_chart_cache.load(yaml_path)
+    else:
+        with open(yaml_path, 'r') as f:
+            return _build_account_chart(*_parse_account_chart(f.read()))
+
+####################################################################################################
+
 _account_charts = {
     'fr': 'plan-comptable-francais.yml',
 }
 
-def load_account_chart_for_country(country_code):
+def load_account_chart_for_country(country_code, use_cache=True):
 
     yaml_path = os.path.join(ConfigInstall.Path.accounting_data_directory,
                              country_code, _account_charts[country_code])
-    return load_account_chart(yaml_path)
+    return load_account_chart(yaml_path, use_cache)
@@ -0,0 +1,312 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+"""This module implements a binary journal file format which can be memory mapped.
+
+The file is made of a header, a table of fixed-width entry records, a table of fixed-width
+imputation records and a string table for the descriptions and the reconciliation ids, the latter
+are stored as JSON so as to keep their type, e.g. an integer id.  All the
+integers are little-endian and the sections are aligned on 8 bytes.  The tables are read through
+NumPy views on a read-only memory map, thus several processes share the pages of the same file
+and nothing is deserialised when the file is opened.
+
+Dates are date ordinals, datetimes are microseconds since the epoch and amounts are signed minor
+units, debits are positive, as in :class:`FinancialSimulator.Accounting.JournalColumnar.ImputationStore`.
+A missing value is stored as -1.
+
+The document of the entries is not stored.
+
+"""
+
+####################################################################################################
+
+import datetime
+import json
+import logging
+import mmap
+import os
+import struct
+
+import numpy as np
+
+####################################################################################################
+
+from FinancialSimulator.Accounting.JournalColumnar import ImputationStore
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+MAGIC = b'FSJ\0'
+VERSION = 2
+
+HEADER = struct.Struct('<4sIQQQQ') # magic, version, entries, imputations, strings, string bytes
+
+ENTRY_DTYPE = np.dtype([
+    ('sequence_number', '<i8'),
+    ('first_imputation', '<i8'),
+    ('description', '<i8'), # string index
+    ('reconciliation_id', '<i8'), # string index
+    ('validation_date', '<i8'),
+    ('reconciliation_date', '<i8'),
+    ('date', '<i4'),
+    ('padding', '<i4'),
+])
+
+IMPUTATION_DTYPE = np.dtype([
+    ('entry_index', '<i8'),
+    ('account', '<i8'),
+    ('analytic_account', '<i8'),
+    ('amount', '<i8'),
+    ('date', '<i4'),
+    ('is_debit', 'u1'),
+    ('padding', 'u1', (3,)),
+])
+
+NONE = -1
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+####################################################################################################
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+def _section_offsets(number_of_entries, number_of_imputations, number_of_strings):
+
+    entries = _align(HEADER.size)
+    imputations = _align(entries + number_of_entries * ENTRY_DTYPE.itemsize)
+    string_offsets = _align(imputations + number_of_imputations * IMPUTATION_DTYPE.itemsize)
+    strings = string_offsets + (number_of_strings + 1) * 8
+    return entries, imputations, string_offsets, strings
+
+def _datetime_to_int(value):
+    if value is None:
+        return NONE
+    return (value - _EPOCH) // _MICROSECOND
+
+def _int_to_datetime(value):
+    if value == NONE:
+        return None
+    return _EPOCH + int(value) * _MICROSECOND
+
+####################################################################################################
+
+def write_journal(journal, path):
+
+    """Write a journal to a binary file and return the number of entries.
+
+    A :class:`FinancialSimulator.Accounting.JournalColumnar.JournalColumnar` is written from its
+    store, the other journals are first decomposed in an :class:`ImputationStore`.
+
+    """
+
+    store = getattr(journal, 'store', None)
+    if store is None:
+        store = ImputationStore()
+        for journal_entry in journal:
+            store.append(journal_entry)
+
+    number_of_entries = store.number_of_entries
+    number_of_imputations = store.number_of_imputations
+
+    strings = []
+    def string_index(value, encoder=str):
+        if value is None:
+            return NONE
+        strings.append(encoder(value).encode('utf-8'))
+        return len(strings) -1
+
+    entries = np.zeros(number_of_entries, dtype=ENTRY_DTYPE)
+    entries['sequence_number'] = store.sequence_numbers
+    entries['first_imputation'] = store.first_imputations
+    entries['date'] = store.entry_dates
+    entries['description'] = [string_index(store.description(i)) for i in range(number_of_entries)]
+    entries['reconciliation_id'] = [string_index(store.reconciliation_id(i), json.dumps)
+                                    for i in range(number_of_entries)]
+    entries['validation_date'] = [_datetime_to_int(store.validation_date(i))
+                                  for i in range(number_of_entries)]
+    entries['reconciliation_date'] = [_datetime_to_int(store.reconciliation_date(i))
+                                      for i in range(number_of_entries)]
+
+    imputations = np.zeros(number_of_imputations, dtype=IMPUTATION_DTYPE)
+    imputations['entry_index'] = store.entry_indexes
+    imputations['account'] = store.accounts
+    imputations['analytic_account'] = store.analytic_accounts
+    imputations['amount'] = store.amounts
+    imputations['date'] = store.dates
+    imputations['is_debit'] = store.is_debits
+
+    string_offsets = np.zeros(len(strings) +1, dtype='<i8')
+    string_offsets[1:] = np.cumsum([len(string) for string in strings])
+    string_table = b''.join(strings)
+
+    offsets = _section_offsets(number_of_entries, number_of_imputations, len(strings))
+    sections = (entries.tobytes(), imputations.tobytes(), string_offsets.tobytes(), string_table)
+
+    # Write a temporary file and rename it, a reader never sees a partial file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, number_of_entries, number_of_imputations,
+                            len(strings), len(string_table)))
+        for offset, data in zip(offsets, sections):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    return number_of_entries
+
+####################################################################################################
+
+class MappedColumn:
+
+    """This class implements the read-only column API of
+    :class:`FinancialSimulator.Tools.GrowableArray.GrowableArray` on top of an array.
+
+    """
+
+    __slots__ = ('_array', '_converter')
+
+    ##############################################
+
+    def __init__(self, array, converter=None):
+
+        self._array = array
+        self._converter = converter
+
+    ##############################################
+
+    @property
+    def array(self):
+        return self._array
+
+    ##############################################
+
+    def __len__(self):
+        return self._array.shape[0]
+
+    ##############################################
+
+    def __getitem__(self, index):
+
+        value = self._array[index]
+        if self._converter is not None:
+            return self._converter(value)
+        else:
+            return value
+
+####################################################################################################
+
+class MappedImputationStore(ImputationStore):
+
+    """This class implements a read-only :class:`ImputationStore` on top of a memory mapped binary
+    journal file.
+
+    """
+
+    ##############################################
+
+    def __init__(self, path):
+
+        self._path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError("{} is not a journal file".format(path))
+            # the map stays valid when the file is closed
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, number_of_entries, number_of_imputations, number_of_strings, string_table_size = \
+            HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} is not a journal file version {}".format(path, VERSION))
+        entries_offset, imputations_offset, string_offsets_offset, strings_offset = \
+            _section_offsets(number_of_entries, number_of_imputations, number_of_strings)
+
+        buffer = self._mmap
+        entries = np.frombuffer(buffer, ENTRY_DTYPE, number_of_entries, entries_offset)
+        imputations = np.frombuffer(buffer, IMPUTATION_DTYPE, number_of_imputations, imputations_offset)
+        self._string_offsets = np.frombuffer(buffer, '<i8', number_of_strings +1, string_offsets_offset)
+        self._strings_offset = strings_offset
+
+        # Entry columns
+        self._sequence_numbers = MappedColumn(entries['sequence_number'])
+        self._entry_dates = MappedColumn(entries['date'])
+        self._first_imputations = MappedColumn(entries['first_imputation'])
+        self._descriptions = MappedColumn(entries['description'], self._string)
+        self._documents = MappedColumn(entries['description'], lambda value: None)
+        self._validation_dates = MappedColumn(entries['validation_date'], _int_to_datetime)
+        self._reconciliation_ids = MappedColumn(entries['reconciliation_id'], self._json)
+        self._reconciliation_dates = MappedColumn(entries['reconciliation_date'], _int_to_datetime)
+
+        # Imputation columns
+        self._entry_indexes = MappedColumn(imputations['entry_index'])
+        self._accounts = MappedColumn(imputations['account'])
+        self._analytic_accounts = MappedColumn(imputations['analytic_account'])
+        self._amounts = MappedColumn(imputations['amount'])
+        self._is_debits = MappedColumn(imputations['is_debit'].view(np.bool_))
+        self._dates = MappedColumn(imputations['date'])
+
+    ##############################################
+
+    @property
+    def path(self):
+        return self._path
+
+    ##############################################
+
+    def _string(self, index):
+
+        if index == NONE:
+            return None
+        start = self._strings_offset + int(self._string_offsets[index])
+        stop = self._strings_offset + int(self._string_offsets[index +1])
+        return self._mmap[start:stop].decode('utf-8')
+
+    ##############################################
+
+    def _json(self, index):
+
+        string = self._string(index)
+        return json.loads(string) if string is not None else None
+
+    ##############################################
+
+    def append(self, journal_entry):
+
+        raise NotImplementedError("A mapped journal is read-only")
+
+    ##############################################
+
+    def set_validation_date(self, entry_index, validation_date):
+
+        raise NotImplementedError("A mapped journal is read-only")
+
+    ##############################################
+
+    def set_reconciliation(self, entry_index, reconciliation_id, reconciliation_date):
+
+        raise NotImplementedError("A mapped journal is read-only")
@@ -20,38 +20,179 @@
 
 ####################################################################################################
 
+"""This module implements a store of a financial period in JSON files.
+
+The balances of the accounts are saved in a checksummed snapshot along with the last sequence number
+of each journal at the time of the snapshot, its high-water mark.  The journal entries are saved
+apart in a JSON Lines file, thus the snapshot is read without parsing the history.  At load, the
+balances are restored from the snapshot and only the entries numbered after it are applied.
+
+"""
+
+####################################################################################################
+
+import hashlib
 import json
+import logging
+import os
+
+from .JsonLines import read_json_lines, write_json_lines
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
 
 ####################################################################################################
 
 class AccountingStore:
 
+    _logger = _module_logger.getChild('AccountingStore')
+
+    ##############################################
+
+    @staticmethod
+    def _checksum(data):
+
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+    ##############################################
+
+    @staticmethod
+    def journal_path(path):
+
+        """Return the path of the JSON Lines file of the journal entries"""
+
+        return os.path.splitext(path)[0] + '.journals.jsonl'
+
     ##############################################
 
     @staticmethod
-    def save(financial_period, path):
+    def _high_water_mark(journal):
+
+        allocator = getattr(journal, 'sequence_allocator', None)
+        if allocator is not None:
+            return allocator.high_water_mark
+        else:
+            return max((journal_entry.sequence_number for journal_entry in journal), default=0)
+
+    ##############################################
 
+    @classmethod
+    def balance_snapshot(cls, financial_period):
+
+        """Return a checksummed snapshot of the balances"""
+
+        analytic_account_chart = financial_period.analytic_account_chart
         data = {
-            'journals': financial_period.journals.to_json(),
+            'high_water_marks': {journal.label: cls._high_water_mark(journal)
+                                 for journal in financial_period.journals},
             'accounts': financial_period.account_chart.to_json(),
-            'analytic_accounts': financial_period.analytic_account_chart.to_json(),
+            'analytic_accounts': analytic_account_chart.to_json() if analytic_account_chart is not None else [],
         }
+        return {'checksum': cls._checksum(data), 'data': data}
+
+    ##############################################
+
+    @classmethod
+    def save_balance_snapshot(cls, financial_period, path):
+
+        """Save only a balance snapshot, e.g. for journals persisted by a write-ahead log"""
 
         with open(path, 'w') as f:
-            json.dump(data, f, indent=2)
+            json.dump(cls.balance_snapshot(financial_period), f)
 
     ##############################################
 
-    @staticmethod
-    def load(financial_period, path):
+    @classmethod
+    def restore_balances(cls, financial_period, snapshot):
+
+        """Restore the balances from a snapshot and apply the journal entries numbered after it.
+
+        Return False if the snapshot is missing or corrupted, the balances are then left untouched.
+
+        """
+
+        if snapshot is None:
+            return False
+        data = snapshot['data']
+        if cls._checksum(data) != snapshot['checksum']:
+            cls._logger.warning("Balance snapshot checksum mismatch")
+            return False
+
+        financial_period.account_chart.force_balance_from_json(data['accounts'])
+        if financial_period.analytic_account_chart is not None:
+            financial_period.analytic_account_chart.force_balance_from_json(data['analytic_accounts'])
+
+        high_water_marks = data['high_water_marks']
+        for journal in financial_period.journals:
+            high_water_mark = high_water_marks.get(journal.label, 0)
+            for journal_entry in journal:
+                if journal_entry.sequence_number > high_water_mark:
+                    journal_entry.apply()
+
+        return True
+
+    ##############################################
+
+    @classmethod
+    def load_balance_snapshot(cls, financial_period, path):
 
         with open(path) as f:
-            data = json.load(f)
+            snapshot = json.load(f)
+        return cls.restore_balances(financial_period, snapshot)
 
-        financial_period.journals.load_json(data['journals'])
+    ##############################################
+
+    @classmethod
+    def save(cls, financial_period, path):
 
+        """Save the balance snapshot to *path* and the journal entries to :meth:`journal_path`"""
+
+        sequence_numbers = {}
         for journal in financial_period.journals:
-            journal.run()
+            allocator = getattr(journal, 'sequence_allocator', None)
+            if allocator is not None:
+                # give back the unused numbers so as to restart without gap
+                allocator.release()
+                sequence_numbers[journal.label] = allocator.high_water_mark
+
+        write_json_lines(cls.journal_path(path),
+                         (journal_entry_json
+                          for journal in financial_period.journals
+                          for journal_entry_json in journal.iter_json()))
+
+        data = {
+            'sequence_numbers': sequence_numbers,
+            'balance_snapshot': cls.balance_snapshot(financial_period),
+        }
+
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    ##############################################
+
+    @classmethod
+    def load(cls, financial_period, path, journals=True):
+
+        """Load a financial period saved by :meth:`save`.
+
+        If *journals* is not set, only the balances and the sequence numbers are restored and the
+        journal entries are not read.
+
+        """
+
+        with open(path) as f:
+            data = json.load(f)
+
+        if journals:
+            journal_jsons = {}
+            for journal_entry_json in read_json_lines(cls.journal_path(path)):
+                journal_jsons.setdefault(journal_entry_json['journal'], []).append(journal_entry_json)
+            financial_period.journals.load_json(journal_jsons)
+        for label, high_water_mark in data.get('sequence_numbers', {}).items():
+            financial_period.journals[label].sequence_allocator.advance_to(high_water_mark)
 
-        # financial_period.account_chart.force_balance_from_json(data['accounts'])
-        # financial_period.analytic_account_chart.force_balance_from_json(data['analytic_accounts'])
+        if not cls.restore_balances(financial_period, data.get('balance_snapshot')):
+            # replay all the journals
+            for journal in financial_period.journals:
+                journal.run()
@@ -0,0 +1,115 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+"""This module implements a store of the journals in the JSON Lines format.
+
+Each line is a journal entry, see :meth:`FinancialSimulator.Accounting.Journal.JournalEntry.to_json`.
+The file is written and read incrementally, thus the memory used by the store doesn't depend on
+the number of entries.
+
+"""
+
+####################################################################################################
+
+import json
+import logging
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+def write_json_lines(path, records):
+
+    """Write an iterable of JSON records, one per line, and return the number of records"""
+
+    encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(encoder.encode(record))
+            f.write('\n')
+            count += 1
+    return count
+
+####################################################################################################
+
+def read_json_lines(path):
+
+    """Iterate over the JSON records of a file, blank lines are skipped"""
+
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield decoder.decode(line)
+
+####################################################################################################
+
+class AccountingStore:
+
+    _logger = _module_logger.getChild('AccountingStore')
+
+    ##############################################
+
+    @staticmethod
+    def iter_json(financial_period):
+
+        for journal in financial_period.journals:
+            yield from journal.iter_json()
+
+    ##############################################
+
+    @classmethod
+    def save(cls, financial_period, path):
+
+        """Save the journal entries and return their number"""
+
+        return write_json_lines(path, cls.iter_json(financial_period))
+
+    ##############################################
+
+    @staticmethod
+    def load(financial_period, path, run=True):
+
+        """Load the journal entries and return their number, the journals are run if *run* is set."""
+
+        journals = financial_period.journals
+        high_water_marks = {}
+        count = 0
+        for data in read_json_lines(path):
+            label = data['journal']
+            journal_entry = journals[label].load_json_entry(data)
+            sequence_number = journal_entry.sequence_number
+            if sequence_number > high_water_marks.get(label, 0):
+                high_water_marks[label] = sequence_number
+            count += 1
+
+        for label, high_water_mark in high_water_marks.items():
+            journals[label].sequence_allocator.advance_to(high_water_mark)
+
+        if run:
+            for journal in journals:
+                journal.run()
+
+        return count
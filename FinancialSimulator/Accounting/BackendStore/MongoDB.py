@@ -94,8 +94,16 @@ class AccountingStore:
 
     def write_journal_entry(self, journal_entry):
 
-        collection = self.collection_for_journal_entry(journal_entry)
-        key, document = self.key_document_for_journal_entry(journal_entry)
+        self.write_journal_entry_json(journal_entry.to_json())
+
+    ##############################################
+
+    def write_journal_entry_json(self, document):
+
+        """Write a journal entry serialised by :meth:`JournalEntry.to_json`"""
+
+        collection = self._db.journals[document['journal']]
+        key = {'sequence_number': document['sequence_number']}
         if not collection.find_one(key):
             result = collection.insert_one(document)
             # insert_many
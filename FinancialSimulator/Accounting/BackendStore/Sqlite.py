@@ -0,0 +1,88 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+"""This module implements the SQLite schema of the journals.
+
+The journals of a database share two tables, the journal entries and their imputations, keyed by
+the journal label and the sequence number.  The table *sequence* stores the high-water mark of the
+sequence numbers of each journal.  Dates are date ordinals, amounts are positive minor
+units and the datetimes are ISO strings.
+
+"""
+
+####################################################################################################
+
+import logging
+import sqlite3
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS journal_entry (
+        journal TEXT NOT NULL,
+        sequence_number INTEGER NOT NULL,
+        date INTEGER NOT NULL,
+        description TEXT,
+        validation_date TEXT,
+        reconciliation_id TEXT,
+        reconciliation_date TEXT,
+        PRIMARY KEY (journal, sequence_number)
+    )''',
+    '''CREATE INDEX IF NOT EXISTS journal_entry_date ON journal_entry (journal, date)''',
+    '''CREATE TABLE IF NOT EXISTS imputation (
+        journal TEXT NOT NULL,
+        sequence_number INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        date INTEGER NOT NULL,
+        account INTEGER NOT NULL,
+        analytic_account INTEGER,
+        is_debit INTEGER NOT NULL,
+        amount INTEGER NOT NULL
+    )''',
+    '''CREATE INDEX IF NOT EXISTS imputation_entry ON imputation (journal, sequence_number)''',
+    '''CREATE INDEX IF NOT EXISTS imputation_account ON imputation (journal, account, date)''',
+    '''CREATE INDEX IF NOT EXISTS imputation_analytic_account
+        ON imputation (journal, analytic_account, date)''',
+    '''CREATE TABLE IF NOT EXISTS sequence (
+        journal TEXT NOT NULL PRIMARY KEY,
+        high_water_mark INTEGER NOT NULL
+    )''',
+)
+
+####################################################################################################
+
+def connect(path):
+
+    """Open a journal database and create the tables if needed"""
+
+    _module_logger.info("Open journal database {}".format(path))
+    connection = sqlite3.connect(path)
+    # The write-ahead log journal allows concurrent readers
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    with connection:
+        for statement in SCHEMA:
+            connection.execute(statement)
+    return connection
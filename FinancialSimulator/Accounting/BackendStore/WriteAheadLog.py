@@ -0,0 +1,244 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+"""This module implements an append-only write-ahead log.
+
+A record is a JSON document prefixed by its length and its CRC-32, as two little-endian unsigned
+32-bit integers.  Records are appended to a pending list and written as a group, the file is
+synchronised to the disk when the last synchronisation is older than the fsync interval, and by a
+timer otherwise.  A torn or corrupted record at the end of the log, e.g. after a crash, is discarded
+at replay.
+
+"""
+
+####################################################################################################
+
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+class WriteAheadLog:
+
+    """This class implements an append-only log of JSON records.
+
+    Pending records are written when *group_size* records are pending or when the last commit is
+    older than *fsync_interval* seconds, and at least by :meth:`commit`.  The file is synchronised
+    at each commit if *fsync_interval* is 0, never if it is None.
+
+    A record is durable when :meth:`commit` returns with *sync* set, and else at most
+    *fsync_interval* seconds after it was appended: a timer writes and synchronises the records
+    which are still pending or not synchronised when no other record arrives.
+
+    """
+
+    _logger = _module_logger.getChild('WriteAheadLog')
+
+    HEADER = struct.Struct('<II') # length, crc32
+
+    ##############################################
+
+    def __init__(self, path, group_size=64, fsync_interval=1.):
+
+        self._path = path
+        self._group_size = group_size
+        self._fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._last_commit = self._last_sync = time.monotonic()
+        self._number_of_records = 0
+        self._file = None
+        self._timer = None
+
+    ##############################################
+
+    @property
+    def path(self):
+        return self._path
+
+    ##############################################
+
+    def __len__(self):
+
+        """Return the number of records of the log, including the pending records"""
+
+        return self._number_of_records + len(self._pending)
+
+    ##############################################
+
+    def _open(self):
+
+        if self._file is None:
+            self._file = open(self._path, 'ab')
+        return self._file
+
+    ##############################################
+
+    def replay(self):
+
+        """Return the list of the records of the log, a torn tail is truncated."""
+
+        records = []
+        if not os.path.exists(self._path):
+            return records
+
+        header_size = self.HEADER.size
+        with open(self._path, 'rb') as f:
+            data = f.read()
+        position = 0
+        while position + header_size <= len(data):
+            length, crc = self.HEADER.unpack_from(data, position)
+            start = position + header_size
+            payload = data[start:start + length]
+            if len(payload) != length or zlib.crc32(payload) != crc:
+                break
+            records.append(json.loads(payload.decode('utf-8')))
+            position = start + length
+
+        if position != len(data):
+            self._logger.warning("Truncate the log {} at {} / {} bytes".format(self._path, position, len(data)))
+            with open(self._path, 'r+b') as f:
+                f.truncate(position)
+
+        self._number_of_records = len(records)
+        return records
+
+    ##############################################
+
+    @classmethod
+    def _encode(cls, record):
+
+        payload = json.dumps(record, separators=(',', ':')).encode('utf-8')
+        return cls.HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    ##############################################
+
+    def append(self, record):
+
+        with self._lock:
+            self._pending.append(self._encode(record))
+            if (len(self._pending) >= self._group_size or
+                (self._fsync_interval is not None and
+                 time.monotonic() - self._last_commit >= self._fsync_interval)):
+                self._commit()
+            else:
+                self._schedule_sync()
+
+    ##############################################
+
+    def _schedule_sync(self):
+
+        # Caller must hold the lock
+        if self._timer is None and self._fsync_interval:
+            self._timer = threading.Timer(self._fsync_interval, self._sync_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    ##############################################
+
+    def _sync_on_timer(self):
+
+        with self._lock:
+            self._timer = None
+            if self._pending or (self._file is not None and self._last_sync < self._last_commit):
+                try:
+                    self._commit(sync=True)
+                except OSError:
+                    # the records stay pending, the next commit raises
+                    self._logger.exception("Failed to synchronise the log {}".format(self._path))
+
+    ##############################################
+
+    def extend(self, records):
+
+        """Append records and commit them as a group"""
+
+        with self._lock:
+            self._pending.extend(self._encode(record) for record in records)
+            self._commit()
+
+    ##############################################
+
+    def _commit(self, sync=False):
+
+        # Caller must hold the lock
+        f = self._open()
+        if self._pending:
+            f.write(b''.join(self._pending))
+            self._number_of_records += len(self._pending)
+            self._pending = []
+        f.flush()
+        now = time.monotonic()
+        self._last_commit = now
+        if sync or (self._fsync_interval is not None and now - self._last_sync >= self._fsync_interval):
+            os.fsync(f.fileno())
+            self._last_sync = now
+        else:
+            self._schedule_sync()
+
+    ##############################################
+
+    def commit(self, sync=False):
+
+        """Write the pending records, and synchronise the file if *sync* is set or if it is due."""
+
+        with self._lock:
+            self._commit(sync)
+
+    ##############################################
+
+    def reset(self, records=()):
+
+        """Truncate the log and write *records*"""
+
+        with self._lock:
+            self._pending = []
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            with open(self._path, 'wb') as f:
+                f.write(b''.join(self._encode(record) for record in records))
+                f.flush()
+                os.fsync(f.fileno())
+            self._number_of_records = len(records)
+
+    ##############################################
+
+    def close(self):
+
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._pending or self._file is not None:
+                self._commit(sync=True)
+                self._file.close()
+                self._file = None
@@ -20,7 +20,7 @@
 
 ####################################################################################################
 
-__all__ = ['NegativeAmountError', 'UnbalancedEntryError', 'DuplicatedEntryError']
+__all__ = ['NegativeAmountError', 'UnbalancedEntryError', 'DuplicatedEntryError', 'RejectedBatchError']
 
 ####################################################################################################
 
@@ -33,3 +33,12 @@ class UnbalancedEntryError(NameError):
 
 class DuplicatedEntryError(NameError):
     pass
+
+class RejectedBatchError(ValueError):
+
+    """Raised when an entry of a batch is invalid, the batch is then rejected as a whole."""
+
+    def __init__(self, index, error):
+        super().__init__("Entry #{} of the batch is invalid: {}".format(index, error))
+        self.index = index
+        self.error = error
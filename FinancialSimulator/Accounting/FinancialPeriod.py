@@ -20,14 +20,19 @@
 
 ####################################################################################################
 
+import itertools
 import logging
 
+import numpy as np
+
 ####################################################################################################
 
 from .AccountChart import Account, AccountChart
 from .Journal import Journal
+from .PostingIndex import PostingIndex
 from FinancialSimulator.Tools.Currency import format_currency
 from FinancialSimulator.Tools.Observer import Signal
+from FinancialSimulator.Units import Money, to_money
 
 ####################################################################################################
 
@@ -41,6 +46,15 @@ class AccountBalance(Account):
 
     inner_balance_changed = Signal()
 
+    # When set, each change of the inner debit/credit is pushed up the parent chain, so the
+    # aggregated debit/credit/balance of every account are always up to date and read in O(1).
+    # Else they are computed lazily by walking the children.
+    __incremental_balance__ = True
+
+    # Each change stamps the account and its ancestors with a new version, thus a computation can
+    # check if an aggregated balance changed since a given version.
+    _versions = itertools.count(1)
+
     ##############################################
 
     def __init__(self, account, parent=None):
@@ -56,67 +70,117 @@ class AccountBalance(Account):
                           account.comment,
                           account.system)
 
-        self.reset()
+        self._inner_credit = 0
+        self._inner_debit = 0
+        self._version = next(self._versions)
+
+        if self.__incremental_balance__:
+            self._credit = 0
+            self._debit = 0
+            self._balance = 0
+        else:
+            self._credit = None
+            self._debit = None
+            self._balance = None
 
     ##############################################
 
     def reset(self):
 
+        """Reset the inner balance of this account only, the aggregated amounts of the account and
+        its ancestors are updated.  Use :meth:`AccountChartBalance.reset` to reset a hierarchy.
+
+        """
+
+        if self.__incremental_balance__:
+            self._push_delta(-self._inner_debit, -self._inner_credit)
+        else:
+            self.balance_is_dirty()
         self._inner_credit = 0
         self._inner_debit = 0
-        self._inner_balance = None
-
-        self._credit = None
-        self._debit = None
-        self._balance = None
 
     ##############################################
 
     def add_sibling(self, sibling):
 
-        self.balance_is_dirty()
         super().add_sibling(sibling)
+        if self.__incremental_balance__:
+            self._push_delta(sibling._debit, sibling._credit)
+        else:
+            self.balance_is_dirty()
+
+    ##############################################
+
+    @property
+    def version(self):
+        return self._version
 
     ##############################################
 
     def balance_is_dirty(self):
 
-        self._balance = None
+        version = next(self._versions)
+        account = self
+        while account is not None:
+            account._balance = None
+            account._version = version
+            account = account._parent
 
     ##############################################
 
     def inner_balance_is_dirty(self):
 
-        self._inner_balance = None
-        self._balance = None
-        self.inner_balance_changed.send(sender=self)
+        if not self.__incremental_balance__:
+            self.balance_is_dirty()
+        self.inner_balance_changed.emit(self)
 
     ##############################################
 
-    def _compute_balance(self):
+    def _push_delta(self, debit, credit):
+
+        """Add a debit/credit delta to the aggregated amounts of this account and its ancestors."""
+
+        version = next(self._versions)
+        account = self
+        while account is not None:
+            account._debit += debit
+            account._credit += credit
+            account._balance = account._credit - account._debit
+            account._version = version
+            account = account._parent
 
-        if self._inner_balance is None:
-            self._inner_balance = self._inner_credit - self._inner_debit
+    ##############################################
+
+    # Amounts are accumulated as integer minor units, see :class:`FinancialSimulator.Units.Money`
+
+    def _compute_balance(self):
 
         if self._balance is None:
             self._credit = self._inner_credit
             self._debit = self._inner_debit
             for child in self._siblings:
-                self._credit += child.credit
-                self._debit += child.debit
+                if child._balance is None:
+                    child._compute_balance()
+                self._credit += child._credit
+                self._debit += child._debit
             self._balance = self._credit - self._debit
 
     ##############################################
 
+    def _to_money(self, minor_units):
+        return Money(minor_units, self._devise)
+
+    ##############################################
+
     @property
     def inner_debit(self):
-        return self._inner_debit
+        return self._to_money(self._inner_debit)
 
     ##############################################
 
     @property
     def inner_credit(self):
-        return self._inner_credit
+        return self._to_money(self._inner_credit)
 
     ##############################################
 
@@ -125,7 +189,7 @@ class AccountBalance(Account):
 
         if self._balance is None:
             self._compute_balance()
-        return self._balance
+        return self._to_money(self._balance)
 
     ##############################################
 
@@ -135,7 +199,7 @@ class AccountBalance(Account):
         # Fixme: solde créditeur
         if self._balance is None:
             self._compute_balance()
-        return self._credit
+        return self._to_money(self._credit)
 
     ##############################################
 
@@ -144,7 +208,7 @@ class AccountBalance(Account):
 
         if self._balance is None:
             self._compute_balance()
-        return self._debit
+        return self._to_money(self._debit)
 
     ##############################################
 
@@ -178,34 +242,44 @@ class AccountBalance(Account):
     def _apply_debit_credit(self, amount):
 
         # Fixme: <=
+        amount = to_money(amount, self._devise).minor_units
         if amount < 0:
             raise ValueError("Amount must be positive")
-        self.inner_balance_is_dirty()
-        # return float()
+        return amount
 
     ##############################################
 
     def apply_debit(self, amount):
 
-        self._apply_debit_credit(amount)
+        amount = self._apply_debit_credit(amount)
         self._inner_debit += amount
+        if self.__incremental_balance__:
+            self._push_delta(amount, 0)
+        self.inner_balance_is_dirty()
 
     ##############################################
 
     def apply_credit(self, amount):
 
-        self._apply_debit_credit(amount)
+        amount = self._apply_debit_credit(amount)
         self._inner_credit += amount
+        if self.__incremental_balance__:
+            self._push_delta(0, amount)
+        self.inner_balance_is_dirty()
 
     ##############################################
 
     def force_balance(self, debit=0, credit=0):
 
+        debit = to_money(debit, self._devise).minor_units
+        credit = to_money(credit, self._devise).minor_units
         if debit < 0 or credit < 0:
             raise ValueError("Amount must be positive")
-        self.inner_balance_is_dirty()
+        if self.__incremental_balance__:
+            self._push_delta(debit - self._inner_debit, credit - self._inner_credit)
         self._inner_debit = debit
         self._inner_credit = credit
+        self.inner_balance_is_dirty()
 
     ##############################################
 
@@ -213,17 +287,325 @@ class AccountBalance(Account):
 
         d = {
             'number': self._number,
-            'inner_debit': self._inner_debit,
-            'inner_credit': self._inner_credit,
+            'inner_debit': float(self.inner_debit),
+            'inner_credit': float(self.inner_credit),
         }
 
         return d
 
 ####################################################################################################
 
+class AccountBalanceRow:
+
+    """This class is a read-only view on the balance of an account in a
+    :class:`AccountChartBalances`.
+
+    """
+
+    ##############################################
+
+    def __init__(self, balances, position):
+
+        self._balances = balances
+        self._position = position
+
+    ##############################################
+
+    @property
+    def account(self):
+        return self._balances.accounts[self._position]
+
+    ##############################################
+
+    @property
+    def number(self):
+        return self.account.number
+
+    ##############################################
+
+    @property
+    def description(self):
+        return self.account.description
+
+    ##############################################
+
+    def _to_money(self, array):
+        return Money(int(array[self._position]), self.account.devise)
+
+    ##############################################
+
+    @property
+    def debit(self):
+        return self._to_money(self._balances.debits)
+
+    ##############################################
+
+    @property
+    def credit(self):
+        return self._to_money(self._balances.credits)
+
+    ##############################################
+
+    @property
+    def balance(self):
+        return self._to_money(self._balances.balances)
+
+    ##############################################
+
+    @property
+    def debit_str(self):
+        return format_currency(self.debit)
+
+    ##############################################
+
+    @property
+    def credit_str(self):
+        return format_currency(self.credit)
+
+    ##############################################
+
+    @property
+    def balance_str(self):
+        return format_currency(self.balance)
+
+    ##############################################
+
+    def has_imputations(self):
+
+        position = self._position
+        return bool(self._balances.inner_debits[position] or self._balances.inner_credits[position])
+
+####################################################################################################
+
+class AccountChartBalances:
+
+    """This class computes the aggregated debit, credit and balance of all the accounts of an
+    :class:`AccountChartBalance` in one pass over its flattened hierarchy.
+
+    Amounts are stored as arrays of integer minor units in depth first search order.  The inner
+    amounts are read from the accounts, else they can be given, e.g. from a history.
+
+    """
+
+    ##############################################
+
+    def __init__(self, account_chart, inner_debits=None, inner_credits=None):
+
+        self._account_chart = account_chart
+        self._flat_hierarchy = account_chart.flatten()
+
+        number_of_accounts = len(self._flat_hierarchy)
+        if inner_debits is None:
+            inner_debits = np.fromiter((account._inner_debit for account in self._flat_hierarchy),
+                                       dtype=np.int64, count=number_of_accounts)
+        if inner_credits is None:
+            inner_credits = np.fromiter((account._inner_credit for account in self._flat_hierarchy),
+                                        dtype=np.int64, count=number_of_accounts)
+        self._inner_debits = inner_debits
+        self._inner_credits = inner_credits
+
+        self._debits = self._flat_hierarchy.roll_up(self._inner_debits)
+        self._credits = self._flat_hierarchy.roll_up(self._inner_credits)
+        self._balances = self._credits - self._debits
+
+    ##############################################
+
+    @property
+    def accounts(self):
+        return self._flat_hierarchy.nodes
+
+    @property
+    def inner_debits(self):
+        return self._inner_debits
+
+    @property
+    def inner_credits(self):
+        return self._inner_credits
+
+    @property
+    def debits(self):
+        return self._debits
+
+    @property
+    def credits(self):
+        return self._credits
+
+    @property
+    def balances(self):
+        return self._balances
+
+    ##############################################
+
+    def __len__(self):
+        return len(self._flat_hierarchy)
+
+    ##############################################
+
+    def __getitem__(self, number):
+
+        # can raise NonExistingNodeError
+        return AccountBalanceRow(self, self._flat_hierarchy.position(number))
+
+    ##############################################
+
+    def __iter__(self):
+
+        for position in range(len(self)):
+            yield AccountBalanceRow(self, position)
+
+    ##############################################
+
+    def flatten(self):
+        return self._flat_hierarchy
+
+    ##############################################
+
+    def numbers_in_range(self, inf, sup):
+        return self._account_chart.numbers_in_range(inf, sup)
+
+    ##############################################
+
+    def rows(self, with_imputations=False):
+
+        if with_imputations:
+            positions = np.flatnonzero((self._inner_debits != 0) | (self._inner_credits != 0))
+        else:
+            positions = range(len(self))
+        return [AccountBalanceRow(self, int(position)) for position in positions]
+
+####################################################################################################
+
+class AccountBalanceSeriesRow:
+
+    """This class is a read-only view on the balances of an account in an
+    :class:`AccountChartBalanceSeries`, amounts are float arrays.
+
+    """
+
+    ##############################################
+
+    def __init__(self, series, position):
+
+        self._series = series
+        self._position = position
+
+    ##############################################
+
+    @property
+    def account(self):
+        return self._series.accounts[self._position]
+
+    ##############################################
+
+    @property
+    def number(self):
+        return self.account.number
+
+    ##############################################
+
+    @property
+    def debit(self):
+        return self._series.debits[self._position] / Money.__scale__
+
+    ##############################################
+
+    @property
+    def credit(self):
+        return self._series.credits[self._position] / Money.__scale__
+
+    ##############################################
+
+    @property
+    def balance(self):
+        return self._series.balances[self._position] / Money.__scale__
+
+####################################################################################################
+
+class AccountChartBalanceSeries:
+
+    """This class stores the aggregated balances of all the accounts of a chart for a set of
+    points, e.g. dates × scenarios.
+
+    Amounts are arrays of integer minor units of shape ``(number of accounts,) + shape`` where
+    accounts are in depth first search order.  It can be evaluated by
+    :class:`FinancialSimulator.HDL.Evaluator.ArrayAccountEvaluator`, i.e. using
+    ``table.compute(series, array_evaluator=True)``.
+
+    """
+
+    ##############################################
+
+    def __init__(self, account_chart, debits, credits):
+
+        self._account_chart = account_chart
+        self._flat_hierarchy = account_chart.flatten()
+        self._debits = debits
+        self._credits = credits
+        self._balances = credits - debits
+
+    ##############################################
+
+    @classmethod
+    def from_balances(cls, account_chart, balances, shape=None):
+
+        """Build a series from an iterable of :class:`AccountChartBalances` given in row-major order
+        of *shape*.
+
+        """
+
+        balances = list(balances)
+        if shape is None:
+            shape = (len(balances),)
+        number_of_accounts = len(account_chart.flatten())
+        debits = np.stack([item.debits for item in balances], axis=-1).reshape((number_of_accounts,) + tuple(shape))
+        credits = np.stack([item.credits for item in balances], axis=-1).reshape((number_of_accounts,) + tuple(shape))
+        return cls(account_chart, debits, credits)
+
+    ##############################################
+
+    @property
+    def accounts(self):
+        return self._flat_hierarchy.nodes
+
+    @property
+    def shape(self):
+        return self._debits.shape[1:]
+
+    @property
+    def debits(self):
+        return self._debits
+
+    @property
+    def credits(self):
+        return self._credits
+
+    @property
+    def balances(self):
+        return self._balances
+
+    ##############################################
+
+    def __getitem__(self, number):
+
+        # can raise NonExistingNodeError
+        return AccountBalanceSeriesRow(self, self._flat_hierarchy.position(number))
+
+    ##############################################
+
+    def flatten(self):
+        return self._flat_hierarchy
+
+    ##############################################
+
+    def numbers_in_range(self, inf, sup):
+        return self._account_chart.numbers_in_range(inf, sup)
+
+####################################################################################################
+
 class AccountChartBalance(AccountChart):
 
     __account_balance_factory__ = AccountBalance
+    __account_chart_balances_factory__ = AccountChartBalances
 
     ##############################################
 
@@ -248,6 +630,23 @@ class AccountChartBalance(AccountChart):
 
     ##############################################
 
+    @property
+    def version(self):
+
+        """Version of the chart, it changes each time a balance changes."""
+
+        return max([account.version for account in self._root_nodes], default=0)
+
+    ##############################################
+
+    def compute_balances(self):
+
+        """Return the aggregated balances of all the accounts."""
+
+        return self.__account_chart_balances_factory__(self)
+
+    ##############################################
+
     def to_json(self):
 
         return [account.to_json() for account in self if account.has_imputations()]
@@ -270,11 +669,24 @@ class Journals:
 
     def __init__(self, financial_period, journals):
 
-        self._journals = {label:self.__journal_factory__(label, description, financial_period)
+        self._posting_index = financial_period.posting_index
+        self._journals = {label:self._make_journal(label, description, financial_period)
                           for label, description in journals}
 
     ##############################################
 
+    def _make_journal(self, label, description, financial_period):
+
+        return self.__journal_factory__(label, description, financial_period)
+
+    ##############################################
+
+    @property
+    def posting_index(self):
+        return self._posting_index
+
+    ##############################################
+
     def __getitem__(self, label):
 
         return self._journals[label]
@@ -308,6 +720,7 @@ class FinancialPeriod:
     __account_chart_factory__ = AccountChartBalance
     __analytic_account_chart_factory__ = AccountChartBalance
     __journals_factory__ = Journals
+    __posting_index_factory__ = PostingIndex # set to None to disable the index
 
     ##############################################
 
@@ -329,6 +742,11 @@ class FinancialPeriod:
             self._analytic_account_chart = self.__analytic_account_chart_factory__(analytic_account_chart)
         else:
             self._analytic_account_chart = None
+        if self.__posting_index_factory__ is not None:
+            self._posting_index = self.__posting_index_factory__(self._account_chart,
+                                                                 self._analytic_account_chart)
+        else:
+            self._posting_index = None
         self._journals = self.__journals_factory__(self, journals)
 
     ##############################################
@@ -351,6 +769,13 @@ class FinancialPeriod:
 
     ##############################################
 
+    @property
+    def posting_index(self):
+        """General ledger index, see :class:`FinancialSimulator.Accounting.PostingIndex.PostingIndex`"""
+        return self._posting_index
+
+    ##############################################
+
     @property
     def start_date(self):
         return self._start_date
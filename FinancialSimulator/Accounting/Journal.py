@@ -22,6 +22,7 @@
 
 import datetime
 import logging
+import threading
 
 ####################################################################################################
 
@@ -30,7 +31,7 @@ from FinancialSimulator.Tools.Currency import format_currency
 from FinancialSimulator.Tools.Date import parse_date, parse_datetime
 from FinancialSimulator.Tools.Hierarchy import NonExistingNodeError
 from FinancialSimulator.Tools.Observer import Signal
-from FinancialSimulator.Units import round_currency
+from FinancialSimulator.Units import to_money
 
 ####################################################################################################
 
@@ -38,19 +39,26 @@ _module_logger = logging.getLogger(__name__)
 
 ####################################################################################################
 
+# The imputation and journal entry classes define __slots__, the default concrete classes are
+# dict-backed so as to be extensible, the Compact classes are slot-only and can be selected with
+# the journal factories, see CompactJournalMixin.
+
 class DebitCreditInterface:
+    __slots__ = ()
     def is_debit(self):
         raise NotImplementedError
     def is_credit(self):
         raise NotImplementedError
 
 class DebitMixin:
+    __slots__ = ()
     def is_debit(self):
         return True
     def is_credit(self):
         return False
 
 class CreditMixin:
+    __slots__ = ()
     def is_debit(self):
         return False
     def is_credit(self):
@@ -71,7 +79,9 @@ class ImputationData(DebitCreditInterface):
         # Fixme: account is a number here
         self.account = account
         self.analytic_account = analytic_account
-        self.amount = float(amount) # Fixme: float or class ?
+        # the amount is converted in the currency of the account once it is resolved
+        self._value = amount
+        self.amount = to_money(amount, account.devise if resolved else None)
         self._resolved = resolved
 
     ##############################################
@@ -88,7 +98,7 @@ class ImputationData(DebitCreditInterface):
             else:
                 analytic_account = None
             # Fixme: account are resolved now !
-            return self.__class__(account, self.amount, analytic_account, resolved=True)
+            return self.__class__(account, self._value, analytic_account, resolved=True)
 
     ##############################################
 
@@ -110,6 +120,8 @@ class ImputationData(DebitCreditInterface):
 
 class Imputation(DebitCreditInterface):
 
+    __slots__ = ('_journal_entry', '_account', '_analytic_account', '_amount')
+
     imputed = Signal()
 
     _logger = _module_logger.getChild('Imputation')
@@ -118,7 +130,6 @@ class Imputation(DebitCreditInterface):
 
     def __init__(self, journal_entry, account, amount, analytic_account):
 
-        # Fixme: float()
         if amount < 0:
             raise NegativeAmountError()
 
@@ -147,7 +158,7 @@ class Imputation(DebitCreditInterface):
 
     @property
     def devise(self):
-        return self._account.devise
+        return self.account.devise
 
     @property
     def analytic_account(self):
@@ -162,7 +173,7 @@ class Imputation(DebitCreditInterface):
     @property
     def amount_str(self):
 
-        return format_currency(self._amount)
+        return format_currency(self.amount)
 
     ##############################################
 
@@ -208,7 +219,7 @@ class Imputation(DebitCreditInterface):
         else:
             letter = 'C'
         string_format = '{} {:>10}: {:>10}'
-        return string_format.format(letter, self._account.number, self.amount_str)
+        return string_format.format(letter, self.account.number, self.amount_str)
 
     ##############################################
 
@@ -216,28 +227,32 @@ class Imputation(DebitCreditInterface):
 
         # Fixme: simulation vs accounting
 
-        self._logger.info(str(self))
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(str(self))
+
+        account = self.account
+        analytic_account = self.analytic_account
+        amount = self.amount
 
         if self.is_debit():
-            self._account.apply_debit(self.amount)
+            account.apply_debit(amount)
+            if analytic_account is not None:
+                analytic_account.apply_debit(amount)
         else:
-            self._account.apply_credit(self.amount)
-
-        if self._analytic_account is not None:
-            if self.is_debit():
-                self._analytic_account.apply_debit(self.amount)
-            else:
-                self._analytic_account.apply_credit(self.amount)
+            account.apply_credit(amount)
+            if analytic_account is not None:
+                analytic_account.apply_credit(amount)
 
-        self.imputed.send(sender=self)
+        self.imputed.emit(self)
 
     ##############################################
 
     def to_json(self):
 
-        d = {'account':self._account.number, 'amount':self._amount}
-        if self._analytic_account is not None:
-            d['analytic_account'] = self._analytic_account.number
+        analytic_account = self.analytic_account
+        d = {'account':self.account.number, 'amount':float(self.amount)}
+        if analytic_account is not None:
+            d['analytic_account'] = analytic_account.number
         d['operation'] = 'D' if self.is_debit() else 'C'
 
         return d
@@ -250,6 +265,12 @@ class DebitImputation(DebitMixin, Imputation):
 class CreditImputation(CreditMixin, Imputation):
     pass
 
+class CompactDebitImputation(DebitMixin, Imputation):
+    __slots__ = ()
+
+class CompactCreditImputation(CreditMixin, Imputation):
+    __slots__ = ()
+
 class DebitImputationData(DebitMixin, ImputationData):
     __imputation_factory__ = DebitImputation
 
@@ -262,6 +283,8 @@ class JournalEntryMixin:
 
     """This class defines a journal entry template."""
 
+    __slots__ = ('_description', '_imputations', '_debits', '_credits')
+
     _logger = _module_logger.getChild('JournalEntryMixin')
 
     ##############################################
@@ -319,17 +342,18 @@ class JournalEntryMixin:
     ##############################################
 
     def _sum_of_imputations(self, imputations):
-        return round_currency(sum([imputation.amount for imputation in imputations]))
+        # amounts are fixed-point, the sum is exact
+        return sum([imputation.amount for imputation in imputations])
 
     ##############################################
 
     def sum_of_debits(self):
-        return self._sum_of_imputations(self._debits)
+        return self._sum_of_imputations(self.debits)
 
     ##############################################
 
     def sum_of_credits(self):
-        return self._sum_of_imputations(self._credits)
+        return self._sum_of_imputations(self.credits)
 
     ##############################################
 
@@ -362,7 +386,15 @@ class JournalEntryTemplate(JournalEntryMixin):
 
 ####################################################################################################
 
-class JournalEntry(JournalEntryMixin):
+class JournalEntryBase(JournalEntryMixin):
+
+    """This class implements a journal entry, see :class:`JournalEntry` and
+    :class:`CompactJournalEntry`.
+
+    """
+
+    __slots__ = ('_journal', '_date', '_id', '_document',
+                 '_validation_date', '_reconciliation_id', '_reconciliation_date')
 
     validated = Signal()
     reconciled = Signal()
@@ -439,7 +471,7 @@ class JournalEntry(JournalEntryMixin):
 
     def __str__(self):
 
-        message = 'Journal Entry on {}: {}\n'.format(self._date, self._description)
+        message = 'Journal Entry on {}: {}\n'.format(self.date, self.description)
         for imputations in (self.debits, self.credits):
             message += '\n'.join([str(imputation) for imputation in imputations])
             message += '\n'
@@ -466,7 +498,7 @@ class JournalEntry(JournalEntryMixin):
 
     def reconcile(self, reconciliation_id):
 
-        if self._reconciliation_date is not None:
+        if self._reconciliation_date is None:
             self._reconciliation_id = reconciliation_id
             self._reconciliation_date = datetime.datetime.utcnow()
             self.reconciled.send(sender=self)
@@ -478,22 +510,30 @@ class JournalEntry(JournalEntryMixin):
     def to_json(self):
 
         d = {
-            'journal': self._journal.label,
-            'sequence_number': self._id,
-            'date': str(self._date), # datetime is handled by pymongo
-            'description': self._description,
-            # 'document': = self._document
-            'validation_date': str(self._validation_date),
-            'reconciliation_id': self._reconciliation_id,
-            'reconciliation_date': str(self._reconciliation_date),
-            'debits': [imputation.to_json() for imputation in self._debits],
-            'credits': [imputation.to_json() for imputation in self._credits],
+            'journal': self.journal.label,
+            'sequence_number': self.sequence_number,
+            'date': str(self.date), # datetime is handled by pymongo
+            'description': self.description,
+            # 'document': = self.document
+            'validation_date': str(self.validation_date),
+            'reconciliation_id': self.reconciliation_id,
+            'reconciliation_date': str(self.reconciliation_date),
+            'debits': [imputation.to_json() for imputation in self.debits],
+            'credits': [imputation.to_json() for imputation in self.credits],
         }
 
         return d
 
 ####################################################################################################
 
+class JournalEntry(JournalEntryBase):
+    pass
+
+class CompactJournalEntry(JournalEntryBase):
+    __slots__ = ()
+
+####################################################################################################
+
 class Journal:
 
     # Fixme:
@@ -510,6 +550,7 @@ class Journal:
     # journal -> period ?
 
     logged_entry = Signal()
+    logged_entries = Signal()
 
     __debit_imputation_data_factory__ = DebitImputationData
     __credit_imputation_data_factory__ = CreditImputationData
@@ -527,6 +568,11 @@ class Journal:
 
         self._account_chart = financial_period.account_chart
         self._analytic_account_chart = financial_period.analytic_account_chart
+        self._posting_index = financial_period.posting_index
+
+        # The sequence numbers are allocated when the entries are written, under this lock, thus
+        # they are gap-free and in commit order
+        self._commit_lock = threading.RLock()
 
     ##############################################
 
@@ -542,40 +588,89 @@ class Journal:
 
     ##############################################
 
+    @property
+    def account_chart(self):
+        return self._account_chart
+
+    ##############################################
+
+    @property
+    def analytic_account_chart(self):
+        return self._analytic_account_chart
+
+    ##############################################
+
     def generate_sequence_number(self):
 
         raise NotImplementedError
 
     ##############################################
 
+    def generate_sequence_numbers(self, count):
+
+        """Return a block of *count* consecutive sequence numbers as a range"""
+
+        raise NotImplementedError
+
+    ##############################################
+
     def write_entry(self, journal_entry):
 
+        """Write a journal entry and return the stored entry"""
+
         raise NotImplementedError
 
     ##############################################
 
+    def write_entries(self, journal_entries):
+
+        """Write a batch of journal entries and return the stored entries"""
+
+        return [self.write_entry(journal_entry) for journal_entry in journal_entries]
+
+    ##############################################
+
+    def _discard_entries(self, journal_entries):
+
+        """Remove the entries of a failed batch, the entries which were not written are ignored"""
+
+        raise NotImplementedError
+
+    ##############################################
+
+    def _index_postings(self, journal_entries):
+
+        if self._posting_index is not None:
+            for journal_entry in journal_entries:
+                self._posting_index.add_entry(journal_entry)
+
+    ##############################################
+
     def write_and_apply_entry(self, journal_entry):
 
-        self.write_entry(journal_entry)
+        # the backend can store the entry in another form
+        journal_entry = self.write_entry(journal_entry)
+        self._index_postings((journal_entry,))
         journal_entry.apply()
-        self.logged_entry.send(self, journal_entry=journal_entry)
+        self.logged_entry.emit(self, journal_entry=journal_entry)
+
+        return journal_entry
 
     ##############################################
 
     def _log_entry(self, date, description, imputations, document=None):
 
-        sequence_number = self.generate_sequence_number()
-        factory = self.__journal_entry_factory__
-        journal_entry = factory(self,
-                                sequence_number,
-                                date,
-                                description,
-                                document,
-                                imputations
-        )
-        self.write_and_apply_entry(journal_entry)
-
-        return journal_entry
+        with self._commit_lock:
+            sequence_number = self.generate_sequence_number()
+            factory = self.__journal_entry_factory__
+            journal_entry = factory(self,
+                                    sequence_number,
+                                    date,
+                                    description,
+                                    document,
+                                    imputations
+            )
+            return self.write_and_apply_entry(journal_entry)
 
     ##############################################
 
@@ -592,6 +687,119 @@ class Journal:
 
     ##############################################
 
+    def log_entries(self, entries):
+
+        """Log and apply a batch of journal entries
+
+        *entries* is an iterable of ``(date, description, imputations)`` or ``(date, description,
+        imputations, document)`` tuples.
+
+        The whole batch is resolved and checked before anything is written, an invalid entry raises
+        a :class:`RejectedBatchError`, its sequence numbers are given back and the journal is left
+        untouched.  Sequence numbers are allocated as one block under the commit lock, the balance
+        deltas are applied once per account and a single :attr:`logged_entries` signal is sent.
+        Imputations are applied one by one if someone listens :attr:`Imputation.imputed`.
+
+        If the write or the application of the batch fails, the written entries are discarded, the
+        balances of the accounts are restored and the exception is raised again, chained to the
+        exception of the discard if it fails too.  The :attr:`Imputation.imputed` signals already
+        sent are not undone.
+
+        """
+
+        # Resolve the whole batch
+        resolved_entries = []
+        for i, entry in enumerate(entries):
+            date, description, imputations = entry[:3]
+            document = entry[3] if len(entry) > 3 else None
+            try:
+                resolved_imputations = [imputation.resolve(self._account_chart, self._analytic_account_chart)
+                                        for imputation in imputations]
+            except (NonExistingNodeError, ValueError, NameError) as exception:
+                raise RejectedBatchError(i, exception) from exception
+            resolved_entries.append((date, description, document, resolved_imputations))
+        if not resolved_entries:
+            return []
+
+        with self._commit_lock:
+            sequence_numbers = self.generate_sequence_numbers(len(resolved_entries))
+
+            # Check the whole batch
+            journal_entries = []
+            factory = self.__journal_entry_factory__
+            for i, (sequence_number, (date, description, document, imputations)) in enumerate(
+                    zip(sequence_numbers, resolved_entries)):
+                try:
+                    journal_entry = factory(self, sequence_number, date, description, document, imputations)
+                except (ValueError, NameError) as exception:
+                    self.sequence_allocator.cancel(sequence_numbers)
+                    raise RejectedBatchError(i, exception) from exception
+                journal_entries.append(journal_entry)
+
+            balances = self._account_balances(journal_entries)
+            try:
+                written_entries = self.write_entries(journal_entries)
+                if Imputation.imputed.has_listeners():
+                    for journal_entry in journal_entries:
+                        journal_entry.apply()
+                else:
+                    self._apply_aggregated_imputations(journal_entries)
+            except Exception as exception:
+                for account, (debit, credit) in balances.items():
+                    account.force_balance(debit, credit)
+                try:
+                    self._discard_entries(journal_entries)
+                except Exception as discard_exception:
+                    # don't hide the failure of the batch
+                    raise exception from discard_exception
+                raise
+
+            self._index_postings(written_entries)
+            self.logged_entries.emit(self, journal_entries=written_entries)
+
+        return written_entries
+
+    ##############################################
+
+    @staticmethod
+    def _account_balances(journal_entries):
+
+        """Return the inner debit and credit of the accounts imputed by *journal_entries*"""
+
+        balances = {}
+        for journal_entry in journal_entries:
+            for imputation in journal_entry.imputations:
+                for account in imputation.account, imputation.analytic_account:
+                    if account is not None and account not in balances:
+                        balances[account] = (account.inner_debit, account.inner_credit)
+        return balances
+
+    ##############################################
+
+    @staticmethod
+    def _apply_aggregated_imputations(journal_entries):
+
+        # account -> [debit, credit]
+        deltas = {}
+        for journal_entry in journal_entries:
+            for imputation in journal_entry.imputations:
+                side = 0 if imputation.is_debit() else 1
+                amount = imputation.amount
+                for account in imputation.account, imputation.analytic_account:
+                    if account is not None:
+                        delta = deltas.get(account)
+                        if delta is None:
+                            delta = deltas[account] = [0, 0]
+                        delta[side] += amount
+
+        for account, (debit, credit) in deltas.items():
+            if debit:
+                account.apply_debit(debit)
+            if credit:
+                account.apply_credit(credit)
+
+    ##############################################
+
     def log_template(self, date, template, document=None):
 
         """Log and apply a template journal entry"""
@@ -609,7 +817,11 @@ class Journal:
         """Build a journal entry from JSON"""
 
         date = parse_date(data['date'])
-        validation_date = parse_datetime(data['validation_date'])
+        validation_date = data['validation_date']
+        if validation_date != 'None':
+            validation_date = parse_datetime(validation_date)
+        else:
+            validation_date = None
         reconciliation_date = data['reconciliation_date']
         if reconciliation_date != 'None':
             reconciliation_date = parse_datetime(reconciliation_date)
@@ -646,3 +858,16 @@ class Journal:
         )
 
         return journal_entry
+
+####################################################################################################
+
+class CompactJournalMixin:
+
+    """Mixin to store the journal entries and imputations as slot-only objects, e.g.
+    ``class MyJournal(CompactJournalMixin, JournalInMemory)``.
+
+    """
+
+    __debit_imputation_factory__ = CompactDebitImputation
+    __credit_imputation_factory__ = CompactCreditImputation
+    __journal_entry_factory__ = CompactJournalEntry
@@ -0,0 +1,547 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+
+"""This module implements a journal which stores its imputations in a columnar form.
+
+Each imputation is stored as a row of parallel typed arrays (entry index, account number,
+analytic account number, signed amount in minor units, date ordinal), the journal entries and
+imputations are only built as lightweight views when they are accessed.
+
+"""
+
+####################################################################################################
+
+import datetime
+import logging
+
+import numpy as np
+
+####################################################################################################
+
+from .Journal import (DebitMixin, CreditMixin,
+                      Imputation, JournalEntry)
+from .JournalInMemory import JournalInMemory
+from FinancialSimulator.Tools.GrowableArray import GrowableArray
+from FinancialSimulator.Units import Money
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+def sum_by_key(keys, values):
+
+    """Return the unique keys and the sum of the values for each key."""
+
+    if not keys.shape[0]:
+        return keys[:0], values[:0]
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    sorted_values = values[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+    return sorted_keys[starts], np.add.reduceat(sorted_values, starts)
+
+####################################################################################################
+
+class ImputationStore:
+
+    """This class stores journal entries and their imputations in parallel typed arrays.
+
+    Amounts are signed integer minor units: debits are positive and credits are negative, a separate
+    flag keeps the side of null amounts.
+
+    """
+
+    NO_ACCOUNT = -1
+
+    ##############################################
+
+    def __init__(self):
+
+        # Entry columns
+        self._sequence_numbers = GrowableArray(np.int64)
+        self._entry_dates = GrowableArray(np.int32)
+        self._first_imputations = GrowableArray(np.int64)
+        self._descriptions = []
+        self._documents = []
+        self._validation_dates = []
+        self._reconciliation_ids = []
+        self._reconciliation_dates = []
+
+        # Imputation columns
+        self._entry_indexes = GrowableArray(np.int64)
+        self._accounts = GrowableArray(np.int64)
+        self._analytic_accounts = GrowableArray(np.int64)
+        self._amounts = GrowableArray(np.int64)
+        self._is_debits = GrowableArray(np.bool_)
+        self._dates = GrowableArray(np.int32)
+
+    ##############################################
+
+    @property
+    def number_of_entries(self):
+        return len(self._sequence_numbers)
+
+    @property
+    def number_of_imputations(self):
+        return len(self._entry_indexes)
+
+    ##############################################
+
+    @property
+    def sequence_numbers(self):
+        return self._sequence_numbers.array
+
+    @property
+    def entry_dates(self):
+        return self._entry_dates.array
+
+    @property
+    def first_imputations(self):
+        return self._first_imputations.array
+
+    ##############################################
+
+    def description(self, entry_index):
+        return self._descriptions[entry_index]
+
+    def document(self, entry_index):
+        return self._documents[entry_index]
+
+    def validation_date(self, entry_index):
+        return self._validation_dates[entry_index]
+
+    def reconciliation_id(self, entry_index):
+        return self._reconciliation_ids[entry_index]
+
+    def reconciliation_date(self, entry_index):
+        return self._reconciliation_dates[entry_index]
+
+    def set_validation_date(self, entry_index, validation_date):
+        self._validation_dates[entry_index] = validation_date
+
+    def set_reconciliation(self, entry_index, reconciliation_id, reconciliation_date):
+        self._reconciliation_ids[entry_index] = reconciliation_id
+        self._reconciliation_dates[entry_index] = reconciliation_date
+
+    ##############################################
+
+    @property
+    def entry_indexes(self):
+        return self._entry_indexes.array
+
+    @property
+    def accounts(self):
+        return self._accounts.array
+
+    @property
+    def analytic_accounts(self):
+        return self._analytic_accounts.array
+
+    @property
+    def amounts(self):
+        return self._amounts.array
+
+    @property
+    def is_debits(self):
+        return self._is_debits.array
+
+    @property
+    def dates(self):
+        return self._dates.array
+
+    ##############################################
+
+    def append(self, journal_entry):
+
+        """Store a journal entry and return its index"""
+
+        entry_index = self.number_of_entries
+        date = journal_entry.date.toordinal()
+
+        self._sequence_numbers.append(journal_entry.sequence_number)
+        self._entry_dates.append(date)
+        self._first_imputations.append(self.number_of_imputations)
+        self._descriptions.append(journal_entry.description)
+        self._documents.append(journal_entry.document)
+        self._validation_dates.append(journal_entry.validation_date)
+        self._reconciliation_ids.append(journal_entry.reconciliation_id)
+        self._reconciliation_dates.append(journal_entry.reconciliation_date)
+
+        # Columns are extended once per entry
+        accounts = []
+        analytic_accounts = []
+        amounts = []
+        is_debits = []
+        for imputation in journal_entry.imputations:
+            analytic_account = imputation.analytic_account
+            if analytic_account is not None:
+                analytic_account = analytic_account.number
+            else:
+                analytic_account = self.NO_ACCOUNT
+            is_debit = imputation.is_debit()
+            amount = imputation.amount.minor_units
+            accounts.append(imputation.account.number)
+            analytic_accounts.append(analytic_account)
+            amounts.append(amount if is_debit else -amount)
+            is_debits.append(is_debit)
+        number_of_imputations = len(accounts)
+        self._entry_indexes.extend([entry_index]*number_of_imputations)
+        self._accounts.extend(accounts)
+        self._analytic_accounts.extend(analytic_accounts)
+        self._amounts.extend(amounts)
+        self._is_debits.extend(is_debits)
+        self._dates.extend([date]*number_of_imputations)
+
+        return entry_index
+
+    ##############################################
+
+    def truncate(self, number_of_entries):
+
+        """Remove the entries from *number_of_entries*"""
+
+        if number_of_entries < self.number_of_entries:
+            number_of_imputations = int(self._first_imputations[number_of_entries])
+        else:
+            number_of_imputations = self.number_of_imputations
+        for array in (self._sequence_numbers, self._entry_dates, self._first_imputations):
+            array.truncate(number_of_entries)
+        for values in (self._descriptions, self._documents, self._validation_dates,
+                       self._reconciliation_ids, self._reconciliation_dates):
+            del values[number_of_entries:]
+        for array in (self._entry_indexes, self._accounts, self._analytic_accounts,
+                      self._amounts, self._is_debits, self._dates):
+            array.truncate(number_of_imputations)
+
+    ##############################################
+
+    def imputation_range(self, entry_index):
+
+        start = int(self._first_imputations[entry_index])
+        if entry_index +1 < self.number_of_entries:
+            stop = int(self._first_imputations[entry_index +1])
+        else:
+            stop = self.number_of_imputations
+        return range(start, stop)
+
+    ##############################################
+
+    def sum_by_account(self, analytic=False):
+
+        """Return the account numbers and the sum of their debits and credits as arrays"""
+
+        if analytic:
+            accounts = self.analytic_accounts
+            mask = accounts != self.NO_ACCOUNT
+        else:
+            accounts = self.accounts
+            mask = slice(None)
+        amounts = self.amounts
+        debits = np.where(amounts > 0, amounts, 0)
+        credits = np.where(amounts < 0, -amounts, 0)
+        numbers, debit_sums = sum_by_key(accounts[mask], debits[mask])
+        numbers, credit_sums = sum_by_key(accounts[mask], credits[mask])
+        return numbers, debit_sums, credit_sums
+
+####################################################################################################
+
+class ImputationView(Imputation):
+
+    """This class implements the imputation API on top of an :class:`ImputationStore` row."""
+
+    __slots__ = ('_index',)
+
+    ##############################################
+
+    def __init__(self, journal_entry, index):
+
+        self._journal_entry = journal_entry
+        self._index = index
+
+    ##############################################
+
+    @property
+    def account(self):
+        journal = self._journal_entry.journal
+        number = int(journal.store.accounts[self._index])
+        return journal.account_chart[number]
+
+    @property
+    def analytic_account(self):
+        journal = self._journal_entry.journal
+        number = int(journal.store.analytic_accounts[self._index])
+        if number == ImputationStore.NO_ACCOUNT:
+            return None
+        else:
+            return journal.analytic_account_chart[number]
+
+    @property
+    def amount(self):
+        minor_units = abs(int(self._journal_entry.journal.store.amounts[self._index]))
+        return Money(minor_units, self.account.devise)
+
+####################################################################################################
+
+class DebitImputationView(DebitMixin, ImputationView):
+    __slots__ = ()
+
+class CreditImputationView(CreditMixin, ImputationView):
+    __slots__ = ()
+
+####################################################################################################
+
+class JournalEntryView(JournalEntry):
+
+    """This class implements the journal entry API on top of an :class:`ImputationStore` entry."""
+
+    ##############################################
+
+    def __init__(self, journal, index):
+
+        self._journal = journal
+        self._index = index
+
+    ##############################################
+
+    @property
+    def _store(self):
+        return self._journal.store
+
+    ##############################################
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def sequence_number(self):
+        return int(self._store.sequence_numbers[self._index])
+
+    @property
+    def date(self):
+        return datetime.date.fromordinal(int(self._store.entry_dates[self._index]))
+
+    @property
+    def description(self):
+        return self._store.description(self._index)
+
+    @property
+    def document(self):
+        return self._store.document(self._index)
+
+    @property
+    def validation_date(self):
+        return self._store.validation_date(self._index)
+
+    @property
+    def reconciliation_id(self):
+        return self._store.reconciliation_id(self._index)
+
+    @property
+    def reconciliation_date(self):
+        return self._store.reconciliation_date(self._index)
+
+    ##############################################
+
+    def _imputation_views(self, side=None):
+
+        is_debits = self._store.is_debits
+        for i in self._store.imputation_range(self._index):
+            is_debit = bool(is_debits[i])
+            if side is None or side == is_debit:
+                if is_debit:
+                    yield DebitImputationView(self, i)
+                else:
+                    yield CreditImputationView(self, i)
+
+    ##############################################
+
+    def __iter__(self):
+        return self._imputation_views()
+
+    @property
+    def imputations(self):
+        return self._imputation_views()
+
+    @property
+    def debits(self):
+        return self._imputation_views(True)
+
+    @property
+    def credits(self):
+        return self._imputation_views(False)
+
+    ##############################################
+
+    def apply(self):
+
+        for imputation in self._imputation_views():
+            imputation.apply()
+
+    ##############################################
+
+    def validate(self):
+
+        if self.validation_date is None:
+            self._store.set_validation_date(self._index, datetime.datetime.utcnow())
+            self.validated.send(sender=self)
+        else:
+            raise NameError('Journal entry is already validated')
+
+    ##############################################
+
+    def reconcile(self, reconciliation_id):
+
+        if self.reconciliation_date is None:
+            self._store.set_reconciliation(self._index, reconciliation_id, datetime.datetime.utcnow())
+            self.reconciled.send(sender=self)
+        else:
+            raise NameError('Journal entry is already cleared')
+
+####################################################################################################
+
+class JournalColumnar(JournalInMemory):
+
+    """This class implements an in-memory journal backed by an :class:`ImputationStore`.
+
+    Journal entries are decomposed when they are written, :meth:`__getitem__` and :meth:`__iter__`
+    return :class:`JournalEntryView` instances.
+
+    """
+
+    _logger = _module_logger.getChild('JournalColumnar')
+
+    __journal_entry_view_factory__ = JournalEntryView
+
+    ##############################################
+
+    def __init__(self, label, description, financial_period):
+
+        super().__init__(label, description, financial_period)
+
+        self._store = ImputationStore()
+
+    ##############################################
+
+    @property
+    def store(self):
+        return self._store
+
+    ##############################################
+
+    def __bool__(self):
+
+        return bool(self._store.number_of_entries)
+
+    ##############################################
+
+    def __len__(self):
+
+        return self._store.number_of_entries
+
+    ##############################################
+
+    def __getitem__(self, slice_):
+
+        if isinstance(slice_, slice):
+            return [self._view(index) for index in range(*slice_.indices(len(self)))]
+        else:
+            if slice_ < 0:
+                slice_ += len(self)
+            if not 0 <= slice_ < len(self):
+                raise IndexError(slice_)
+            return self._view(slice_)
+
+    ##############################################
+
+    def __iter__(self):
+
+        for index in range(len(self)):
+            yield self._view(index)
+
+    ##############################################
+
+    def _view(self, index):
+
+        return self.__journal_entry_view_factory__(self, index)
+
+    ##############################################
+
+    def write_entry(self, journal_entry):
+
+        index = self._store.append(journal_entry)
+        self._index_entry(index, journal_entry)
+        return self._view(index)
+
+    ##############################################
+
+    def _truncate(self, length):
+
+        self._store.truncate(length)
+        self._reindex()
+
+    ##############################################
+
+    def write_and_apply_entry(self, journal_entry):
+
+        # Apply the entry before it is released, it is faster than to apply the view
+        journal_entry_view = self.write_entry(journal_entry)
+        self._index_postings((journal_entry_view,))
+        journal_entry.apply()
+        self.logged_entry.emit(self, journal_entry=journal_entry_view)
+
+        return journal_entry_view
+
+    ##############################################
+
+    def run(self):
+
+        # The imputations must be replayed one by one when someone listen them
+        if Imputation.imputed.has_listeners():
+            super().run()
+        else:
+            charts = [(self._account_chart, False)]
+            if self._analytic_account_chart is not None:
+                charts.append((self._analytic_account_chart, True))
+            for account_chart, analytic in charts:
+                for number, debit, credit in zip(*self._store.sum_by_account(analytic)):
+                    account = account_chart[int(number)]
+                    if debit:
+                        account.apply_debit(Money(int(debit), account.devise))
+                    if credit:
+                        account.apply_credit(Money(int(credit), account.devise))
+
+    ##############################################
+
+    def sum_by_account(self):
+
+        """Return a dictionary mapping account numbers to a (debit, credit) tuple"""
+
+        account_chart = self._account_chart
+        sums = {}
+        for number, debit, credit in zip(*self._store.sum_by_account()):
+            devise = account_chart[int(number)].devise
+            sums[int(number)] = (Money(int(debit), devise), Money(int(credit), devise))
+        return sums
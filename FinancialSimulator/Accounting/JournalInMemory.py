@@ -20,12 +20,13 @@
 
 ####################################################################################################
 
+from bisect import bisect_left, bisect_right
 import logging
 
 ####################################################################################################
 
 from .Journal import Journal
-from FinancialSimulator.Tools.SequentialId import SequentialId
+from FinancialSimulator.Tools.SequentialId import SequenceAllocator
 
 ####################################################################################################
 
@@ -33,17 +34,79 @@ _module_logger = logging.getLogger(__name__)
 
 ####################################################################################################
 
+class DateSortedIndex:
+
+    """This class stores values sorted by date ordinal, values of the same date are kept in insertion
+    order.
+
+    """
+
+    __slots__ = ('_ordinals', '_values')
+
+    ##############################################
+
+    def __init__(self):
+
+        self._ordinals = []
+        self._values = []
+
+    ##############################################
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    ##############################################
+
+    def insert(self, ordinal, value):
+
+        ordinals = self._ordinals
+        if not ordinals or ordinals[-1] <= ordinal:
+            ordinals.append(ordinal)
+            self._values.append(value)
+        else:
+            index = bisect_right(ordinals, ordinal)
+            ordinals.insert(index, ordinal)
+            self._values.insert(index, value)
+
+    ##############################################
+
+    def index_range(self, start_date=None, stop_date=None):
+
+        """Return the range of the positions from *start_date* to *stop_date* included."""
+
+        ordinals = self._ordinals
+        lower = 0 if start_date is None else bisect_left(ordinals, start_date.toordinal())
+        upper = len(ordinals) if stop_date is None else bisect_right(ordinals, stop_date.toordinal())
+        return range(lower, upper)
+
+    ##############################################
+
+    def values(self, start_date=None, stop_date=None):
+
+        """Return the values from *start_date* to *stop_date* included."""
+
+        index_range = self.index_range(start_date, stop_date)
+        return self._values[index_range.start:index_range.stop]
+
+####################################################################################################
+
 class JournalInMemory(Journal):
 
+    __sequence_allocator_factory__ = SequenceAllocator
+
     ##############################################
 
     def __init__(self, label, description, financial_period):
 
         super().__init__(label, description, financial_period)
 
-        self._next_id = SequentialId() # Fixme: init from store
+        self._next_id = self.__sequence_allocator_factory__(key=label, store=self._sequence_store())
         self._journal_entries = [] # Fixme: data provider
-        # self._date_indexer = DateIndexer(start, stop)
+
+        # Indexes of the journal entries by date, by account and by analytic account
+        self._date_index = DateSortedIndex()
+        self._account_indexes = {}
+        self._analytic_account_indexes = {}
 
     ##############################################
 
@@ -71,15 +134,86 @@ class JournalInMemory(Journal):
 
     ##############################################
 
+    @property
+    def sequence_allocator(self):
+        return self._next_id
+
+    ##############################################
+
+    def _sequence_store(self):
+
+        """Return the store of the high-water mark of the sequence allocator, see
+        :class:`FinancialSimulator.Tools.SequentialId.SequenceAllocator`.
+
+        """
+
+        return None
+
+    ##############################################
+
     def generate_sequence_number(self):
 
-        return self._next_id.increment()
+        return self._next_id.commit(1)[0]
+
+    ##############################################
+
+    def generate_sequence_numbers(self, count):
+
+        return self._next_id.commit(count)
 
     ##############################################
 
     def write_entry(self, journal_entry):
 
+        self._index_entry(len(self._journal_entries), journal_entry)
         self._journal_entries.append(journal_entry)
+        return journal_entry
+
+    ##############################################
+
+    def _discard_entries(self, journal_entries):
+
+        # the entries of a batch are the last ones
+        sequence_numbers = [journal_entry.sequence_number for journal_entry in journal_entries]
+        discarded = set(sequence_numbers)
+        length = len(self)
+        while length and self[length -1].sequence_number in discarded:
+            length -= 1
+        self._truncate(length)
+        self._next_id.cancel(range(min(sequence_numbers), max(sequence_numbers) +1))
+
+    ##############################################
+
+    def _truncate(self, length):
+
+        del self._journal_entries[length:]
+        self._reindex()
+
+    ##############################################
+
+    def _reindex(self):
+
+        self._date_index = DateSortedIndex()
+        self._account_indexes = {}
+        self._analytic_account_indexes = {}
+        for index, journal_entry in enumerate(self):
+            self._index_entry(index, journal_entry)
+
+    ##############################################
+
+    def _index_entry(self, index, journal_entry):
+
+        ordinal = journal_entry.date.toordinal()
+        self._date_index.insert(ordinal, index)
+        for imputation in journal_entry.imputations:
+            for indexes, account in ((self._account_indexes, imputation.account),
+                                     (self._analytic_account_indexes, imputation.analytic_account)):
+                if account is not None:
+                    date_index = indexes.get(account.number)
+                    if date_index is None:
+                        date_index = indexes[account.number] = DateSortedIndex()
+                    # an account can only be imputed once per entry
+                    date_index.insert(ordinal, index)
 
     ##############################################
 
@@ -88,26 +222,84 @@ class JournalInMemory(Journal):
         # Fixme: not here
         # self._account_chart.reset()
         # self._analytic_account_chart.reset()
-        for journal_entry in self._journal_entries:
+        for journal_entry in self:
             journal_entry.apply()
 
     ##############################################
 
-    def filter(self, account=None, start_date=None, stop_date=None):
+    @staticmethod
+    def _account_number(account):
+
+        return getattr(account, 'number', account)
+
+    ##############################################
+
+    def filter(self,
+               account=None, analytic_account=None,
+               start_date=None, stop_date=None,
+               min_amount=None, max_amount=None,
+    ):
+
+        """Iterate in date order over the journal entries matching all the given predicates.
+
+        *account* and *analytic_account* are account instances or numbers, the dates are included.
+        If both accounts are given, they must be imputed by the same imputation.  The amount bounds
+        apply to the imputation of the accounts, else to the sum of the debits.
+
+        """
+
+        account = self._account_number(account)
+        analytic_account = self._account_number(analytic_account)
+
+        # Pick the index, and check the other account on the entry
+        if account is not None:
+            date_index = self._account_indexes.get(account)
+        elif analytic_account is not None:
+            date_index = self._analytic_account_indexes.get(analytic_account)
+        else:
+            date_index = self._date_index
+        if date_index is None:
+            return
+
+        check_amount = min_amount is not None or max_amount is not None
+        for index in date_index.values(start_date, stop_date):
+            journal_entry = self[index]
+            if ((account is not None and analytic_account is not None) or check_amount):
+                amount = self._match_entry(journal_entry, account, analytic_account)
+                if amount is None:
+                    continue
+                if ((min_amount is not None and amount < min_amount) or
+                    (max_amount is not None and amount > max_amount)):
+                    continue
+            yield journal_entry
 
-        # Fixme: use index
+    ##############################################
+
+    def _match_entry(self, journal_entry, account, analytic_account):
+
+        """Return the amount to compare if the entry matches the accounts, else None."""
 
-        for journal_entry in self._journal_entries:
-            match = True
-            # nA + A.B
-            if account is not None and journal_entry.account != account:
-                match = False
-            if start_date is not None and start_date <= journal_entry.date:
-                match = False
-            if stop_date is not None and journal_entry.date <= stop_date:
-                match = False
-            if match:
-                yield journal_entry
+        if account is None and analytic_account is None:
+            return journal_entry.sum_of_debits()
+        for imputation in journal_entry.imputations:
+            if account is not None and imputation.account.number != account:
+                continue
+            if analytic_account is not None:
+                imputation_analytic_account = imputation.analytic_account
+                if (imputation_analytic_account is None or
+                    imputation_analytic_account.number != analytic_account):
+                    continue
+            return imputation.amount
+        return None
+
+    ##############################################
+
+    def iter_json(self):
+
+        """Iterate over the journal entries as JSON"""
+
+        for journal_entry in self:
+            yield journal_entry.to_json()
 
     ##############################################
 
@@ -115,7 +307,21 @@ class JournalInMemory(Journal):
 
         """Save the journal to JSON"""
 
-        return [journal_entry.to_json() for journal_entry in self]
+        return list(self.iter_json())
+
+    ##############################################
+
+    def load_json_entry(self, data):
+
+        """Load a journal entry from JSON and return the stored entry, the sequence allocator is not
+        updated.
+
+        """
+
+        journal_entry = self.journal_entry_from_json(data)
+        journal_entry = self.write_entry(journal_entry)
+        self._index_postings((journal_entry,))
+        return journal_entry
 
     ##############################################
 
@@ -123,8 +329,9 @@ class JournalInMemory(Journal):
 
         """Load a journal entry from JSON""" # but not: and apply it
 
+        # entries are not necessarily in sequence order
+        high_water_mark = 0
         for journal_entry_json in data:
-            journal_entry = self.journal_entry_from_json(journal_entry_json)
-            self.write_entry(journal_entry)
-        # Fixme: in-order !!!
-        self._next_id = SequentialId(self._journal_entries[-1].sequence_number)
+            journal_entry = self.load_json_entry(journal_entry_json)
+            high_water_mark = max(high_water_mark, journal_entry.sequence_number)
+        self._next_id.advance_to(high_water_mark)
@@ -0,0 +1,216 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+"""This module implements a read-only journal on top of a memory mapped binary journal file.
+
+The file is written by :func:`FinancialSimulator.Accounting.BackendStore.Binary.write_journal`,
+and the journal is opened without deserialising the entries, thus several processes can share the
+same journal, e.g. the workers of a simulation or of a web server.  The file is replaced
+atomically, :meth:`JournalMapped.reload` maps the last version.
+
+The entries of a mapped journal are not added to the posting index of the financial period.
+
+"""
+
+####################################################################################################
+
+import logging
+import os
+
+import numpy as np
+
+####################################################################################################
+
+from .BackendStore.Binary import MappedImputationStore, write_journal
+from .JournalColumnar import ImputationStore, JournalColumnar
+from FinancialSimulator.Units import to_money
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+class JournalMapped(JournalColumnar):
+
+    """This class implements a read-only journal backed by a :class:`MappedImputationStore`.
+
+    The journal file is ``<label>.fsj`` in the directory ``__journal_directory__``, the class must
+    be subclassed so as to set it.  The journal is empty if the file doesn't exist.
+
+    """
+
+    _logger = _module_logger.getChild('JournalMapped')
+
+    __journal_directory__ = None
+    __file_extension__ = '.fsj'
+
+    ##############################################
+
+    def __init__(self, label, description, financial_period):
+
+        super().__init__(label, description, financial_period)
+
+        if self.__journal_directory__ is None:
+            raise ValueError("The journal directory is not set")
+        self._path = os.path.join(self.__journal_directory__, label + self.__file_extension__)
+        self.reload()
+
+    ##############################################
+
+    @property
+    def path(self):
+        return self._path
+
+    ##############################################
+
+    def reload(self):
+
+        """Map the journal file"""
+
+        if os.path.exists(self._path):
+            self._store = MappedImputationStore(self._path)
+        else:
+            self._store = ImputationStore()
+        # lazy indexes
+        self._sequence_order = None
+        self._date_order = None
+        self._sorted_dates = None
+
+        sequence_numbers = self._store.sequence_numbers
+        if sequence_numbers.size:
+            self._next_id.advance_to(int(sequence_numbers.max()))
+
+    ##############################################
+
+    @classmethod
+    def save(cls, journal):
+
+        """Write *journal* to the journal file of its label"""
+
+        if cls.__journal_directory__ is None:
+            raise ValueError("The journal directory is not set")
+        os.makedirs(cls.__journal_directory__, exist_ok=True)
+        path = os.path.join(cls.__journal_directory__, journal.label + cls.__file_extension__)
+        return write_journal(journal, path)
+
+    ##############################################
+
+    def write_entry(self, journal_entry):
+
+        raise NotImplementedError("A mapped journal is read-only")
+
+    ##############################################
+
+    def entry_by_sequence_number(self, sequence_number):
+
+        sequence_numbers = self._store.sequence_numbers
+        if self._sequence_order is None:
+            if np.all(sequence_numbers[1:] > sequence_numbers[:-1]):
+                self._sequence_order = False
+            else:
+                self._sequence_order = np.argsort(sequence_numbers, kind='stable')
+
+        if self._sequence_order is False:
+            index = int(np.searchsorted(sequence_numbers, sequence_number))
+        else:
+            position = int(np.searchsorted(sequence_numbers, sequence_number, sorter=self._sequence_order))
+            index = int(self._sequence_order[position]) if position < len(self) else position
+        if index < len(self) and sequence_numbers[index] == sequence_number:
+            return self._view(index)
+        else:
+            raise KeyError(sequence_number)
+
+    ##############################################
+
+    def _date_range(self, indexes, start_date, stop_date):
+
+        """Return the entry *indexes* from *start_date* to *stop_date* included in date order, the
+        order of entries of the same date is preserved.
+
+        """
+
+        ordinals = self._store.entry_dates[indexes]
+        if start_date is not None:
+            mask = ordinals >= start_date.toordinal()
+            if stop_date is not None:
+                mask &= ordinals <= stop_date.toordinal()
+        elif stop_date is not None:
+            mask = ordinals <= stop_date.toordinal()
+        else:
+            mask = None
+        if mask is not None:
+            indexes = indexes[mask]
+            ordinals = ordinals[mask]
+        return indexes[np.argsort(ordinals, kind='stable')]
+
+    ##############################################
+
+    def entries_between(self, start_date=None, stop_date=None):
+
+        """Return the journal entries from *start_date* to *stop_date* included in date order"""
+
+        if self._date_order is None:
+            self._date_order = np.argsort(self._store.entry_dates, kind='stable')
+            self._sorted_dates = self._store.entry_dates[self._date_order]
+        order = self._date_order
+        ordinals = self._sorted_dates
+        lower = 0 if start_date is None else np.searchsorted(ordinals, start_date.toordinal(), side='left')
+        upper = len(order) if stop_date is None else np.searchsorted(ordinals, stop_date.toordinal(), side='right')
+        return [self._view(int(index)) for index in order[lower:upper]]
+
+    ##############################################
+
+    def filter(self,
+               account=None, analytic_account=None,
+               start_date=None, stop_date=None,
+               min_amount=None, max_amount=None,
+    ):
+
+        # The predicates are evaluated on the columns of the store
+        store = self._store
+        account = self._account_number(account)
+        analytic_account = self._account_number(analytic_account)
+
+        if account is not None or analytic_account is not None:
+            mask = np.ones(store.number_of_imputations, dtype=bool)
+            if account is not None:
+                mask &= store.accounts == account
+            if analytic_account is not None:
+                mask &= store.analytic_accounts == analytic_account
+            indexes = store.entry_indexes[mask]
+            amounts = np.abs(store.amounts[mask])
+        else:
+            indexes = np.arange(store.number_of_entries)
+            amounts = np.zeros(store.number_of_entries, dtype=np.int64)
+            is_debits = store.is_debits
+            np.add.at(amounts, store.entry_indexes[is_debits], store.amounts[is_debits])
+
+        if min_amount is not None or max_amount is not None:
+            mask = np.ones(indexes.shape[0], dtype=bool)
+            if min_amount is not None:
+                mask &= amounts >= to_money(min_amount).minor_units
+            if max_amount is not None:
+                mask &= amounts <= to_money(max_amount).minor_units
+            indexes = indexes[mask]
+
+        for index in self._date_range(indexes, start_date, stop_date):
+            yield self._view(int(index))
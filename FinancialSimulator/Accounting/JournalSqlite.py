@@ -0,0 +1,609 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+"""This module implements a journal stored in a SQLite database.
+
+The entries are not kept in memory, they are written by batches in one transaction and they are
+read back on demand, the queries by date and by account use the indexes of the tables, see
+:mod:`FinancialSimulator.Accounting.BackendStore.Sqlite`.  The entries are not added to the
+in-memory posting index of the financial period, the ledger of an account is paged by
+:meth:`JournalSqlite.ledger`, thus :attr:`JournalsSqlite.posting_index` is None and the financial
+period should be created with ``__posting_index_factory__ = None``.
+
+"""
+
+####################################################################################################
+
+import datetime
+import itertools
+import logging
+import time
+
+####################################################################################################
+
+from .BackendStore.Sqlite import connect
+from .FinancialPeriod import Journals
+from .Journal import Journal, Imputation
+from FinancialSimulator.Tools.Date import parse_datetime
+from FinancialSimulator.Tools.SequentialId import SequenceAllocator
+from FinancialSimulator.Units import Money, to_money
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+class JournalSqlite(Journal):
+
+    """This class implements a journal stored in a SQLite database.
+
+    Written entries are buffered and inserted every ``__batch_size__`` entries, or at the next write
+    when the oldest pending entry is older than ``__flush_interval__`` seconds.  :meth:`flush` writes
+    the pending entries, the queries, :meth:`Journal.log_entries` and :meth:`JournalsSqlite.close`
+    flush them first.  The rows of an entry are built when it is inserted, the later validations and
+    reconciliations are saved by updates at the next flush.
+
+    The pending entries are lost on a crash, up to ``__batch_size__`` entries or the entries of the
+    last ``__flush_interval__`` seconds, call :meth:`flush` to make them durable.  The high-water mark
+    of the sequence numbers is saved in the same transaction, thus the numbers of the lost entries
+    are reused and the sequence has no gap.  The connection belongs to the thread which opened it,
+    thus nothing is flushed in the background.
+
+    """
+
+    _logger = _module_logger.getChild('JournalSqlite')
+
+    __sequence_allocator_factory__ = SequenceAllocator
+    __batch_size__ = 1000 # entries
+    __flush_interval__ = 1. # seconds
+
+    _ENTRY_COLUMNS = ('e.sequence_number, e.date, e.description, '
+                      'e.validation_date, e.reconciliation_id, e.reconciliation_date, '
+                      'i.account, i.analytic_account, i.is_debit, i.amount')
+
+    ##############################################
+
+    def __init__(self, label, description, financial_period, connection):
+
+        super().__init__(label, description, financial_period)
+        # the postings are queried from the database, see ledger
+        self._posting_index = None
+
+        self._connection = connection
+        self._pending_entries = []
+        # (validation_date, reconciliation_id, reconciliation_date, journal, sequence_number)
+        self._pending_updates = []
+        self._pending_high_water_mark = None
+        self._pending_since = None
+
+        high_water_mark, = connection.execute(
+            'SELECT MAX(sequence_number) FROM journal_entry WHERE journal = ?', (label,)).fetchone()
+        row = connection.execute(
+            'SELECT high_water_mark FROM sequence WHERE journal = ?', (label,)).fetchone()
+        if row is not None:
+            high_water_mark = max(high_water_mark or 0, row[0])
+        self._next_id = self.__sequence_allocator_factory__(high_water_mark or 0, key=label, store=self)
+
+        journal_entry_factory = self.__journal_entry_factory__
+        journal_entry_factory.validated.connect(self._on_state_changed)
+        journal_entry_factory.reconciled.connect(self._on_state_changed)
+
+    ##############################################
+
+    @property
+    def connection(self):
+        return self._connection
+
+    ##############################################
+
+    @property
+    def sequence_allocator(self):
+        return self._next_id
+
+    ##############################################
+
+    def save_high_water_mark(self, key, value):
+
+        # saved with the entries
+        self._pending_high_water_mark = value
+
+    ##############################################
+
+    def generate_sequence_number(self):
+
+        return self._next_id.commit(1)[0]
+
+    ##############################################
+
+    def generate_sequence_numbers(self, count):
+
+        return self._next_id.commit(count)
+
+    ##############################################
+
+    def __len__(self):
+
+        self.flush()
+        count, = self._connection.execute(
+            'SELECT COUNT(*) FROM journal_entry WHERE journal = ?', (self._label,)).fetchone()
+        return count
+
+    ##############################################
+
+    def __bool__(self):
+
+        if self._pending_entries:
+            return True
+        row = self._connection.execute(
+            'SELECT 1 FROM journal_entry WHERE journal = ? LIMIT 1', (self._label,)).fetchone()
+        return row is not None
+
+    ##############################################
+
+    def __iter__(self):
+
+        return self._query_entries()
+
+    ##############################################
+
+    def __getitem__(self, slice_):
+
+        length = len(self)
+        if isinstance(slice_, slice):
+            start, stop, step = slice_.indices(length)
+            if step != 1:
+                return [self[index] for index in range(start, stop, step)]
+            return list(self._query_entries_by_position(start, max(stop - start, 0)))
+        else:
+            if slice_ < 0:
+                slice_ += length
+            if not 0 <= slice_ < length:
+                raise IndexError(slice_)
+            return next(self._query_entries_by_position(slice_, 1))
+
+    ##############################################
+
+    def _entry_rows(self, journal_entry):
+
+        sequence_number = journal_entry.sequence_number
+        date = journal_entry.date.toordinal()
+        entry_row = (
+            self._label,
+            sequence_number,
+            date,
+            journal_entry.description,
+            self._datetime_to_sql(journal_entry.validation_date),
+            journal_entry.reconciliation_id,
+            self._datetime_to_sql(journal_entry.reconciliation_date),
+        )
+        imputation_rows = []
+        for position, imputation in enumerate(journal_entry.imputations):
+            analytic_account = imputation.analytic_account
+            if analytic_account is not None:
+                analytic_account = analytic_account.number
+            imputation_rows.append((
+                self._label,
+                sequence_number,
+                position,
+                date,
+                imputation.account.number,
+                analytic_account,
+                imputation.is_debit(),
+                imputation.amount.minor_units,
+            ))
+        return entry_row, imputation_rows
+
+    ##############################################
+
+    @staticmethod
+    def _datetime_to_sql(value):
+        return value.isoformat() if value is not None else None
+
+    ##############################################
+
+    def write_entry(self, journal_entry):
+
+        now = time.monotonic()
+        if self._pending_since is None:
+            self._pending_since = now
+        self._pending_entries.append(journal_entry)
+        if (len(self._pending_entries) >= self.__batch_size__ or
+            now - self._pending_since >= self.__flush_interval__):
+            self.flush()
+        return journal_entry
+
+    ##############################################
+
+    def write_entries(self, journal_entries):
+
+        self._pending_entries.extend(journal_entries)
+        self.flush()
+        return journal_entries
+
+    ##############################################
+
+    def _on_state_changed(self, signal, sender, **kwargs):
+
+        # the updates follow the inserts, thus they also apply to the pending entries
+        if sender.journal is self:
+            self._pending_updates.append((
+                self._datetime_to_sql(sender.validation_date),
+                sender.reconciliation_id,
+                self._datetime_to_sql(sender.reconciliation_date),
+                self._label,
+                sender.sequence_number,
+            ))
+
+    ##############################################
+
+    def flush(self):
+
+        """Insert the pending entries and save the updates in one transaction"""
+
+        if (self._pending_entries or self._pending_updates or
+            self._pending_high_water_mark is not None):
+            entry_rows = []
+            imputation_rows = []
+            for journal_entry in self._pending_entries:
+                entry_row, rows = self._entry_rows(journal_entry)
+                entry_rows.append(entry_row)
+                imputation_rows.extend(rows)
+            with self._connection:
+                self._connection.executemany(
+                    'INSERT INTO journal_entry VALUES (?, ?, ?, ?, ?, ?, ?)', entry_rows)
+                self._connection.executemany(
+                    'INSERT INTO imputation VALUES (?, ?, ?, ?, ?, ?, ?, ?)', imputation_rows)
+                self._connection.executemany(
+                    'UPDATE journal_entry SET validation_date = ?, reconciliation_id = ?, reconciliation_date = ? '
+                    'WHERE journal = ? AND sequence_number = ?', self._pending_updates)
+                if self._pending_high_water_mark is not None:
+                    self._connection.execute(
+                        'INSERT OR REPLACE INTO sequence VALUES (?, ?)',
+                        (self._label, self._pending_high_water_mark))
+            self._logger.debug("{}: wrote {} entries and {} updates".format(
+                self._label, len(entry_rows), len(self._pending_updates)))
+            self._pending_entries = []
+            self._pending_updates = []
+            self._pending_high_water_mark = None
+        self._pending_since = None
+
+    ##############################################
+
+    def _discard_entries(self, journal_entries):
+
+        sequence_numbers = [journal_entry.sequence_number for journal_entry in journal_entries]
+        discarded = set(sequence_numbers)
+        self._pending_entries = [journal_entry for journal_entry in self._pending_entries
+                                 if journal_entry.sequence_number not in discarded]
+        with self._connection:
+            for table in 'journal_entry', 'imputation':
+                self._connection.executemany(
+                    'DELETE FROM {} WHERE journal = ? AND sequence_number = ?'.format(table),
+                    [(self._label, sequence_number) for sequence_number in sequence_numbers])
+        self._next_id.cancel(range(min(sequence_numbers), max(sequence_numbers) +1))
+
+    ##############################################
+
+    def _make_entry(self, rows):
+
+        (sequence_number, date, description,
+         validation_date, reconciliation_id, reconciliation_date) = rows[0][:6]
+
+        imputations = []
+        for account, analytic_account, is_debit, amount in (row[6:] for row in rows):
+            account = self._account_chart[account]
+            if analytic_account is not None:
+                analytic_account = self._analytic_account_chart[analytic_account]
+            if is_debit:
+                factory = self.__debit_imputation_data_factory__
+            else:
+                factory = self.__credit_imputation_data_factory__
+            imputations.append(factory(account, Money(amount, account.devise), analytic_account,
+                                       resolved=True))
+
+        internal_data = {
+            'validation_date': parse_datetime(validation_date) if validation_date is not None else None,
+            'reconciliation_id': reconciliation_id,
+            'reconciliation_date': (parse_datetime(reconciliation_date)
+                                    if reconciliation_date is not None else None),
+        }
+
+        return self.__journal_entry_factory__(self,
+                                              sequence_number,
+                                              datetime.date.fromordinal(date),
+                                              description,
+                                              None,
+                                              imputations,
+                                              _internal_data=internal_data,
+        )
+
+    ##############################################
+
+    def _query_entries(self, where='', parameters=(), order='e.sequence_number'):
+
+        """Iterate over the journal entries matching the SQL *where* clause, the rows are fetched
+        incrementally.
+
+        """
+
+        self.flush()
+        query = ('SELECT {} FROM journal_entry e '
+                 'JOIN imputation i ON i.journal = e.journal AND i.sequence_number = e.sequence_number '
+                 'WHERE e.journal = ? {} ORDER BY {}, e.sequence_number, i.position').format(
+                     self._ENTRY_COLUMNS, where, order)
+        cursor = self._connection.execute(query, (self._label,) + tuple(parameters))
+        for sequence_number, rows in itertools.groupby(cursor, key=lambda row: row[0]):
+            yield self._make_entry(list(rows))
+
+    ##############################################
+
+    def _query_entries_by_position(self, offset, limit):
+
+        return self._query_entries(
+            'AND e.sequence_number IN (SELECT sequence_number FROM journal_entry WHERE journal = ? '
+            'ORDER BY sequence_number LIMIT ? OFFSET ?)',
+            (self._label, limit, offset))
+
+    ##############################################
+
+    def entry_by_sequence_number(self, sequence_number):
+
+        for journal_entry in self._query_entries('AND e.sequence_number = ?', (sequence_number,)):
+            return journal_entry
+        raise KeyError(sequence_number)
+
+    ##############################################
+
+    @staticmethod
+    def _date_clause(start_date, stop_date, column='e.date'):
+
+        clauses = []
+        parameters = []
+        if start_date is not None:
+            clauses.append('AND {} >= ?'.format(column))
+            parameters.append(start_date.toordinal())
+        if stop_date is not None:
+            clauses.append('AND {} <= ?'.format(column))
+            parameters.append(stop_date.toordinal())
+        return clauses, parameters
+
+    ##############################################
+
+    def entries_between(self, start_date=None, stop_date=None):
+
+        """Iterate in date order over the journal entries from *start_date* to *stop_date* included"""
+
+        clauses, parameters = self._date_clause(start_date, stop_date)
+        return self._query_entries(' '.join(clauses), parameters, order='e.date')
+
+    ##############################################
+
+    @staticmethod
+    def _account_number(account):
+
+        return getattr(account, 'number', account)
+
+    ##############################################
+
+    def filter(self,
+               account=None, analytic_account=None,
+               start_date=None, stop_date=None,
+               min_amount=None, max_amount=None,
+    ):
+
+        """Iterate in date order over the journal entries matching all the given predicates, see
+        :meth:`FinancialSimulator.Accounting.JournalInMemory.JournalInMemory.filter`.
+
+        """
+
+        account = self._account_number(account)
+        analytic_account = self._account_number(analytic_account)
+
+        clauses, parameters = self._date_clause(start_date, stop_date)
+
+        # Select the sequence numbers on the imputations
+        imputation_clauses = []
+        imputation_parameters = [self._label]
+        if account is not None:
+            imputation_clauses.append('AND account = ?')
+            imputation_parameters.append(account)
+        if analytic_account is not None:
+            imputation_clauses.append('AND analytic_account = ?')
+            imputation_parameters.append(analytic_account)
+        amount_clauses = []
+        for bound, operator in ((min_amount, '>='), (max_amount, '<=')):
+            if bound is not None:
+                amount_clauses.append(operator + ' ?')
+                imputation_parameters.append(to_money(bound).minor_units)
+
+        if account is not None or analytic_account is not None:
+            imputation_clauses.extend('AND amount ' + clause for clause in amount_clauses)
+            imputation_query = ' '.join(imputation_clauses)
+        elif amount_clauses:
+            # compare the sum of the debits
+            imputation_query = 'AND is_debit GROUP BY sequence_number HAVING ' + \
+                               ' AND '.join('SUM(amount) ' + clause for clause in amount_clauses)
+        else:
+            imputation_query = None
+
+        if imputation_query is not None:
+            clauses.append('AND e.sequence_number IN '
+                           '(SELECT sequence_number FROM imputation WHERE journal = ? {})'.format(imputation_query))
+            parameters.extend(imputation_parameters)
+
+        return self._query_entries(' '.join(clauses), parameters, order='e.date')
+
+    ##############################################
+
+    def number_of_postings(self, account, start_date=None, stop_date=None):
+
+        self.flush()
+        clauses, parameters = self._date_clause(start_date, stop_date, column='date')
+        query = 'SELECT COUNT(*) FROM imputation WHERE journal = ? AND account = ? ' + ' '.join(clauses)
+        count, = self._connection.execute(
+            query, [self._label, self._account_number(account)] + parameters).fetchone()
+        return count
+
+    ##############################################
+
+    def ledger(self, account, start_date=None, stop_date=None, offset=0, limit=None):
+
+        """Iterate in date order over the imputations of an account, *offset* and *limit* page the
+        imputations.
+
+        """
+
+        number = self._account_number(account)
+        clauses, parameters = self._date_clause(start_date, stop_date, column='date')
+        query = ('AND e.sequence_number IN (SELECT sequence_number FROM imputation '
+                 'WHERE journal = ? AND account = ? {} '
+                 'ORDER BY date, sequence_number LIMIT ? OFFSET ?)').format(' '.join(clauses))
+        parameters = [self._label, number] + parameters + [-1 if limit is None else limit, offset]
+        for journal_entry in self._query_entries(query, parameters, order='e.date'):
+            for imputation in journal_entry.imputations:
+                if imputation.account.number == number:
+                    yield imputation
+
+    ##############################################
+
+    def _sum_by_account(self, analytic=False):
+
+        self.flush()
+        column = 'analytic_account' if analytic else 'account'
+        query = ('SELECT {0}, '
+                 'TOTAL(CASE WHEN is_debit THEN amount ELSE 0 END), '
+                 'TOTAL(CASE WHEN is_debit THEN 0 ELSE amount END) '
+                 'FROM imputation WHERE journal = ? AND {0} IS NOT NULL GROUP BY {0}').format(column)
+        for number, debit, credit in self._connection.execute(query, (self._label,)):
+            yield number, int(debit), int(credit)
+
+    ##############################################
+
+    def sum_by_account(self):
+
+        """Return a dictionary mapping account numbers to a (debit, credit) tuple"""
+
+        account_chart = self._account_chart
+        sums = {}
+        for number, debit, credit in self._sum_by_account():
+            devise = account_chart[number].devise
+            sums[number] = (Money(debit, devise), Money(credit, devise))
+        return sums
+
+    ##############################################
+
+    def run(self):
+
+        # The imputations must be replayed one by one when someone listen them
+        if Imputation.imputed.has_listeners():
+            for journal_entry in self:
+                journal_entry.apply()
+        else:
+            charts = [(self._account_chart, False)]
+            if self._analytic_account_chart is not None:
+                charts.append((self._analytic_account_chart, True))
+            for account_chart, analytic in charts:
+                for number, debit, credit in self._sum_by_account(analytic):
+                    account = account_chart[number]
+                    if debit:
+                        account.apply_debit(Money(debit, account.devise))
+                    if credit:
+                        account.apply_credit(Money(credit, account.devise))
+
+    ##############################################
+
+    def iter_json(self):
+
+        """Iterate over the journal entries as JSON"""
+
+        for journal_entry in self:
+            yield journal_entry.to_json()
+
+    ##############################################
+
+    def to_json(self):
+
+        return list(self.iter_json())
+
+    ##############################################
+
+    def load_json(self, data):
+
+        """Load journal entries from JSON, they are not applied"""
+
+        high_water_mark = 0
+        for journal_entry_json in data:
+            journal_entry = self.write_entry(self.journal_entry_from_json(journal_entry_json))
+            self._index_postings((journal_entry,))
+            high_water_mark = max(high_water_mark, journal_entry.sequence_number)
+        self.flush()
+        self._next_id.advance_to(high_water_mark)
+
+####################################################################################################
+
+class JournalsSqlite(Journals):
+
+    """This class implements the journals of a financial period stored in the SQLite database
+    ``__database_path__``, the class must be subclassed so as to set it.
+
+    """
+
+    __journal_factory__ = JournalSqlite
+    __database_path__ = None
+
+    ##############################################
+
+    def __init__(self, financial_period, journals):
+
+        if self.__database_path__ is None:
+            raise ValueError("The database path is not set")
+        self._connection = connect(self.__database_path__)
+
+        super().__init__(financial_period, journals)
+        # the entries are not indexed in memory
+        self._posting_index = None
+
+    ##############################################
+
+    def _make_journal(self, label, description, financial_period):
+
+        return self.__journal_factory__(label, description, financial_period, self._connection)
+
+    ##############################################
+
+    @property
+    def connection(self):
+        return self._connection
+
+    ##############################################
+
+    def flush(self):
+
+        for journal in self:
+            journal.flush()
+
+    ##############################################
+
+    def close(self):
+
+        self.flush()
+        self._connection.close()
@@ -0,0 +1,242 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+"""This module implements a journal persisted by a write-ahead log.
+
+Each written journal entry is appended to the log of the journal, and the log is periodically
+compacted into a snapshot of the journal.  At startup, the journal is recovered from the snapshot and
+the log.  Like :meth:`JournalInMemory.load_json`, the recovered entries are not applied, use
+:meth:`run`.
+
+The first record of a log is its epoch, a snapshot stores the epoch of the next log, thus a log
+which was compacted in a snapshot before a crash is not replayed twice.
+
+The other records are the written entries, and the updates of the entries: a validation, a
+reconciliation or the discard of the entries of a failed batch.  The sequence numbers are
+allocated when the entries are committed, thus the high-water mark is recovered from the logged
+entries without gap.
+
+"""
+
+####################################################################################################
+
+import json
+import logging
+import os
+
+####################################################################################################
+
+from .BackendStore.WriteAheadLog import WriteAheadLog
+from .JournalInMemory import JournalInMemory
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+class JournalWriteAheadLog(JournalInMemory):
+
+    """This class implements an in-memory journal persisted by a write-ahead log.
+
+    The log and the snapshot are stored in the directory ``__log_directory__``, the class must be
+    subclassed so as to set it.
+
+    An entry is applied in memory when it is written, but it is only durable when :meth:`commit`
+    returns, or at most ``__fsync_interval__`` seconds later.  Set ``__fsync_interval__`` to 0 so as
+    to synchronise the log before :meth:`log_entry` returns.
+
+    """
+
+    _logger = _module_logger.getChild('JournalWriteAheadLog')
+
+    __log_directory__ = None
+    __group_size__ = 64
+    __fsync_interval__ = 1. # s
+    __compaction_threshold__ = 10000 # records
+
+    ##############################################
+
+    def __init__(self, label, description, financial_period):
+
+        super().__init__(label, description, financial_period)
+
+        if self.__log_directory__ is None:
+            raise ValueError("The log directory is not set")
+        os.makedirs(self.__log_directory__, exist_ok=True)
+        self._log_path = os.path.join(self.__log_directory__, label + '.wal')
+        self._snapshot_path = os.path.join(self.__log_directory__, label + '.snapshot.json')
+
+        self._log = WriteAheadLog(self._log_path, self.__group_size__, self.__fsync_interval__)
+        self._epoch = 0
+        self._replaying = False
+        self._recover()
+
+        # the state changes of the entries are logged
+        journal_entry_factory = self.__journal_entry_factory__
+        journal_entry_factory.validated.connect(self._on_validated)
+        journal_entry_factory.reconciled.connect(self._on_reconciled)
+
+    ##############################################
+
+    @property
+    def log(self):
+        return self._log
+
+    ##############################################
+
+    def _recover(self):
+
+        high_water_mark = 0
+        journal_entries = []
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path) as f:
+                snapshot = json.load(f)
+            self._epoch = snapshot['epoch']
+            high_water_mark = snapshot['high_water_mark']
+            journal_entries = snapshot['journal_entries']
+
+        records = self._log.replay()
+        if records and records[0].get('epoch') == self._epoch:
+            journal_entries = self._replay(journal_entries, records[1:])
+        else:
+            # new log or log already compacted
+            self._log.reset([{'epoch': self._epoch}])
+
+        self._replaying = True
+        try:
+            self.load_json(journal_entries)
+        finally:
+            self._replaying = False
+        self._next_id.advance_to(high_water_mark)
+        self._logger.info("Journal {} recovered {} entries".format(self.label, len(journal_entries)))
+
+    ##############################################
+
+    @staticmethod
+    def _replay(journal_entries, records):
+
+        """Apply the log records to the JSON entries of the snapshot and return the entries"""
+
+        entries = {journal_entry['sequence_number']:journal_entry for journal_entry in journal_entries}
+        for record in records:
+            if 'discard' in record:
+                for sequence_number in record['discard']:
+                    entries.pop(sequence_number, None)
+            elif 'validate' in record:
+                journal_entry = entries.get(record['validate'])
+                if journal_entry is not None:
+                    journal_entry['validation_date'] = record['date']
+            elif 'reconcile' in record:
+                journal_entry = entries.get(record['reconcile'])
+                if journal_entry is not None:
+                    journal_entry['reconciliation_id'] = record['id']
+                    journal_entry['reconciliation_date'] = record['date']
+            else:
+                entries[record['sequence_number']] = record
+        return list(entries.values())
+
+    ##############################################
+
+    def _on_validated(self, signal, sender, **kwargs):
+
+        if sender.journal is self and not self._replaying:
+            self._log.append({'validate': sender.sequence_number,
+                              'date': str(sender.validation_date)})
+
+    ##############################################
+
+    def _on_reconciled(self, signal, sender, **kwargs):
+
+        if sender.journal is self and not self._replaying:
+            self._log.append({'reconcile': sender.sequence_number,
+                              'id': sender.reconciliation_id,
+                              'date': str(sender.reconciliation_date)})
+
+    ##############################################
+
+    def write_entry(self, journal_entry):
+
+        journal_entry = super().write_entry(journal_entry)
+        if not self._replaying:
+            self._log.append(journal_entry.to_json())
+            self._compact_if_needed()
+        return journal_entry
+
+    ##############################################
+
+    def write_entries(self, journal_entries):
+
+        written_entries = [super(JournalWriteAheadLog, self).write_entry(journal_entry)
+                           for journal_entry in journal_entries]
+        # group commit
+        self._log.extend([journal_entry.to_json() for journal_entry in written_entries])
+        self._compact_if_needed()
+        return written_entries
+
+    ##############################################
+
+    def _discard_entries(self, journal_entries):
+
+        super()._discard_entries(journal_entries)
+        self._log.append({'discard': [journal_entry.sequence_number for journal_entry in journal_entries]})
+
+    ##############################################
+
+    def commit(self, sync=True):
+
+        """Write the pending log records and synchronise the log"""
+
+        self._log.commit(sync)
+
+    ##############################################
+
+    def _compact_if_needed(self):
+
+        if len(self._log) > self.__compaction_threshold__:
+            self.compact()
+
+    ##############################################
+
+    def compact(self):
+
+        """Write a snapshot of the journal and truncate the log"""
+
+        self._log.commit(sync=True)
+        self._epoch += 1
+        snapshot = {
+            'epoch': self._epoch,
+            'high_water_mark': self._next_id.high_water_mark,
+            'journal_entries': self.to_json(),
+        }
+        tmp_path = self._snapshot_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._snapshot_path)
+        self._log.reset([{'epoch': self._epoch}])
+
+    ##############################################
+
+    def close(self):
+
+        self._log.close()
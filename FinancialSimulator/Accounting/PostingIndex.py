@@ -0,0 +1,203 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+"""This module implements an index of the postings of the accounts, i.e. the general ledger.
+
+The index is updated when a journal entry is logged, in O(1) per imputation, and maps each account
+to its imputations across all the journals of a financial period, in posting order.
+
+"""
+
+####################################################################################################
+
+from operator import attrgetter
+import heapq
+import itertools
+import logging
+
+####################################################################################################
+
+from FinancialSimulator.Tools.Currency import format_currency
+from FinancialSimulator.Units import Money
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+class Posting:
+
+    """This class stores an imputation and the inner balance of its account after it."""
+
+    __slots__ = ('_order', '_imputation', '_balance')
+
+    ##############################################
+
+    def __init__(self, order, imputation, balance):
+
+        self._order = order
+        self._imputation = imputation
+        self._balance = balance # minor units
+
+    ##############################################
+
+    @property
+    def order(self):
+        return self._order
+
+    @property
+    def imputation(self):
+        return self._imputation
+
+    @property
+    def journal_entry(self):
+        return self._imputation.journal_entry
+
+    @property
+    def date(self):
+        return self._imputation.date
+
+    ##############################################
+
+    @property
+    def balance(self):
+        return Money(self._balance, self._imputation.devise)
+
+    ##############################################
+
+    @property
+    def balance_str(self):
+        return format_currency(self.balance)
+
+####################################################################################################
+
+class PostingIndex:
+
+    """This class indexes the imputations of a financial period by account.
+
+    Accounts can be given as instances or numbers.
+
+    """
+
+    _logger = _module_logger.getChild('PostingIndex')
+
+    __posting_factory__ = Posting
+
+    ##############################################
+
+    def __init__(self, account_chart, analytic_account_chart=None):
+
+        self._account_chart = account_chart
+        self._analytic_account_chart = analytic_account_chart
+        self._postings = {} # account number -> [Posting]
+        self._analytic_postings = {}
+        self._counter = itertools.count()
+
+    ##############################################
+
+    def _add_posting(self, postings, account, imputation, order):
+
+        account_postings = postings.get(account.number)
+        if account_postings is None:
+            account_postings = postings[account.number] = []
+            balance = 0
+        else:
+            balance = account_postings[-1]._balance
+        amount = imputation.amount.minor_units
+        if imputation.is_debit():
+            balance -= amount
+        else:
+            balance += amount
+        account_postings.append(self.__posting_factory__(order, imputation, balance))
+
+    ##############################################
+
+    def add_entry(self, journal_entry):
+
+        for imputation in journal_entry.imputations:
+            order = next(self._counter)
+            self._add_posting(self._postings, imputation.account, imputation, order)
+            analytic_account = imputation.analytic_account
+            if analytic_account is not None:
+                self._add_posting(self._analytic_postings, analytic_account, imputation, order)
+
+    ##############################################
+
+    def _chart_postings(self, analytic):
+
+        if analytic:
+            return self._analytic_account_chart, self._analytic_postings
+        else:
+            return self._account_chart, self._postings
+
+    ##############################################
+
+    def postings(self, account, analytic=False):
+
+        """Return the list of the postings of an account, it must not be modified."""
+
+        postings = self._chart_postings(analytic)[1]
+        return postings.get(getattr(account, 'number', account), [])
+
+    ##############################################
+
+    def number_of_postings(self, account, analytic=False):
+
+        return len(self.postings(account, analytic))
+
+    ##############################################
+
+    @staticmethod
+    def number_of_pages(number_of_postings, page_size):
+
+        return max(1, (number_of_postings + page_size - 1) // page_size)
+
+    ##############################################
+
+    def page(self, account, page=0, page_size=50, analytic=False):
+
+        start = page * page_size
+        return self.postings(account, analytic)[start:start + page_size]
+
+    ##############################################
+
+    def iter_subtree(self, account, analytic=False):
+
+        """Iterate in posting order over the postings of an account and its descendants."""
+
+        account_chart, postings = self._chart_postings(analytic)
+        if not hasattr(account, 'depth_first_search'):
+            account = account_chart[account]
+        iterables = [postings[node.number]
+                     for node in account.depth_first_search()
+                     if node.number in postings]
+        if len(iterables) == 1:
+            return iter(iterables[0])
+        else:
+            return heapq.merge(*iterables, key=attrgetter('order'))
+
+    ##############################################
+
+    def subtree_page(self, account, page=0, page_size=50, analytic=False):
+
+        start = page * page_size
+        return list(itertools.islice(self.iter_subtree(account, analytic), start, start + page_size))
@@ -22,13 +22,15 @@
 
 import logging
 import os
+import threading
+import weakref
 import yaml
 
 ####################################################################################################
 
-from FinancialSimulator.HDL.Ast import Variable, Assignation
+from FinancialSimulator.HDL.Ast import Variable, Assignation, Account as AccountReference, AccountInterval
 from FinancialSimulator.HDL.HdlParser import HdlAccountParser
-from FinancialSimulator.HDL.Evaluator import AccountEvaluator, AccountSetEvaluator
+from FinancialSimulator.HDL.Evaluator import AccountEvaluator, ArrayAccountEvaluator, AccountSetEvaluator
 from FinancialSimulator.Tools import Hierarchy
 from FinancialSimulator.Tools.Currency import format_currency
 import FinancialSimulator.Config.ConfigInstall as ConfigInstall
@@ -113,6 +115,10 @@ class ValueRow(Row):
         super().__init__(level, title)
 
         self._computation = computation
+        # flat hierarchy of the account chart -> {compiler: compiled computation}
+        # The programs only depend on the chart structure, thus the balances, e.g. a series per
+        # scenario, share the same entry which is dropped with the structure.
+        self._compiled_computations = weakref.WeakKeyDictionary()
 
     ##############################################
 
@@ -122,10 +128,26 @@ class ValueRow(Row):
 
     ##############################################
 
+    def compiled_computation(self, compiler, account_chart):
+
+        compiled_computations = self._compiled_computations.setdefault(account_chart.flatten(), {})
+        compiled_computation = compiled_computations.get(compiler, None)
+        if compiled_computation is None:
+            compiled_computation = compiler.compile(self._computation, account_chart)
+            compiled_computations[compiler] = compiled_computation
+        return compiled_computation
+
+    ##############################################
+
     def compute(self, visitor):
 
         if self._computation is not None:
-            return visitor.evaluator.run_ast_program(self._computation)
+            if visitor.set_evaluator:
+                return visitor.evaluator.run_ast_program(self._computation)
+            else:
+                evaluator = visitor.evaluator
+                compiled_computation = self.compiled_computation(evaluator.compiler, visitor.account_chart)
+                return evaluator.run_compiled_program(compiled_computation)
         else:
             if visitor.set_evaluator:
                 return set()
@@ -197,18 +219,33 @@ class ComputationVisitor:
 
     ##############################################
 
-    def __init__(self, account_chart, set_evaluator=False):
+    def __init__(self, account_chart, set_evaluator=False, array_evaluator=False):
+
+        """When *array_evaluator* is set, *account_chart* is an
+        :class:`FinancialSimulator.Accounting.FinancialPeriod.AccountChartBalanceSeries` and the
+        values are arrays.
 
+        """
+
+        self._account_chart = account_chart
         self._set_evaluator = set_evaluator
         if set_evaluator:
-            evaluator = AccountSetEvaluator
+            self._evaluator = AccountSetEvaluator(account_chart)
+        elif array_evaluator:
+            self._evaluator = ArrayAccountEvaluator(account_chart)
         else:
-            evaluator = AccountEvaluator
-        self._evaluator = evaluator(account_chart)
+            # Compute all the balances in one pass
+            self._evaluator = AccountEvaluator(account_chart.compute_balances())
+        # The visitor is shared by the threads of the web application
+        self._lock = threading.RLock()
         self.reset()
 
     ##############################################
 
+    @property
+    def account_chart(self):
+        return self._account_chart
+
     @property
     def set_evaluator(self):
         return self._set_evaluator
@@ -227,12 +264,33 @@ class ComputationVisitor:
 
     ##############################################
 
+    def update(self, account_chart, nodes):
+
+        """Update the balances from *account_chart* and invalidate the cached values of *nodes*."""
+
+        with self._lock:
+            self._evaluator.account_chart = account_chart.compute_balances()
+            for node in nodes:
+                self._cache.pop(id(node), None)
+
+    ##############################################
+
+    def is_cached(self, node):
+
+        return id(node) in self._cache
+
+    ##############################################
+
     def compute(self, node):
 
         node_id = id(node)
-        if node_id in self._cache:
+        try:
             return self._cache[node_id]
-        else:
+        except KeyError:
+            pass
+        with self._lock:
+            if node_id in self._cache:
+                return self._cache[node_id]
             value = node.compute(self)
             self._cache[node_id] = value
             return value
@@ -266,6 +324,19 @@ class Table:
         self._assignation_to_row = None
         self._variable_to_dependency_node = None
 
+        # row id -> (row, rows, account intervals)
+        self._row_dependencies = None
+        # row id -> rows which depend on it
+        self._row_dependents = None
+        # [(account, rows which depend on it)] for the computation chart
+        self._account_dependents = None
+
+        # State of the incremental computation, shared by the threads of the web application
+        self._computation_lock = threading.Lock()
+        self._computation_chart = None
+        self._computation_visitor = None
+        self._computation_version = None
+
     ##############################################
 
     def append_column(self, column):
@@ -302,6 +373,77 @@ class Table:
                 node.add_sibling(variable_to_dependency_node[operand])
         self._variable_to_dependency_node = variable_to_dependency_node
 
+        self._make_row_dependencies(variables)
+
+    ##############################################
+
+    def _make_row_dependencies(self, variables):
+
+        """Record for each row the rows and the account intervals it depends on."""
+
+        self._row_dependencies = {}
+        self._row_dependents = {}
+        for column in self:
+            for row in column.node.depth_first_search():
+                rows = []
+                intervals = []
+                if isinstance(row, SumRow):
+                    rows = list(row)
+                elif isinstance(row, ValueRow) and row.computation is not None:
+                    for statement in row.computation:
+                        for node in statement.depth_first_search():
+                            if isinstance(node, Variable):
+                                if str(node) in variables:
+                                    rows.append(variables[str(node)])
+                            elif isinstance(node, AccountReference):
+                                intervals.append((int(node), int(node)))
+                            elif isinstance(node, AccountInterval):
+                                intervals.append((node.inf, node.sup))
+                elif not isinstance(row, EmptyRow):
+                    continue
+                self._row_dependencies[id(row)] = (row, rows, intervals)
+                for dependency in rows:
+                    self._row_dependents.setdefault(id(dependency), []).append(row)
+
+    ##############################################
+
+    def _make_account_dependents(self, account_chart):
+
+        """Record for each account of *account_chart* the rows which depend on it."""
+
+        account_dependents = {}
+        for row, rows, intervals in self._row_dependencies.values():
+            for inf, sup in intervals:
+                for number in account_chart.numbers_in_range(inf, sup):
+                    dependents = account_dependents.setdefault(number, {})
+                    dependents[id(row)] = row
+        self._account_dependents = [(account_chart[number], list(dependents.values()))
+                                    for number, dependents in account_dependents.items()]
+
+    ##############################################
+
+    def _dirty_rows(self, visitor, version):
+
+        """Return the cached rows which depend on an account modified after *version*."""
+
+        dirty_rows = {}
+        for account, rows in self._account_dependents:
+            if account.version > version:
+                for row in rows:
+                    if visitor.is_cached(row):
+                        dirty_rows[id(row)] = row
+
+        # propagate to the dependent rows
+        stack = list(dirty_rows.values())
+        while stack:
+            row = stack.pop()
+            for dependent in self._row_dependents.get(id(row), ()):
+                if id(dependent) not in dirty_rows:
+                    dirty_rows[id(dependent)] = dependent
+                    stack.append(dependent)
+
+        return dirty_rows.values()
+
     ##############################################
 
     def _process_sum_row(self, row):
@@ -322,7 +464,38 @@ class Table:
 
     def compute(self, account_chart, **kwargs):
 
-        computation_visitor = ComputationVisitor(account_chart, **kwargs)
+        """Compute the table and return a :class:`ComputationVisitor` which caches the row values.
+
+        The default computation is incremental: the visitor is kept and reused for the same
+        account chart, and only the rows which depend on a modified account are recomputed.  The
+        shared visitor is updated under a lock.
+
+        """
+
+        if any(kwargs.values()):
+            return self._compute(ComputationVisitor(account_chart, **kwargs))
+
+        with self._computation_lock:
+            version = account_chart.version
+            computation_visitor = self._computation_visitor
+            if computation_visitor is None or self._computation_chart is not account_chart:
+                computation_visitor = ComputationVisitor(account_chart)
+                self._make_account_dependents(account_chart)
+                self._computation_chart = account_chart
+                self._computation_visitor = computation_visitor
+            elif version == self._computation_version:
+                return computation_visitor
+            else:
+                dirty_rows = self._dirty_rows(computation_visitor, self._computation_version)
+                self._logger.info('Recompute {} rows'.format(len(dirty_rows)))
+                computation_visitor.update(account_chart, dirty_rows)
+            self._computation_version = version
+            return self._compute(computation_visitor)
+
+    ##############################################
+
+    def _compute(self, computation_visitor):
+
         for root_node in self._variable_to_dependency_node.values():
             for dependency_node in root_node.depth_first_search_sibling():
                 # self._logger.info('{} = ...'.format(dependency_node.variable))
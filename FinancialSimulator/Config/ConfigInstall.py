@@ -23,6 +23,8 @@ class Path:
     share_directory = _share_directory
     config_directory = os.path.join(share_directory, 'config')
     accounting_data_directory = os.path.join(share_directory, 'accounting')
+    cache_directory = os.environ.get('FINANCIAL_SIMULATOR_CACHE',
+                                     os.path.join(os.path.expanduser('~'), '.cache', 'pyFinancialSimulator'))
 
 ####################################################################################################
 
@@ -119,6 +119,18 @@ class AccountInterval(Leaf):
 
     ##############################################
 
+    @property
+    def inf(self):
+        return self._name_inf
+
+    ##############################################
+
+    @property
+    def sup(self):
+        return self._name_sup
+
+    ##############################################
+
     @property
     def dcb(self):
         return self._dcb
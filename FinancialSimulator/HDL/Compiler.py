@@ -0,0 +1,255 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+
+"""This module compiles an HDL program to a Python function.
+
+The account references of the program are collected in a list of slots ``(inf, sup, dcb)``, where
+``inf == sup`` for a single account, and the statements are translated to Python source code which
+reads the slot values and the variables.  The slots are resolved at compile time to the positions of
+the matching accounts in the flattened account chart, thus a program is evaluated by summing the
+amount arrays of the chart at these positions, then calling a single function.
+
+A compiler has no state, thus it can be shared by several threads.
+
+"""
+
+####################################################################################################
+
+import logging
+
+import numpy as np
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+class CompiledProgram:
+
+    ##############################################
+
+    def __init__(self, source, function, slots, positions):
+
+        self._source = source
+        self._function = function
+        self._slots = slots
+        # the positions of the accounts of each slot in the flattened account chart
+        self._positions = positions
+
+    ##############################################
+
+    @property
+    def source(self):
+        return self._source
+
+    @property
+    def slots(self):
+        return self._slots
+
+    @property
+    def positions(self):
+        return self._positions
+
+    ##############################################
+
+    def __call__(self, evaluator):
+
+        """Evaluate the program, *evaluator* provides the slot values and the variables."""
+
+        slot_values = [evaluator.positions_value(positions, dcb) for positions, dcb in self._positions]
+        return self._function(slot_values, evaluator.variables)
+
+####################################################################################################
+
+class SlotTable:
+
+    """This class collects the slots of a program during its compilation."""
+
+    ##############################################
+
+    def __init__(self):
+
+        self._slots = []
+        self._indexes = {}
+
+    ##############################################
+
+    @property
+    def slots(self):
+        return self._slots
+
+    ##############################################
+
+    def reference(self, inf, sup, dcb):
+
+        """Return the source code which reads the slot"""
+
+        slot = (inf, sup, dcb)
+        index = self._indexes.get(slot, None)
+        if index is None:
+            index = self._indexes[slot] = len(self._slots)
+            self._slots.append(slot)
+        return 'slots[{}]'.format(index)
+
+####################################################################################################
+
+class Compiler:
+
+    _logger = _module_logger.getChild('Compiler')
+
+    # Source templates of the functions
+    __functions__ = {
+        'min_zero': 'min({}, 0)',
+        'max_zero': 'max({}, 0)',
+    }
+    __assignation__ = 'float({})'
+    # Global namespace of the compiled functions
+    __namespace__ = {}
+
+    ##############################################
+
+    def compile(self, program, account_chart):
+
+        """Compile *program*, its account references are resolved in *account_chart*, the program
+        can then be evaluated on any balances of the same chart structure.
+
+        """
+
+        slot_table = SlotTable()
+        lines = ['def program(slots, variables):']
+        for statement in program:
+            lines.append('    result = ' + self._compile_statement(statement, slot_table))
+            statement_class = statement.__class__.__name__
+            if statement_class == 'Assignation':
+                lines.append('    variables[{!r}] = result'.format(str(statement.destination)))
+        lines.append('    return result')
+        source = '\n'.join(lines)
+
+        namespace = dict(self.__namespace__)
+        exec(compile(source, '<hdl>', 'exec'), namespace)
+        slots = slot_table.slots
+        flat_hierarchy = account_chart.flatten()
+        positions = [(self._resolve_slot(account_chart, flat_hierarchy, inf, sup), dcb)
+                     for inf, sup, dcb in slots]
+
+        return CompiledProgram(source, namespace['program'], slots, positions)
+
+    ##############################################
+
+    def _resolve_slot(self, account_chart, flat_hierarchy, inf, sup):
+
+        # Only look up existing accounts, an interval can span a million of numbers
+        numbers = account_chart.numbers_in_range(inf, sup)
+        if not numbers:
+            if inf == sup:
+                self._logger.warning("Account {} doesn't exist".format(inf))
+            else:
+                self._logger.warning("Interval [{}:{}] doesn't match any account".format(inf, sup))
+        return np.array([flat_hierarchy.position(number) for number in numbers], dtype=np.int64)
+
+    ##############################################
+
+    def _compile_statement(self, statement, slot_table):
+
+        statement_class = statement.__class__.__name__
+        compiler = getattr(self, '_compile_' + statement_class)
+        return compiler(statement, slot_table)
+
+    ##############################################
+
+    def _compile_operands(self, statement, slot_table):
+
+        return [self._compile_statement(operand, slot_table) for operand in statement]
+
+    ##############################################
+
+    def _compile_Variable(self, statement, slot_table):
+
+        return 'variables[{!r}]'.format(str(statement))
+
+    ##############################################
+
+    def _compile_Constant(self, statement, slot_table):
+
+        return repr(float(statement))
+
+    ##############################################
+
+    def _compile_Account(self, statement, slot_table):
+
+        number = int(statement)
+        return slot_table.reference(number, number, statement.dcb)
+
+    ##############################################
+
+    def _compile_AccountInterval(self, statement, slot_table):
+
+        return slot_table.reference(statement.inf, statement.sup, statement.dcb)
+
+    ##############################################
+
+    def _compile_Assignation(self, statement, slot_table):
+
+        return self.__assignation__.format(self._compile_statement(statement.value, slot_table))
+
+    ##############################################
+
+    def _compile_Negation(self, statement, slot_table):
+
+        return '(- {})'.format(self._compile_statement(statement.operand, slot_table))
+
+    ##############################################
+
+    def _compile_binary_operator(self, statement, slot_table):
+
+        operand1, operand2 = self._compile_operands(statement, slot_table)
+        return '({} {} {})'.format(operand1, statement.__operator__, operand2)
+
+    _compile_Addition = _compile_binary_operator
+    _compile_Subtraction = _compile_binary_operator
+    _compile_Multiplication = _compile_binary_operator
+    _compile_Division = _compile_binary_operator
+
+    ##############################################
+
+    def _compile_Function(self, statement, slot_table):
+
+        try:
+            template = self.__functions__[statement.name]
+        except KeyError:
+            raise NameError("Unknown function {}".format(statement.name))
+        return template.format(*self._compile_operands(statement, slot_table))
+
+####################################################################################################
+
+class ArrayCompiler(Compiler):
+
+    """This class compiles a program which operates elementwise on NumPy arrays."""
+
+    __functions__ = {
+        'min_zero': 'np.minimum({}, 0)',
+        'max_zero': 'np.maximum({}, 0)',
+    }
+    __assignation__ = '{}'
+    __namespace__ = {'np': np}
@@ -22,9 +22,13 @@
 
 import logging
 
+import numpy as np
+
 ####################################################################################################
 
 from FinancialSimulator.Tools.Hierarchy import NonExistingNodeError
+from FinancialSimulator.Units import Money
+from .Compiler import Compiler, ArrayCompiler
 
 ####################################################################################################
 
@@ -56,6 +60,12 @@ class Evaluator:
 
     ##############################################
 
+    @property
+    def variables(self):
+        return self._variables
+
+    ##############################################
+
     def eval_statement(self, level, statement):
 
         # self._logger.debug('')
@@ -140,6 +150,10 @@ class NumericalEvaluator(Evaluator):
 
 class AccountEvaluator(Evaluator):
 
+    __compiler__ = Compiler()
+    # amount arrays of the balances of an account chart
+    __amounts__ = {'D': 'debits', 'C': 'credits', 'B': 'balances'}
+
     ##############################################
 
     def __init__(self, account_chart):
@@ -150,17 +164,28 @@ class AccountEvaluator(Evaluator):
 
     ##############################################
 
+    @property
+    def account_chart(self):
+        return self._account_chart
+
+    @account_chart.setter
+    def account_chart(self, account_chart):
+        self._account_chart = account_chart
+
+    ##############################################
+
     def _eval_Account(self, level, number, dcb):
 
         # Fixme: signed etc.
+        # The evaluator works on floats, balances are Money
         try:
             account = self._account_chart[number]
             if dcb == 'D':
-                return account.debit
+                return float(account.debit)
             elif dcb == 'C':
-                return account.credit
+                return float(account.credit)
             elif dcb == 'B':
-                return account.balance
+                return float(account.balance)
             else:
                 raise NameError('')
         except NonExistingNodeError:
@@ -175,17 +200,85 @@ class AccountEvaluator(Evaluator):
 
     ##############################################
 
+    def _numbers_in_range(self, statement):
+
+        # Only look up existing accounts, an interval can span a million of numbers
+        numbers = self._account_chart.numbers_in_range(statement.inf, statement.sup)
+        if not numbers:
+            self._logger.warning("Interval {} doesn't match any account".format(statement))
+        return numbers
+
+    ##############################################
+
     def eval_AccountInterval(self, level, statement):
 
-        # Fixme: check
+        return self.accounts_value(self._numbers_in_range(statement), statement.dcb, level)
+
+    ##############################################
+
+    def accounts_value(self, numbers, dcb, level=0):
+
+        """Return the sum of the accounts *numbers*, e.g. a slot of a
+        :class:`FinancialSimulator.HDL.Compiler.CompiledProgram`.
+
+        """
+
         value = 0
-        for number in statement:
-            # can raise NonExistingNodeError
-            value += self._eval_Account(level, number, statement.dcb)
+        for number in numbers:
+            value += self._eval_Account(level, number, dcb)
         return value
 
     ##############################################
 
+    def _amounts(self, dcb):
+
+        """Return the array of the amounts in minor units of the flattened account chart, or None if
+        the account chart doesn't provide it.
+
+        """
+
+        try:
+            attribute = self.__amounts__[dcb]
+        except KeyError:
+            raise NameError("Unknown amount {}".format(dcb))
+        return getattr(self._account_chart, attribute, None)
+
+    ##############################################
+
+    def positions_value(self, positions, dcb):
+
+        """Return the sum of the accounts at *positions* in the flattened account chart, e.g. a slot
+        of a :class:`FinancialSimulator.HDL.Compiler.CompiledProgram`.
+
+        """
+
+        amounts = self._amounts(dcb)
+        if amounts is not None:
+            # e.g. an AccountChartBalances
+            return float(amounts[positions].sum()) / Money.__scale__
+        else:
+            # a chart of accounts
+            accounts = self._account_chart.flatten()
+            attribute = self.__amounts__[dcb][:-1]
+            value = 0
+            for position in positions:
+                value += float(getattr(accounts[position], attribute))
+            return value
+
+    ##############################################
+
+    @property
+    def compiler(self):
+        return self.__compiler__
+
+    ##############################################
+
+    def run_compiled_program(self, program):
+
+        return program(self)
+
+    ##############################################
+
     def eval_min_zero(self, level, statement, value):
 
         return min(value, 0)
@@ -198,6 +291,92 @@ class AccountEvaluator(Evaluator):
 
 ####################################################################################################
 
+class ArrayAccountEvaluator(AccountEvaluator):
+
+    """This class evaluates a program elementwise on arrays, e.g. of dates × scenarios.
+
+    The account chart must return arrays for the debit, credit and balance of an account, see
+    :class:`FinancialSimulator.Accounting.FinancialPeriod.AccountChartBalanceSeries`.
+
+    """
+
+    __compiler__ = ArrayCompiler()
+
+    ##############################################
+
+    def positions_value(self, positions, dcb):
+
+        return self._amounts(dcb)[positions].sum(axis=0) / Money.__scale__
+
+    ##############################################
+
+    def _eval_Account(self, level, number, dcb):
+
+        try:
+            account = self._account_chart[number]
+            if dcb == 'D':
+                return account.debit
+            elif dcb == 'C':
+                return account.credit
+            elif dcb == 'B':
+                return account.balance
+            else:
+                raise NameError('')
+        except NonExistingNodeError:
+            self._logger.warning("Account {} doesn't exist".format(number))
+            return 0
+
+    ##############################################
+
+    def eval_Assignation(self, level, statement, value):
+
+        self._variables[str(statement.destination)] = value
+        return value
+
+    ##############################################
+
+    def eval_Negation(self, level, statement, operand1):
+
+        return - operand1
+
+    ##############################################
+
+    def eval_Addition(self, level, statement, operand1, operand2):
+
+        return operand1 + operand2
+
+    ##############################################
+
+    def eval_Subtraction(self, level, statement, operand1, operand2):
+
+        return operand1 - operand2
+
+    ##############################################
+
+    def eval_Multiplication(self, level, statement, operand1, operand2):
+
+        return operand1 * operand2
+
+    ##############################################
+
+    def eval_Division(self, level, statement, operand1, operand2):
+
+        return operand1 / operand2
+
+    ##############################################
+
+    def eval_min_zero(self, level, statement, value):
+
+        return np.minimum(value, 0)
+
+    ##############################################
+
+    def eval_max_zero(self, level, statement, value):
+
+        return np.maximum(value, 0)
+
+####################################################################################################
+
 class AccountSetEvaluator(AccountEvaluator):
 
     ##############################################
@@ -222,11 +401,9 @@ class AccountSetEvaluator(AccountEvaluator):
 
     def eval_AccountInterval(self, level, statement):
 
-        # Fixme: check
         value = set()
-        for number in statement:
-            # can raise NonExistingNodeError
-            value.union(self._eval_Account(level, number, statement.dcb))
+        for number in self._numbers_in_range(statement):
+            value |= self._eval_Account(level, number, statement.dcb)
         return value
 
     ##############################################
@@ -20,8 +20,10 @@
 
 ####################################################################################################
 
+import heapq
 import logging
 import datetime
+import random
 
 ####################################################################################################
 
@@ -87,8 +89,6 @@ class SingleAction(Action):
 
         if start_date <= self._date <= stop_date:
             yield self._date
-        else:
-            raise StopIteration
 
 ####################################################################################################
 
@@ -211,36 +211,66 @@ class AnnualAction(ReccurentAction):
 
 class RandomAction(Action):
 
+    """This class implements an action which occurs at random dates.
+
+    The delays between two occurrences follow an exponential distribution with a mean of
+    *mean_period* days, i.e. a Poisson process. The dates are drawn from *random_generator*, a
+    :class:`random.Random` instance which can be seeded to reproduce a scenario.
+
+    """
+
     _logger = _module_logger.getChild('RandomAction')
 
     ##############################################
 
-    def __init__(self, start_date, label=''):
+    def __init__(self, start_date, mean_period=30, label='', random_generator=None):
 
         super().__init__(label)
         self._start_date = start_date
+        self._mean_period = mean_period
+        if random_generator is None:
+            random_generator = random.Random()
+        self._random_generator = random_generator
+
+    ##############################################
+
+    @property
+    def mean_period(self):
+        return self._mean_period
+
+    ##############################################
+
+    @property
+    def random_generator(self):
+        return self._random_generator
+
+    @random_generator.setter
+    def random_generator(self, random_generator):
+        self._random_generator = random_generator
 
     ##############################################
 
     def next_dates(self, start_date, stop_date):
 
-        # slope:
-        #   flat
-        #   increasing
-        #   decreasing
-        #   increasing -> decreasing
-        # Gaussian noise
+        # Fixme: slope (increasing, decreasing), seasonality
 
-        pass
-        # date = datetime.date(start_date.year, start_date.month, self._day_number)
-        # while date <= stop_date:
-        #     if start_date <= date:
-        #         yield date
+        rate = 1 / self._mean_period
+        date = self._start_date
+        while True:
+            # at most one occurrence per day
+            delay = max(1, int(round(self._random_generator.expovariate(rate))))
+            date += datetime.timedelta(delay)
+            if date > stop_date:
+                break
+            if start_date <= date:
+                yield date
 
 ####################################################################################################
 
 class PlannedAction:
 
+    __slots__ = ('_action', '_date')
+
     _logger = _module_logger.getChild('PlannedAction')
 
     ##############################################
@@ -276,43 +306,12 @@ class PlannedAction:
 
     def run(self):
 
-        self._logger.info('Run ' + str(self))
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info('Run ' + str(self))
         self._action.run(self._date)
 
 ####################################################################################################
 
-class PlannedActions(dict):
-
-    _logger = _module_logger.getChild('SingleAction')
-
-    ##############################################
-
-    def __init__(self, start_date):
-
-        super().__init__()
-
-        self._start_date = start_date
-
-    ##############################################
-
-    def add_action(self, action, date):
-
-        delta_day = (date - self._start_date).days
-        planned_action = PlannedAction(action, date)
-        if delta_day in self:
-            self[delta_day].append(planned_action)
-        else:
-            self[delta_day] = [planned_action]
-
-    ##############################################
-
-    def sort(self):
-
-        for item in self.values():
-            item.sort()
-
-####################################################################################################
-
 class Scheduler:
 
     _logger = _module_logger.getChild('Scheduler')
@@ -333,18 +332,31 @@ class Scheduler:
 
     def iter(self, start_date, stop_date):
 
-        planned_actions = PlannedActions(start_date)
-        for action in self._actions:
-            for next_date in action.next_dates(start_date, stop_date):
-                planned_actions.add_action(action, next_date)
-        planned_actions.sort()
-
-        number_of_days = (stop_date - start_date).days +1
-        for delta_day in range(number_of_days):
-            if delta_day in planned_actions:
-                day_planned_actions = planned_actions[delta_day]
-                for planned_action in day_planned_actions:
-                    yield planned_action
+        """Yield the planned actions in date order, actions planned the same day are yielded in the
+        order they were added.
+
+        The occurrences are pulled lazily from the action generators and merged using a priority
+        queue, which only holds the next occurrence of each action.
+
+        """
+
+        queue = []
+        for i, action in enumerate(self._actions):
+            dates = iter(action.next_dates(start_date, stop_date))
+            date = next(dates, None)
+            if date is not None:
+                # the action index breaks ties, thus actions are never compared
+                queue.append((date, i, action, dates))
+        heapq.heapify(queue)
+
+        while queue:
+            date, i, action, dates = queue[0]
+            yield PlannedAction(action, date)
+            next_date = next(dates, None)
+            if next_date is None:
+                heapq.heappop(queue)
+            else:
+                heapq.heapreplace(queue, (next_date, i, action, dates))
 
     ##############################################
 
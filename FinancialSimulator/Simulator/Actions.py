@@ -23,12 +23,16 @@
 from FinancialSimulator.Scheduler import (SingleAction,
                                           MonthlyAction,
                                           QuaterlyAction,
-                                          AnnualAction)
+                                          AnnualAction,
+                                          RandomAction)
 
 ####################################################################################################
 
 class JournalEntryActionMixin:
 
+    # Optional model to perturb the amounts, see :class:`FinancialSimulator.Simulator.MonteCarlo.AmountNoise`
+    amount_noise = None
+
     ##############################################
 
     def __init__(self, journal, transaction):
@@ -40,7 +44,11 @@ class JournalEntryActionMixin:
 
     def run(self, date):
 
-        journal_entry = self._journal.log_template(date, self._transaction)
+        if self.amount_noise is None:
+            journal_entry = self._journal.log_template(date, self._transaction)
+        else:
+            imputations = self.amount_noise.perturb(self._transaction.imputations)
+            journal_entry = self._journal.log_entry(date, self._transaction.description, imputations)
         journal_entry.validate()
 
 ####################################################################################################
@@ -88,3 +96,14 @@ class AnnualJournalEntryAction(JournalEntryActionMixin, AnnualAction):
 
         AnnualAction.__init__(self, date, transaction.description)
         JournalEntryActionMixin.__init__(self, journal, transaction)
+
+####################################################################################################
+
+class RandomJournalEntryAction(JournalEntryActionMixin, RandomAction):
+
+    ##############################################
+
+    def __init__(self, journal, date, transaction, mean_period=30, random_generator=None):
+
+        RandomAction.__init__(self, date, mean_period, transaction.description, random_generator)
+        JournalEntryActionMixin.__init__(self, journal, transaction)
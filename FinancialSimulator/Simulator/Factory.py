@@ -24,6 +24,7 @@ from .Actions import (SingleJournalEntryAction,
                       MonthlyJournalEntryAction,
                       QuaterlyJournalEntryAction,
                       AnnualJournalEntryAction,
+                      RandomJournalEntryAction,
 )
 
 ####################################################################################################
@@ -32,9 +33,11 @@ class JournalEntryActionFactory:
 
     ##############################################
 
-    def __init__(self, journals):
+    def __init__(self, journals, random_generator=None):
 
         self._journals = journals
+        # used by random actions
+        self._random_generator = random_generator
 
     ##############################################
 
@@ -58,6 +61,8 @@ class JournalEntryActionFactory:
             class_action = QuaterlyJournalEntryAction
         elif recurrence == 'annuel':
             class_action = AnnualJournalEntryAction
+        elif recurrence == 'aléatoire':
+            class_action = RandomJournalEntryAction
         else:
             raise NameError(recurrence)
 
@@ -70,4 +75,8 @@ class JournalEntryActionFactory:
         factory = journal.__journal_entry_template_factory__
         transaction = factory(transaction_definition.description, resolved_imputations)
 
-        return  class_action(journal, transaction_definition.date, transaction)
+        if class_action is RandomJournalEntryAction:
+            return class_action(journal, transaction_definition.date, transaction,
+                                transaction_definition.period, self._random_generator)
+        else:
+            return class_action(journal, transaction_definition.date, transaction)
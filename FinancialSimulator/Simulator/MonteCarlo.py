@@ -0,0 +1,430 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+
+"""This module implements a Monte Carlo simulation engine.
+
+A scenario runs the scheduled transactions over a financial period with random amounts and random
+dates, the random generator of a scenario is seeded from the simulation seed and the scenario
+index, thus a scenario is reproducible.  Scenarios are dispatched to a process pool, each worker
+receives once the account chart and the transaction definitions, and returns for each scenario the
+balance trajectories of the tracked accounts as integer minor units and the series of the result
+table rows at the sample dates.
+
+"""
+
+####################################################################################################
+
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+import logging
+import os
+import random
+
+import numpy as np
+
+####################################################################################################
+
+from FinancialSimulator.Accounting import Results
+from FinancialSimulator.Accounting.FinancialPeriod import (FinancialPeriod, Journals,
+                                                           AccountChartBalanceSeries)
+from FinancialSimulator.Accounting.Journal import DebitImputationData, CreditImputationData
+from FinancialSimulator.Accounting.JournalColumnar import JournalColumnar
+from FinancialSimulator.Scheduler import Scheduler
+from FinancialSimulator.Units import Money
+from .Factory import JournalEntryActionFactory
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+class AmountNoise:
+
+    """This class perturbs the amounts of a journal entry by a random factor drawn from a normal
+    distribution of mean 1 and standard deviation *sigma*.
+
+    The same factor is applied to all the imputations of an entry, and the rounding residual is
+    added to the largest debit so as to keep the entry balanced.
+
+    """
+
+    ##############################################
+
+    def __init__(self, sigma, random_generator):
+
+        self._sigma = sigma
+        self._random_generator = random_generator
+
+    ##############################################
+
+    def perturb(self, imputations):
+
+        factor = max(0, self._random_generator.gauss(1, self._sigma))
+
+        debits = []
+        credits = []
+        for imputation in imputations:
+            item = [imputation, imputation.amount * factor]
+            if imputation.is_debit():
+                debits.append(item)
+            else:
+                credits.append(item)
+
+        residual = sum(amount for imputation, amount in credits) - sum(amount for imputation, amount in debits)
+        if residual and debits:
+            max(debits, key=lambda item: item[1])[1] += residual
+
+        imputation_datas = []
+        for factory, items in ((DebitImputationData, debits), (CreditImputationData, credits)):
+            for imputation, amount in items:
+                imputation_datas.append(factory(imputation.account, amount, imputation.analytic_account,
+                                                resolved=True))
+        return imputation_datas
+
+####################################################################################################
+
+class StochasticJournalEntryActionFactory(JournalEntryActionFactory):
+
+    ##############################################
+
+    def __init__(self, journals, random_generator, amount_sigma=0):
+
+        super().__init__(journals, random_generator)
+        self._amount_sigma = amount_sigma
+
+    ##############################################
+
+    def make_transaction_action(self, transaction_definition):
+
+        action = super().make_transaction_action(transaction_definition)
+        if self._amount_sigma:
+            action.amount_noise = AmountNoise(self._amount_sigma, self._random_generator)
+        return action
+
+####################################################################################################
+
+class MonteCarloJournals(Journals):
+    __journal_factory__ = JournalColumnar
+
+class MonteCarloFinancialPeriod(FinancialPeriod):
+    __journals_factory__ = MonteCarloJournals
+    __posting_index_factory__ = None
+
+####################################################################################################
+
+# Simulation of the worker process, set by the pool initializer
+_worker_simulation = None
+
+def _init_worker(simulation):
+    global _worker_simulation
+    _worker_simulation = simulation
+
+def _run_scenario(scenario):
+    return _worker_simulation.run_scenario(scenario)
+
+####################################################################################################
+
+class MonteCarloSimulation:
+
+    """This class runs stochastic scenarios of a simulation.
+
+    *transaction_definitions* is an iterable of
+    :class:`FinancialSimulator.Simulator.YamlLoader.JournalEntryDefinition`, e.g. a
+    :class:`FinancialSimulator.Simulator.YamlLoader.YamlUnit`.  *account_numbers* are the tracked
+    accounts, by default the accounts used by the transactions and their ancestors.
+    *result_tables* are YAML file names of :class:`FinancialSimulator.Accounting.Results.YamlLoader`.
+
+    """
+
+    _logger = _module_logger.getChild('MonteCarloSimulation')
+
+    __financial_period_factory__ = MonteCarloFinancialPeriod
+    __action_factory__ = StochasticJournalEntryActionFactory
+
+    ##############################################
+
+    def __init__(self,
+                 account_chart,
+                 analytic_account_chart,
+                 journal_definitions,
+                 transaction_definitions,
+                 start_date,
+                 stop_date,
+                 account_numbers=None,
+                 result_tables=(),
+                 number_of_samples=12,
+                 amount_sigma=.1,
+                 seed=0,
+    ):
+
+        self._account_chart = account_chart
+        self._analytic_account_chart = analytic_account_chart
+        self._journal_definitions = tuple(journal_definitions)
+        self._transaction_definitions = list(transaction_definitions)
+        self._start_date = start_date
+        self._stop_date = stop_date
+        self._result_tables = tuple(result_tables)
+        self._amount_sigma = amount_sigma
+        self._seed = seed
+
+        if account_numbers is None:
+            account_numbers = set()
+            for transaction_definition in self._transaction_definitions:
+                for imputation in transaction_definition.imputations:
+                    account = account_chart[int(imputation.account)]
+                    while account is not None:
+                        account_numbers.add(account.number)
+                        account = account.parent
+            account_numbers = sorted(account_numbers)
+        self._account_numbers = list(account_numbers)
+
+        # Balances are sampled at the end of each sample period
+        number_of_days = (stop_date - start_date).days
+        self._sample_dates = [start_date + datetime.timedelta(round(number_of_days * (i + 1) / number_of_samples))
+                              for i in range(number_of_samples)]
+
+        # loaded on demand in the workers
+        self._tables = None
+
+    ##############################################
+
+    def __getstate__(self):
+
+        state = dict(self.__dict__)
+        state['_tables'] = None
+        return state
+
+    ##############################################
+
+    @property
+    def account_numbers(self):
+        return self._account_numbers
+
+    @property
+    def sample_dates(self):
+        return self._sample_dates
+
+    ##############################################
+
+    def _load_tables(self):
+
+        if self._tables is None:
+            self._tables = [Results.YamlLoader(yaml_file).table for yaml_file in self._result_tables]
+        return self._tables
+
+    ##############################################
+
+    @staticmethod
+    def _table_rows(table):
+
+        return [row
+                for column in table
+                for row in column
+                if row is not None and not isinstance(row, Results.EmptyRow)]
+
+    ##############################################
+
+    def row_titles(self):
+
+        """Return for each result table the titles of its rows."""
+
+        return {yaml_file: [row.title for row in self._table_rows(table)]
+                for yaml_file, table in zip(self._result_tables, self._load_tables())}
+
+    ##############################################
+
+    def scenario_random_generator(self, scenario):
+
+        return random.Random('{}:{}'.format(self._seed, scenario))
+
+    ##############################################
+
+    def run_scenario(self, scenario):
+
+        """Run a scenario and return the balance trajectories of the tracked accounts as an array of
+        integer minor units of shape (number of samples, number of accounts), and for each result
+        table the row values as an array of shape (number of rows, number of samples).
+
+        """
+
+        random_generator = self.scenario_random_generator(scenario)
+
+        financial_period = self.__financial_period_factory__(self._account_chart,
+                                                             self._analytic_account_chart,
+                                                             self._journal_definitions,
+                                                             self._start_date, self._stop_date)
+        account_chart = financial_period.account_chart
+        flat_hierarchy = account_chart.flatten()
+        positions = [flat_hierarchy.position(number) for number in self._account_numbers]
+
+        scheduler = Scheduler()
+        factory = self.__action_factory__(financial_period.journals, random_generator, self._amount_sigma)
+        factory.make_transaction_actions((self._transaction_definitions,), scheduler)
+
+        number_of_samples = len(self._sample_dates)
+        samples = []
+        for planned_action in scheduler.iter(self._start_date, self._stop_date):
+            while planned_action.date > self._sample_dates[len(samples)]:
+                samples.append(account_chart.compute_balances())
+            planned_action.run()
+        if len(samples) < number_of_samples:
+            samples.extend([account_chart.compute_balances()] * (number_of_samples - len(samples)))
+
+        trajectories = np.stack([balances.balances[positions] for balances in samples])
+
+        # Evaluate the tables for all the samples at once
+        row_values = []
+        tables = self._load_tables()
+        if tables:
+            series = AccountChartBalanceSeries.from_balances(account_chart, samples)
+            for table in tables:
+                computation_visitor = table.compute(series, array_evaluator=True)
+                row_values.append(np.stack([np.broadcast_to(computation_visitor[row], (number_of_samples,))
+                                            for row in self._table_rows(table)]).astype(float))
+
+        return trajectories, row_values
+
+    ##############################################
+
+    def run(self, number_of_scenarios, max_workers=None):
+
+        """Run the scenarios in a process pool and return a :class:`MonteCarloResult`.
+
+        Scenarios are run in this process if *max_workers* is 1.
+
+        """
+
+        scenarios = range(number_of_scenarios)
+        if max_workers == 1:
+            results = [self.run_scenario(scenario) for scenario in scenarios]
+        else:
+            if max_workers is None:
+                max_workers = os.cpu_count() or 1
+            chunk_size = max(1, number_of_scenarios // (4 * max_workers))
+            with ProcessPoolExecutor(max_workers=max_workers,
+                                     initializer=_init_worker, initargs=(self,)) as executor:
+                results = list(executor.map(_run_scenario, scenarios, chunksize=chunk_size))
+
+        trajectories = np.stack([trajectory for trajectory, row_values in results])
+        row_values = {}
+        for i, yaml_file in enumerate(self._result_tables):
+            row_values[yaml_file] = np.stack([values[i] for trajectory, values in results])
+
+        return MonteCarloResult(self, trajectories, row_values)
+
+####################################################################################################
+
+class MonteCarloResult:
+
+    """This class stores the results of the scenarios and computes percentile bands.
+
+    A band is an array of shape (number of percentiles, ...) where the first axis matches the given
+    percentiles.
+
+    """
+
+    __default_percentiles__ = (5, 25, 50, 75, 95)
+
+    ##############################################
+
+    def __init__(self, simulation, trajectories, row_values):
+
+        self._account_numbers = list(simulation.account_numbers)
+        self._positions = {number:i for i, number in enumerate(self._account_numbers)}
+        self._sample_dates = list(simulation.sample_dates)
+        self._row_titles = simulation.row_titles() if row_values else {}
+        # (scenarios, samples, accounts) in minor units
+        self._trajectories = trajectories
+        # yaml file -> (scenarios, rows, samples)
+        self._row_values = row_values
+
+    ##############################################
+
+    @property
+    def number_of_scenarios(self):
+        return self._trajectories.shape[0]
+
+    @property
+    def account_numbers(self):
+        return self._account_numbers
+
+    @property
+    def sample_dates(self):
+        return self._sample_dates
+
+    @property
+    def trajectories(self):
+        return self._trajectories
+
+    @property
+    def row_titles(self):
+        return self._row_titles
+
+    @property
+    def row_values(self):
+        return self._row_values
+
+    ##############################################
+
+    def account_trajectories(self, number):
+
+        """Return the balance trajectories of an account as an array of floats of shape (number of
+        scenarios, number of samples).
+
+        """
+
+        return self._trajectories[:, :, self._positions[number]] / Money.__scale__
+
+    ##############################################
+
+    def account_bands(self, number, percentiles=None):
+
+        if percentiles is None:
+            percentiles = self.__default_percentiles__
+        return np.percentile(self.account_trajectories(number), percentiles, axis=0)
+
+    ##############################################
+
+    def bands(self, percentiles=None):
+
+        """Return the bands of all the tracked accounts, the shape is (number of percentiles, number of
+        samples, number of accounts).
+
+        """
+
+        if percentiles is None:
+            percentiles = self.__default_percentiles__
+        return np.percentile(self._trajectories / Money.__scale__, percentiles, axis=0)
+
+    ##############################################
+
+    def row_bands(self, yaml_file, percentiles=None):
+
+        """Return the bands of the rows of a result table, the shape is (number of percentiles, number
+        of rows, number of samples).
+
+        """
+
+        if percentiles is None:
+            percentiles = self.__default_percentiles__
+        return np.percentile(self._row_values[yaml_file], percentiles, axis=0)
@@ -24,7 +24,7 @@ import re
 
 ####################################################################################################
 
-from FinancialSimulator.Units import AmountValue, PercentValue
+from FinancialSimulator.Units import AmountValue, Money, PercentValue
 
 ####################################################################################################
 
@@ -58,7 +58,7 @@ class AmountValueParser:
         m = re.match(r'(\d+\.?\d*) €( (HT|TTC))?( @(N))?', value_string)
         if m is not None:
             currency = '€'
-            value = float(m.group(1))
+            value = Money.from_value(m.group(1), currency)
             prefix = m.group(3)
             if prefix is None:
                 is_inclusive = None
@@ -80,7 +80,7 @@ class AmountValueParser:
         m = re.match(r'\$(\d+\.?\d*) USD', value_string)
         if m is not None:
             currency = 'USD'
-            value = float(m.group(1))
+            value = Money.from_value(m.group(1), currency)
             is_inclusive = False
             return AmountValue(currency, value, 0, is_inclusive)
         else:
@@ -119,6 +119,11 @@ class JournalEntryDefinition:
     def recurrence(self):
         return self._definition.get('recurrence', 'single')
 
+    @property
+    def period(self):
+        # mean period in days of a random transaction
+        return self._definition.get('period', 30)
+
     @property
     def description(self):
         return self._definition['label']
@@ -33,7 +33,8 @@ def format_currency(value, symbol='€'):
             sign = '- '
         else:
             sign = ''
-        formatted_value = locale.currency(abs(value), grouping=True, symbol=False)
+        # value can be a Money
+        formatted_value = locale.currency(float(abs(value)), grouping=True, symbol=False)
         return sign + formatted_value + ' ' + symbol
     else:
         return ''
@@ -58,16 +58,18 @@ def monthly_iterator(start, stop):
 ####################################################################################################
 
 def date_iterator_in_month(date):
-    first_day, last_day = calendar.monthrange(date.year, date.month)
-    for day in range(first_day, last_day):
+    first_weekday, number_of_days = calendar.monthrange(date.year, date.month)
+    for day in range(1, number_of_days +1):
         yield date.replace(day=day)
 
 ####################################################################################################
 
 def parse_date(date_str):
-    return datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+    # ISO format, faster than strptime
+    return datetime.date.fromisoformat(date_str)
 
 ####################################################################################################
 
 def parse_datetime(date_str):
-    return datetime.datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S.%f")
+    # str(datetime) format, the microseconds are omitted if null
+    return datetime.datetime.fromisoformat(date_str)
@@ -18,9 +18,25 @@
 #
 ####################################################################################################
 
+####################################################################################################
+####################################################################################################
+
+"""This module implements an index of objects by date.
+
+The objects are grouped by date in :class:`DateList`, the date ordinals are kept sorted, thus
+iterations and range queries cost O(log n + k) where k is the number of matched dates, whatever
+the number of calendar days spanned by the index.
+
+"""
+
+####################################################################################################
+
+from bisect import bisect_left, bisect_right
+import datetime
+
 ####################################################################################################
 
-from .Date import clone_date, date_iterator, monthly_iterator, date_iterator_in_month
+from .Date import clone_date
 
 ####################################################################################################
 
@@ -46,17 +62,49 @@ class DateList(list):
 
 ####################################################################################################
 
+def _month_key(date):
+    return date.year * 12 + date.month - 1
+
+def _month_of_key(key):
+    year, month = divmod(key, 12)
+    return datetime.date(year, month + 1, 1)
+
+def _next_month(date):
+    if date.month == 12:
+        return datetime.date(date.year + 1, 1, 1)
+    else:
+        return datetime.date(date.year, date.month + 1, 1)
+
+####################################################################################################
+
 class DateIndexer:
 
-    # Fixme: month/year iterator
+    """This class indexes objects having a *date* attribute.
+
+    If *start* and *stop* are given, the index is bounded and appending an object out of this
+    range raises an :class:`OutOfDateError`, else the range grows with the appended objects.
+
+    Ranges are inclusive, i.e. ``indexer[start:stop]`` returns the objects from *start* to *stop*
+    included.
+
+    """
 
     ##############################################
 
-    def __init__(self):
+    def __init__(self, start=None, stop=None):
 
-        self._start = None
-        self._stop = None
-        self._dates = {}
+        self._bounded = start is not None and stop is not None
+        if self._bounded:
+            self._start = clone_date(start)
+            self._stop = clone_date(stop)
+        else:
+            self._start = None
+            self._stop = None
+
+        self._dates = {} # ordinal -> DateList
+        self._ordinals = [] # sorted
+        self._months = [] # sorted month keys, year * 12 + month - 1
+        self._years = [] # sorted
 
     ##############################################
 
@@ -68,34 +116,64 @@ class DateIndexer:
     def stop(self):
         return self._stop
 
+    @property
+    def months(self):
+        """Sorted first day of the months having objects"""
+        return [_month_of_key(key) for key in self._months]
+
+    @property
+    def years(self):
+        """Sorted years having objects"""
+        return list(self._years)
+
     ##############################################
 
     def __getitem__(self, date):
 
-        if self._start <= date <= self._stop:
-            key = date.toordinal()
-            if key in self._dates:
-                return self._dates[key]
-            else:
-                return None
+        if isinstance(date, slice):
+            return list(self.iter_between(date.start, date.stop))
+
+        if self._start is not None and self._start <= date <= self._stop:
+            return self._dates.get(date.toordinal(), None)
         else:
             raise OutOfDateError
 
     ##############################################
 
-    def append(self, obj):
+    @staticmethod
+    def _insert(sorted_list, value):
 
-        date = clone_date(obj.date) # costly but sure
-        if self._start is None:
-            self._start = self._stop = date
+        # Objects are usually appended in date order
+        if not sorted_list or sorted_list[-1] < value:
+            sorted_list.append(value)
         else:
-            self._start = min(self._start, date)
-            self._stop = max(self._stop, date)
+            index = bisect_left(sorted_list, value)
+            if index == len(sorted_list) or sorted_list[index] != value:
+                sorted_list.insert(index, value)
+
+    ##############################################
+
+    def append(self, obj):
+
+        date = obj.date
+        if self._bounded:
+            if not (self._start <= date <= self._stop):
+                raise OutOfDateError(date)
+        elif self._start is None:
+            self._start = self._stop = clone_date(date)
+        elif date < self._start:
+            self._start = clone_date(date)
+        elif date > self._stop:
+            self._stop = clone_date(date)
 
         key = date.toordinal()
-        if key not in self._dates:
-            self._dates[key] = DateList(date)
-        self._dates[key].append(obj)
+        date_list = self._dates.get(key, None)
+        if date_list is None:
+            date_list = self._dates[key] = DateList(date) # clone the date: costly but sure
+            self._insert(self._ordinals, key)
+            self._insert(self._months, _month_key(date))
+            self._insert(self._years, date.year)
+        date_list.append(obj)
 
     ##############################################
 
@@ -104,30 +182,94 @@ class DateIndexer:
 
     ##############################################
 
+    def _ordinal_range(self, start=None, stop=None):
+
+        """Return the index range of the ordinals from *start* to *stop* included."""
+
+        lower = 0 if start is None else bisect_left(self._ordinals, start.toordinal())
+        upper = len(self._ordinals) if stop is None else bisect_right(self._ordinals, stop.toordinal())
+        return lower, upper
+
+    ##############################################
+
+    def date_lists(self, start=None, stop=None):
+
+        """Iterate over the :class:`DateList` from *start* to *stop* included."""
+
+        lower, upper = self._ordinal_range(start, stop)
+        dates = self._dates
+        for i in range(lower, upper):
+            yield dates[self._ordinals[i]]
+
+    ##############################################
+
+    def iter_between(self, start=None, stop=None):
+
+        """Iterate over the objects from *start* to *stop* included."""
+
+        for date_list in self.date_lists(start, stop):
+            yield from date_list
+
+    ##############################################
+
     def __iter__(self):
 
-        for date in date_iterator(self._start, self._stop):
-            yield from self.iter_on_date(date)
+        return self.iter_between()
 
     ##############################################
 
     def iter_on_date(self, date):
 
-        date_list = self[date]
+        date_list = self._dates.get(date.toordinal(), None)
         if date_list is not None:
-            yield from iter(date_list)
+            yield from date_list
+
+    ##############################################
+
+    def iter_month(self, year, month):
+
+        start = datetime.date(year, month, 1)
+        stop = _next_month(start) - datetime.timedelta(days=1)
+        return self.iter_between(start, stop)
+
+    ##############################################
+
+    def iter_quarter(self, year, quarter):
+
+        """Iterate over the objects of the *quarter* of *year*, numbered from 1 to 4."""
+
+        start = datetime.date(year, 3 * (quarter - 1) + 1, 1)
+        if quarter == 4:
+            stop = datetime.date(year, 12, 31)
         else:
-            raise StopIteration
+            stop = datetime.date(year, 3 * quarter + 1, 1) - datetime.timedelta(days=1)
+        return self.iter_between(start, stop)
+
+    ##############################################
+
+    def iter_year(self, year):
+
+        return self.iter_between(datetime.date(year, 1, 1), datetime.date(year, 12, 31))
 
     ##############################################
 
     def monthly_iter(self):
 
-        for month_date in monthly_iterator(self._start, self._stop):
-            dates = []
-            for date in date_iterator_in_month(month_date):
-                date_list = self[date]
-                if date_list is not None:
-                    dates.append(date_list)
-            if dates:
-                yield month_date, dates
+        """Iterate over the months having objects, yield the first day of the month and the list of
+        :class:`DateList`.
+
+        """
+
+        for key in self._months:
+            month_date = _month_of_key(key)
+            stop = _next_month(month_date) - datetime.timedelta(days=1)
+            yield month_date, list(self.date_lists(month_date, stop))
+
+    ##############################################
+
+    def yearly_iter(self):
+
+        """Iterate over the years having objects, yield the year and the list of :class:`DateList`."""
+
+        for year in self._years:
+            yield year, list(self.date_lists(datetime.date(year, 1, 1), datetime.date(year, 12, 31)))
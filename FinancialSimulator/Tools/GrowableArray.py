@@ -0,0 +1,140 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+
+import numpy as np
+
+####################################################################################################
+
+class GrowableArray:
+
+    """This class implements a typed array which can be appended in amortised constant time.
+
+    The values are stored in a NumPy buffer which is doubled when it is full, the :attr:`array`
+    property returns a view on the used part.  Appended values are first queued in a Python list
+    and copied to the buffer by chunks, since a NumPy item assignment is much slower than a list
+    append.
+
+    """
+
+    __initial_capacity__ = 1024
+    __pending_size__ = 4096
+
+    ##############################################
+
+    def __init__(self, dtype, capacity=None):
+
+        if capacity is None:
+            capacity = self.__initial_capacity__
+        self._buffer = np.zeros(max(capacity, 1), dtype=dtype)
+        self._size = 0
+        self._pending = []
+
+    ##############################################
+
+    @property
+    def dtype(self):
+        return self._buffer.dtype
+
+    ##############################################
+
+    @property
+    def array(self):
+
+        if self._pending:
+            self._flush()
+        return self._buffer[:self._size]
+
+    ##############################################
+
+    def __len__(self):
+        return self._size + len(self._pending)
+
+    ##############################################
+
+    def __getitem__(self, index):
+        return self.array[index]
+
+    ##############################################
+
+    def __setitem__(self, index, value):
+        self.array[index] = value
+
+    ##############################################
+
+    def __iter__(self):
+        return iter(self.array)
+
+    ##############################################
+
+    def _reserve(self, size):
+
+        capacity = self._buffer.shape[0]
+        if size > capacity:
+            while capacity < size:
+                capacity *= 2
+            buffer_ = np.zeros(capacity, dtype=self._buffer.dtype)
+            buffer_[:self._size] = self._buffer[:self._size]
+            self._buffer = buffer_
+
+    ##############################################
+
+    def _flush(self):
+
+        size = self._size + len(self._pending)
+        self._reserve(size)
+        self._buffer[self._size:size] = self._pending
+        self._size = size
+        self._pending = []
+
+    ##############################################
+
+    def append(self, value):
+
+        self._pending.append(value)
+        if len(self._pending) >= self.__pending_size__:
+            self._flush()
+
+    ##############################################
+
+    def extend(self, values):
+
+        self._pending.extend(values)
+        if len(self._pending) >= self.__pending_size__:
+            self._flush()
+
+    ##############################################
+
+    def truncate(self, size):
+
+        if not 0 <= size <= len(self):
+            raise IndexError(size)
+        if self._pending:
+            self._flush()
+        self._size = size
+
+    ##############################################
+
+    def clear(self):
+
+        self._size = 0
+        self._pending = []
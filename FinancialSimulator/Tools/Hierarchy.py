@@ -20,10 +20,19 @@
 
 ####################################################################################################
 
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+####################################################################################################
+
 class Leaf:
 
     # Fixme: purpose ?
 
+    # Subclasses without __slots__ are dict-backed
+    __slots__ = ('_parent',)
+
     ##############################################
 
     def __init__(self, parent=None):
@@ -96,6 +105,8 @@ class Leaf:
 
 class Node(Leaf):
 
+    __slots__ = ('_siblings',)
+
     ##############################################
 
     def __init__(self, parent=None, siblings=None):
@@ -187,6 +198,102 @@ class NonExistingNodeError(Exception):
 
 ####################################################################################################
 
+class FlatHierarchy:
+
+    """This class stores a hierarchy as arrays in depth first search order.
+
+    A subtree is a contiguous slice ``[position, end[position])`` of the arrays, thus an amount can
+    be aggregated over all the subtrees in one pass using a cumulative sum.
+
+    """
+
+    ##############################################
+
+    def __init__(self, hierarchy):
+
+        self._nodes = list(hierarchy)
+        self._positions = {hash(node):i for i, node in enumerate(self._nodes)}
+
+        number_of_nodes = len(self._nodes)
+        self._parents = np.full(number_of_nodes, -1, dtype=np.int64)
+        for i, node in enumerate(self._nodes):
+            if node.parent is not None:
+                self._parents[i] = self._positions[hash(node.parent)]
+
+        # Children come after their parent, thus a reverse scan propagates the extents
+        self._ends = np.arange(1, number_of_nodes +1, dtype=np.int64)
+        for i in range(number_of_nodes -1, -1, -1):
+            parent = self._parents[i]
+            if parent >= 0 and self._ends[i] > self._ends[parent]:
+                self._ends[parent] = self._ends[i]
+
+    ##############################################
+
+    def __len__(self):
+        return len(self._nodes)
+
+    ##############################################
+
+    def __iter__(self):
+        return iter(self._nodes)
+
+    ##############################################
+
+    def __getitem__(self, position):
+        return self._nodes[position]
+
+    ##############################################
+
+    @property
+    def nodes(self):
+        return self._nodes
+
+    ##############################################
+
+    @property
+    def parents(self):
+        return self._parents
+
+    ##############################################
+
+    @property
+    def ends(self):
+        return self._ends
+
+    ##############################################
+
+    def position(self, node_hash):
+
+        try:
+            return self._positions[node_hash]
+        except KeyError:
+            raise NonExistingNodeError(node_hash)
+
+    ##############################################
+
+    def subtree(self, node_hash):
+
+        """Return the slice of the subtree rooted at the given node."""
+
+        position = self.position(node_hash)
+        return slice(position, int(self._ends[position]))
+
+    ##############################################
+
+    def roll_up(self, values):
+
+        """Return the sum of *values* over the subtree of each node, *values* are given in depth
+        first search order.
+
+        """
+
+        values = np.asarray(values)
+        cumulative_sum = np.zeros(len(values) +1, dtype=values.dtype)
+        np.cumsum(values, out=cumulative_sum[1:])
+        return cumulative_sum[self._ends] - cumulative_sum[:-1]
+
+####################################################################################################
+
 class Hierarchy:
 
     ##############################################
@@ -195,6 +302,15 @@ class Hierarchy:
 
         self._nodes = {}
         self._root_nodes = []
+        self._invalidate_indexes()
+
+    ##############################################
+
+    def _invalidate_indexes(self):
+
+        # Indexes are built on demand
+        self._flat_hierarchy = None
+        self._sorted_hashes = None
 
     ##############################################
 
@@ -208,6 +324,7 @@ class Hierarchy:
 
         if node.parent is None:
             self._root_nodes.append(node)
+        self._invalidate_indexes()
 
     ##############################################
 
@@ -222,6 +339,21 @@ class Hierarchy:
     def sort(self):
 
         self._root_nodes.sort()
+        self._invalidate_indexes()
+
+    ##############################################
+
+    def flatten(self):
+
+        """Return the :class:`FlatHierarchy` of this hierarchy.
+
+        The result is cached until a node is added, nodes must not be moved afterwards.
+
+        """
+
+        if self._flat_hierarchy is None:
+            self._flat_hierarchy = FlatHierarchy(self)
+        return self._flat_hierarchy
 
     ##############################################
 
@@ -238,3 +370,26 @@ class Hierarchy:
 
         for root_node in self._root_nodes:
             yield from root_node.depth_first_search()
+
+    ##############################################
+
+    def __contains__(self, node_hash):
+
+        return node_hash in self._nodes
+
+    ##############################################
+
+    def hashes_in_range(self, inf, sup):
+
+        """Return the sorted hashes of the registered nodes in the interval [inf, sup]."""
+
+        if self._sorted_hashes is None:
+            self._sorted_hashes = sorted(self._nodes.keys())
+        hashes = self._sorted_hashes
+        return hashes[bisect_left(hashes, inf):bisect_right(hashes, sup)]
+
+    ##############################################
+
+    def nodes_in_range(self, inf, sup):
+
+        return [self._nodes[node_hash] for node_hash in self.hashes_in_range(inf, sup)]
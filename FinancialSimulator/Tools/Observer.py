@@ -26,7 +26,10 @@
 
 ####################################################################################################
 
+from contextlib import contextmanager
+import atexit
 import logging
+import queue
 import threading
 import weakref
 
@@ -108,19 +111,148 @@ class Observer:
 
 ####################################################################################################
 
+class AsyncDispatcher:
+
+    """This class dispatches calls to a pool of worker threads.
+
+    Each worker has a bounded queue, the calls submitted with the same key go to the same worker
+    and are thus run in order.  :meth:`submit` blocks when the queue is full.  Workers are started
+    on demand and stopped by :meth:`join`.
+
+    """
+
+    _logger = _module_logger.getChild('AsyncDispatcher')
+
+    ##############################################
+
+    def __init__(self, number_of_workers=2, queue_size=1024):
+
+        self._number_of_workers = number_of_workers
+        self._queue_size = queue_size
+        self._lock = threading.Lock()
+        self._queues = []
+        self._threads = []
+
+    ##############################################
+
+    @property
+    def number_of_workers(self):
+        return self._number_of_workers
+
+    ##############################################
+
+    def _start(self):
+
+        with self._lock:
+            if not self._threads:
+                queues = [queue.Queue(self._queue_size) for i in range(self._number_of_workers)]
+                threads = [threading.Thread(target=self._run, args=(queue_,),
+                                            name='AsyncDispatcher-{}'.format(i), daemon=True)
+                           for i, queue_ in enumerate(queues)]
+                for thread in threads:
+                    thread.start()
+                # submit reads the list without the lock, thus it is assigned once complete
+                self._queues, self._threads = queues, threads
+            return self._queues
+
+    ##############################################
+
+    def _run(self, queue_):
+
+        while True:
+            item = queue_.get()
+            try:
+                if item is None:
+                    return
+                function, kwargs = item
+                function(**kwargs)
+            except Exception:
+                self._logger.exception('Asynchronous call failed')
+            finally:
+                queue_.task_done()
+
+    ##############################################
+
+    def submit(self, key, function, **kwargs):
+
+        queues = self._queues or self._start()
+        queues[hash(key) % len(queues)].put((function, kwargs))
+
+    ##############################################
+
+    def flush(self):
+
+        """Wait until the submitted calls are done."""
+
+        for queue_ in list(self._queues):
+            queue_.join()
+
+    ##############################################
+
+    def join(self):
+
+        """Run the pending calls and stop the workers."""
+
+        with self._lock:
+            queues, threads = self._queues, self._threads
+            self._queues, self._threads = [], []
+        for queue_ in queues:
+            queue_.put(None)
+        for thread in threads:
+            thread.join()
+
+####################################################################################################
+
+_default_dispatcher = None
+
+def default_dispatcher():
+
+    """Return the dispatcher used by the receivers connected with *async_*, the pending calls are run
+    at exit.
+
+    """
+
+    global _default_dispatcher
+    if _default_dispatcher is None:
+        _default_dispatcher = AsyncDispatcher()
+        atexit.register(_default_dispatcher.join)
+    return _default_dispatcher
+
+####################################################################################################
+
 class Signal:
 
+    """This class implements a signal.
+
+    A receiver is called with the keyword arguments *signal*, *sender* and the keyword arguments
+    given to :meth:`send`.  A receiver connected with *batched* set is called with the keyword
+    arguments *signal* and *events*, a list of (sender, kwargs) tuples, it receives a single event
+    outside a batch.
+
+    A receiver connected with *async_* set, or with an :class:`AsyncDispatcher` as *executor*, is
+    called from a worker thread, in the order of the events, and its responses are not collected.
+    Use :meth:`flush` to wait for the pending calls.  Since the call is deferred, such a receiver
+    must not rely on the state of the sender at the time of the event.
+
+    Within a ``with signal.batch():`` block, the events sent by the current thread are buffered and
+    delivered at the end of the block: once to the batched receivers, one by one to the others.  If
+    *coalesce* is set, only the last event of a sender is delivered, at the position of its first
+    event.
+
+    """
+
     ##############################################
 
     def __init__(self):
 
         self._lock = threading.Lock()
-        self._receivers = []
+        self._receivers = [] # (receiver_ref, batched, dispatcher)
         self._dead_receivers = True
+        self._local = threading.local()
 
     ##############################################
 
-    def connect(self, receiver):
+    def connect(self, receiver, batched=False, async_=False, executor=None):
 
         # Check for bound methods
         if hasattr(receiver, '__self__') and hasattr(receiver, '__func__'):
@@ -132,10 +264,14 @@ class Signal:
         receiver_ref = ref(receiver)
         weakref.finalize(receiver_object, self._remove_receiver)
 
+        if executor is None and async_:
+            executor = default_dispatcher()
+
         with self._lock:
             self._clear_dead_receivers()
-            if receiver not in self._receivers:
-                self._receivers.append(receiver_ref)
+            # Weak references to alive objects compare as their referents
+            if receiver_ref not in [item[0] for item in self._receivers]:
+                self._receivers.append((receiver_ref, batched, executor))
 
     ##############################################
 
@@ -143,36 +279,155 @@ class Signal:
 
         with self._lock:
             self._clear_dead_receivers()
-            try:
-                self._receivers.remove(receiver)
-            except ValueError:
-                pass
+            self._receivers = [item for item in self._receivers if item[0]() != receiver]
 
     ##############################################
 
     def has_listeners(self):
 
-        self._clear_dead_receivers()
-        return bool(self._receivers)
+        with self._lock:
+            self._clear_dead_receivers()
+            return bool(self._receivers)
+
+    ##############################################
+
+    def _live_receivers(self):
+
+        # The list is replaced and never modified in place, thus it is iterated without the lock
+        # which could be acquired by a receiver.
+        with self._lock:
+            self._clear_dead_receivers()
+            receivers = self._receivers
+        for receiver_ref, batched, dispatcher in receivers:
+            receiver = receiver_ref()
+            if receiver is not None:
+                yield receiver_ref, receiver, batched, dispatcher
+
+    ##############################################
+
+    @staticmethod
+    def _dispatch_key(receiver_ref):
+
+        # The weak reference is stable, thus the calls of a receiver go to the same worker.  Drop
+        # the low bits of the address which are always zero.
+        return id(receiver_ref) >> 4
+
+    ##############################################
+
+    def _call(self, receiver_ref, receiver, batched, dispatcher, sender, kwargs):
+
+        if batched:
+            kwargs = dict(events=[(sender, kwargs)])
+        else:
+            kwargs = dict(kwargs, sender=sender)
+        if dispatcher is not None:
+            dispatcher.submit(self._dispatch_key(receiver_ref), receiver, signal=self, **kwargs)
+        else:
+            return receiver(signal=self, **kwargs)
 
     ##############################################
 
     def send(self, sender, **kwargs):
 
-        # return [(receiver, receiver(signal=self, sender=sender, **kwargs))
-        #         for receiver in self._receivers]
+        """Send the signal and return the list of (receiver, response), the responses are not
+        collected within a batch.
+
+        """
+
+        if self._batch is not None:
+            self._buffer(sender, kwargs)
+            return []
 
-        self._clear_dead_receivers()
         responses = []
-        for receiver_ref in self._receivers:
-            receiver = receiver_ref()
-            response = receiver(signal=self, sender=sender, **kwargs)
-            responses.append((receiver, response))
+        for receiver_ref, receiver, batched, dispatcher in self._live_receivers():
+            response = self._call(receiver_ref, receiver, batched, dispatcher, sender, kwargs)
+            if dispatcher is None:
+                responses.append((receiver, response))
 
         return responses
 
     ##############################################
 
+    def emit(self, sender, **kwargs):
+
+        """Send the signal without collecting the responses."""
+
+        if not self._receivers:
+            return
+        if self._batch is not None:
+            self._buffer(sender, kwargs)
+            return
+
+        for receiver_ref, receiver, batched, dispatcher in self._live_receivers():
+            self._call(receiver_ref, receiver, batched, dispatcher, sender, kwargs)
+
+    ##############################################
+
+    @property
+    def _batch(self):
+        return getattr(self._local, 'batch', None)
+
+    ##############################################
+
+    def _buffer(self, sender, kwargs):
+
+        batch = self._local.batch
+        if self._local.coalesce:
+            # insertion order is kept on update
+            batch[id(sender)] = (sender, kwargs)
+        else:
+            batch.append((sender, kwargs))
+
+    ##############################################
+
+    @contextmanager
+    def batch(self, coalesce=False):
+
+        """Buffer the events sent within the block by the current thread.  A nested block joins the
+        enclosing one.
+
+        """
+
+        if self._batch is not None:
+            yield
+            return
+
+        self._local.batch = {} if coalesce else []
+        self._local.coalesce = coalesce
+        try:
+            yield
+        finally:
+            batch = self._local.batch
+            self._local.batch = None
+            events = list(batch.values()) if coalesce else batch
+            if events:
+                self._deliver(events)
+
+    ##############################################
+
+    def _deliver(self, events):
+
+        for receiver_ref, receiver, batched, dispatcher in self._live_receivers():
+            if batched:
+                if dispatcher is not None:
+                    dispatcher.submit(self._dispatch_key(receiver_ref), receiver, signal=self, events=events)
+                else:
+                    receiver(signal=self, events=events)
+            else:
+                for sender, kwargs in events:
+                    self._call(receiver_ref, receiver, batched, dispatcher, sender, kwargs)
+
+    ##############################################
+
+    def flush(self):
+
+        """Wait until the asynchronous receivers have processed the pending events."""
+
+        for dispatcher in set(item[2] for item in self._receivers if item[2] is not None):
+            dispatcher.flush()
+
+    ##############################################
+
     def _remove_receiver(self):
 
         # Mark that the self.receivers list has dead weakrefs. If so, we will clean those up in
@@ -192,9 +447,9 @@ class Signal:
 
         if self._dead_receivers:
             self._dead_receivers = False
-            self._receivers = [receiver
-                               for receiver in self._receivers
-                               if receiver() is not None]
+            self._receivers = [item
+                               for item in self._receivers
+                               if item[0]() is not None]
 
 ####################################################################################################
 
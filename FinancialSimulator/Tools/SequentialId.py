@@ -20,6 +20,8 @@
 
 ####################################################################################################
 
+import threading
+
 from atomiclong import AtomicLong
 
 ####################################################################################################
@@ -31,6 +33,7 @@ class SequentialId:
     def __init__(self, start_id=0):
 
         self._id = AtomicLong(start_id)
+        self._lock = threading.Lock()
 
     ##############################################
 
@@ -40,8 +43,203 @@ class SequentialId:
     ##############################################
 
     def increment(self):
-        # right ?
-        # value = self._id.value
-        self._id += 1
-        value = self._id.value
-        return value
+
+        # the increment and the read must be atomic
+        with self._lock:
+            self._id += 1
+            return self._id.value
+
+    ##############################################
+
+    def reserve(self, count):
+
+        """Reserve a block of *count* consecutive ids and return them as a range"""
+
+        with self._lock:
+            self._id += count
+            stop = self._id.value +1
+        return range(stop - count, stop)
+
+####################################################################################################
+
+class SequenceAllocator:
+
+    """This class allocates unique sequence numbers.
+
+    :meth:`allocate` and :meth:`reserve` reserve blocks of consecutive numbers per writer thread,
+    thus the lock is only taken once per block.  The numbers allocated by a thread are increasing,
+    but the numbers left unused in the block of a thread are skipped unless this thread calls
+    :meth:`release` before another block is reserved.  These numbers are not persisted.
+
+    :meth:`commit` returns the next numbers after the high-water mark, it is called by a journal
+    under its commit lock when it writes entries, thus the committed numbers of a journal are
+    gap-free and in commit order whatever the number of writer threads.  A range of a failed write
+    is given back by :meth:`cancel`.
+
+    The high-water mark is the greatest reserved number.  If a *store* is given, its
+    ``save_high_water_mark(key, value)`` method is called with the committed mark, the allocator can
+    thus restart from the persisted mark without reusing nor skipping a number.
+
+    """
+
+    __default_block_size__ = 64
+
+    ##############################################
+
+    def __init__(self, high_water_mark=0, block_size=None, store=None, key=None):
+
+        self._high_water_mark = high_water_mark
+        self._block_size = block_size or self.__default_block_size__
+        self._store = store
+        self._key = key
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # incremented to invalidate the blocks of the threads
+        self._generation = 0
+
+    ##############################################
+
+    def __int__(self):
+        return self._high_water_mark
+
+    @property
+    def high_water_mark(self):
+        return self._high_water_mark
+
+    @property
+    def block_size(self):
+        return self._block_size
+
+    ##############################################
+
+    def _block(self):
+
+        """Return the thread local block if it is valid, else None"""
+
+        local = self._local
+        if getattr(local, 'generation', -1) == self._generation and local.next_id:
+            return local
+        else:
+            return None
+
+    ##############################################
+
+    def _reserve(self, count):
+
+        # Caller must hold the lock
+        start = self._high_water_mark +1
+        self._high_water_mark += count
+        return start
+
+    ##############################################
+
+    def _save(self):
+
+        # Caller must hold the lock
+        if self._store is not None:
+            self._store.save_high_water_mark(self._key, self._high_water_mark)
+
+    ##############################################
+
+    def allocate(self):
+
+        """Return the next sequence number of the calling thread"""
+
+        local = self._block()
+        if local is not None and local.next_id <= local.stop:
+            next_id = local.next_id
+            local.next_id = next_id +1
+            return next_id
+        with self._lock:
+            start = self._reserve(self._block_size)
+            generation = self._generation
+        local = self._local
+        local.generation = generation
+        local.next_id = start +1
+        local.stop = start + self._block_size -1
+        return start
+
+    ##############################################
+
+    def reserve(self, count):
+
+        """Reserve a block of *count* consecutive numbers and return them as a range.
+
+        The block of the calling thread is used if it is large enough.
+
+        """
+
+        local = self._block()
+        if local is not None and local.next_id + count -1 <= local.stop:
+            next_id = local.next_id
+            local.next_id = next_id + count
+            return range(next_id, next_id + count)
+        # the remaining numbers of the block are given back if possible
+        self.release()
+        with self._lock:
+            start = self._reserve(count)
+        return range(start, start + count)
+
+    ##############################################
+
+    def commit(self, count):
+
+        """Return the next *count* numbers after the high-water mark as a range and persist the mark.
+
+        The caller must serialise the commits, e.g. using the commit lock of a journal, so as the
+        numbers are in commit order.
+
+        """
+
+        with self._lock:
+            start = self._reserve(count)
+            self._save()
+        return range(start, start + count)
+
+    ##############################################
+
+    def release(self):
+
+        """Give back the unused numbers of the block of the calling thread"""
+
+        local = self._block()
+        if local is None:
+            return
+        with self._lock:
+            if local.generation == self._generation and local.stop == self._high_water_mark:
+                # the block is the last one
+                self._high_water_mark = local.next_id -1
+        local.next_id = 0
+
+    ##############################################
+
+    def cancel(self, numbers):
+
+        """Give back a range returned by :meth:`reserve` in the calling thread, e.g. after a failed
+        write, if no number was allocated since.
+
+        """
+
+        if not numbers:
+            return
+        local = self._block()
+        if local is not None and local.next_id == numbers[-1] +1:
+            local.next_id = numbers[0]
+            return
+        with self._lock:
+            if numbers[-1] == self._high_water_mark:
+                self._high_water_mark = numbers[0] -1
+                self._save()
+
+    ##############################################
+
+    def advance_to(self, high_water_mark):
+
+        """Ensure the next numbers are greater than *high_water_mark*, e.g. after a load."""
+
+        with self._lock:
+            if high_water_mark > self._high_water_mark:
+                self._high_water_mark = high_water_mark
+                self._save()
+            # the blocks can overlap the loaded numbers
+            self._generation += 1
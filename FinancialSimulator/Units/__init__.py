@@ -20,11 +20,246 @@
 
 ####################################################################################################
 
+from decimal import Decimal, ROUND_HALF_UP
+from fractions import Fraction
+import numbers
+
+####################################################################################################
+
 def round_currency(x):
     return round(x, 2)
 
 ####################################################################################################
 
+def round_half_up(x):
+
+    """Round a number to the nearest integer, half away from zero"""
+
+    if isinstance(x, int):
+        return x
+    if isinstance(x, Fraction):
+        # exact, Decimal doesn't convert a Fraction
+        quotient, remainder = divmod(abs(x.numerator), x.denominator)
+        if 2 * remainder >= x.denominator:
+            quotient += 1
+        return quotient if x >= 0 else -quotient
+    if isinstance(x, float):
+        # use the shortest representation, e.g. 28.499999999999996 is 28.5
+        x = repr(x)
+    return int(Decimal(x).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+####################################################################################################
+
+class Money:
+
+    """This class implements a fixed-point amount of money.
+
+    The amount is stored as an integer number of minor units, e.g. cents, so sums and comparisons
+    are exact.  A :class:`Money` can be compared to a number, added to a number or subtracted from
+    it, the number is then rounded to minor units as :meth:`from_value` does, e.g. ``Money(12010) ==
+    120.1``.  Thus the hash is the one of the float value.
+
+    """
+
+    __scale__ = 100 # minor units per major unit
+    __default_currency__ = '€'
+
+    ##############################################
+
+    def __init__(self, minor_units=0, currency=None):
+
+        self._minor_units = int(minor_units)
+        if currency is None:
+            currency = self.__default_currency__
+        self._currency = currency
+
+    ##############################################
+
+    @classmethod
+    def from_value(cls, value, currency=None):
+
+        """Build an amount from a number or a decimal string given in major units"""
+
+        return cls(cls._to_minor_units(value), currency)
+
+    ##############################################
+
+    @classmethod
+    def _to_minor_units(cls, value):
+
+        """Round a number or a decimal string given in major units to minor units"""
+
+        if isinstance(value, str):
+            value = Decimal(value.replace(',', '.'))
+        elif isinstance(value, float):
+            value = Decimal(repr(value))
+        return round_half_up(value * cls.__scale__)
+
+    ##############################################
+
+    @property
+    def minor_units(self):
+        return self._minor_units
+
+    @property
+    def currency(self):
+        return self._currency
+
+    ##############################################
+
+    def __float__(self):
+        return self._minor_units / self.__scale__
+
+    def __bool__(self):
+        return self._minor_units != 0
+
+    def __hash__(self):
+        return hash(float(self))
+
+    ##############################################
+
+    def __str__(self):
+
+        sign = '-' if self._minor_units < 0 else ''
+        major, minor = divmod(abs(self._minor_units), self.__scale__)
+        return '{}{}.{:02}'.format(sign, major, minor)
+
+    ##############################################
+
+    def __repr__(self):
+        return 'Money({}, {!r})'.format(self._minor_units, self._currency)
+
+    ##############################################
+
+    def _other_minor_units(self, other):
+
+        if isinstance(other, Money):
+            if other._currency != self._currency:
+                raise ValueError("Currency mismatch {} != {}".format(self._currency, other._currency))
+            return other._minor_units
+        else:
+            return None
+
+    ##############################################
+
+    def _number_minor_units(self, other):
+
+        """Return the minor units of an amount or of a number, else None"""
+
+        minor_units = self._other_minor_units(other)
+        if minor_units is not None:
+            return minor_units
+        elif isinstance(other, (numbers.Real, Decimal)):
+            return self._to_minor_units(other)
+        else:
+            return None
+
+    ##############################################
+
+    def __add__(self, other):
+
+        minor_units = self._number_minor_units(other)
+        if minor_units is not None:
+            return Money(self._minor_units + minor_units, self._currency)
+        else:
+            return NotImplemented
+
+    __radd__ = __add__
+
+    ##############################################
+
+    def __sub__(self, other):
+
+        minor_units = self._number_minor_units(other)
+        if minor_units is not None:
+            return Money(self._minor_units - minor_units, self._currency)
+        else:
+            return NotImplemented
+
+    ##############################################
+
+    def __rsub__(self, other):
+
+        minor_units = self._number_minor_units(other)
+        if minor_units is not None:
+            return Money(minor_units - self._minor_units, self._currency)
+        else:
+            return NotImplemented
+
+    ##############################################
+
+    def __neg__(self):
+        return Money(-self._minor_units, self._currency)
+
+    def __abs__(self):
+        return Money(abs(self._minor_units), self._currency)
+
+    ##############################################
+
+    def __mul__(self, x):
+
+        if isinstance(x, Money):
+            return NotImplemented
+        if isinstance(x, float):
+            x = Decimal(repr(x))
+        return Money(round_half_up(self._minor_units * x), self._currency)
+
+    __rmul__ = __mul__
+
+    ##############################################
+
+    def _compare(self, other):
+
+        """Return the minor units of self and other as comparable numbers"""
+
+        minor_units = self._number_minor_units(other)
+        if minor_units is None:
+            raise TypeError("Cannot compare {} to {!r}".format(self, other))
+        return self._minor_units, minor_units
+
+    def __eq__(self, other):
+        if isinstance(other, Money) and other._currency != self._currency:
+            return False
+        try:
+            x, y = self._compare(other)
+        except TypeError:
+            return NotImplemented
+        return x == y
+
+    def __lt__(self, other):
+        x, y = self._compare(other)
+        return x < y
+
+    def __le__(self, other):
+        x, y = self._compare(other)
+        return x <= y
+
+    def __gt__(self, other):
+        x, y = self._compare(other)
+        return x > y
+
+    def __ge__(self, other):
+        x, y = self._compare(other)
+        return x >= y
+
+####################################################################################################
+
+def to_money(value, currency=None):
+
+    """Convert a number, a decimal string, an :class:`AmountValue` or a :class:`Money` to a
+    :class:`Money`.
+
+    """
+
+    if isinstance(value, Money):
+        return value
+    elif isinstance(value, AmountValue):
+        return value.to_money()
+    else:
+        return Money.from_value(value, currency)
+
+####################################################################################################
+
 class AmountValue:
 
     ##############################################
@@ -36,8 +271,8 @@ class AmountValue:
         self._is_inclusive = is_inclusive
 
         if is_inclusive:
-            value = value / (1 + vat_rate / 100)
-        self._value = round_currency(value)
+            value = float(value) / (1 + vat_rate / 100)
+        self._value = to_money(value, currency)
 
     ##############################################
 
@@ -56,10 +291,14 @@ class AmountValue:
 
     def __float__(self):
 
-        if self._is_inclusive is None:
-            return self._value
-        elif self._is_inclusive:
-            return self.to_inclusive()
+        return float(self.to_money())
+
+    ##############################################
+
+    def to_money(self):
+
+        if self._is_inclusive:
+            return self._value * (1 + self._vat_rate / 100)
         else:
             return self._value
 
@@ -91,20 +330,20 @@ class AmountValue:
 
     @property
     def vat(self):
-        value = self._value * self.vat_rate / 100
+        value = self._value * (self.vat_rate / 100)
         return AmountValue(self._currency, value)
 
     ##############################################
 
     def to_inclusive(self):
-        return round_currency(self._value * (1 + self._vat_rate / 100))
+        return float(self._value * (1 + self._vat_rate / 100))
 
     ##############################################
 
     @property
     def inclusive(self):
         value = self._value * (1 + self._vat_rate / 100)
-        return AmountValue(self._currency, value, self._vat_rate, is_inclusive=True)
+        return AmountValue(self._currency, float(value), self._vat_rate, is_inclusive=True)
 
     ##############################################
 
@@ -117,7 +356,7 @@ class AmountValue:
 
     def __mul__(self, x):
 
-        value = float(self._value) * float(x)
+        value = self._value * float(x)
         return AmountValue(self._currency, value, self._vat_rate, self._is_inclusive)
 
 ####################################################################################################
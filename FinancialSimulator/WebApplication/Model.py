@@ -58,6 +58,12 @@ class Model:
     def journals(self):
         return self._journals
 
+    ##############################################
+
+    @property
+    def posting_index(self):
+        return self._journals.posting_index
+
 ####################################################################################################
 
 model = Model()
@@ -38,14 +38,14 @@ def index():
 
 @main.route('/account_chart')
 def account_chart():
-    accounts = [account for account in model.account_chart if account.has_imputations()]
+    accounts = model.account_chart.compute_balances().rows(with_imputations=True)
     return render_template('account_chart.html',
                            account_chart=model.account_chart,
                            accounts=accounts)
 
 @main.route('/analytic_account_chart')
 def analytic_account_chart():
-    accounts = [account for account in model.analytic_account_chart if account.has_imputations()]
+    accounts = model.analytic_account_chart.compute_balances().rows(with_imputations=True)
     return render_template('account_chart.html',
                            account_chart=model.analytic_account_chart,
                            accounts=accounts)
@@ -56,10 +56,16 @@ def journal(label):
     return render_template('journal.html', journal=journal)
 
 @main.route('/account/<number>')
-def account(number):
+@main.route('/account/<number>/<int:page>')
+def account(number, page=0):
     account = model.account_chart[int(number)]
-    account_history = account.history
-    return render_template('account.html', account=account, history=account_history)
+    # Page the general ledger, the journals are not scanned
+    posting_index = model.posting_index
+    page_size = 100
+    number_of_pages = posting_index.number_of_pages(posting_index.number_of_postings(account), page_size)
+    postings = posting_index.page(account, page, page_size)
+    return render_template('account.html', account=account, postings=postings,
+                           page=page, number_of_pages=number_of_pages)
 
 ####################################################################################################
 
@@ -67,9 +67,11 @@ class JournalListener:
 
     def slot(self, signal, sender, **kwargs):
 
-        journal_entry = kwargs['journal_entry']
-        self._logger.info(journal_entry.to_json())
-        accounting_store.write_journal_entry(journal_entry)
+        # serialise the entry now, since the actions validate it right after it is logged, and
+        # leave the database round-trip to a worker thread
+        document = kwargs['journal_entry'].to_json()
+        self._logger.info(document)
+        default_dispatcher().submit(self, accounting_store.write_journal_entry_json, document=document)
 
 ####################################################################################################
 
@@ -92,13 +94,14 @@ class ImputationListener:
 ####################################################################################################
 
 from FinancialSimulator.Accounting.Journal import Imputation, Journal
+from FinancialSimulator.Tools.Observer import default_dispatcher
 
 journal_listener = JournalListener()
-# global
+# global, the entry is serialised synchronously and written asynchronously
 Journal.logged_entry.connect(journal_listener.slot)
 
 imputation_listener = ImputationListener()
-# global
+# global, synchronous since the snapshot reads the current account balance
 Imputation.imputed.connect(imputation_listener.slot)
 
 ####################################################################################################
@@ -123,6 +126,7 @@ stop_day = datetime.date(year +1, 1, 1)
 
 if True:
     scheduler.run(start_day, stop_day)
+    default_dispatcher().flush()
 
 if False:
     from FinancialSimulator.Accounting.BackendStore.File import AccountingStore
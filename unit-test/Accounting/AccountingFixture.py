@@ -0,0 +1,86 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+
+"""Fixtures shared by the unit tests."""
+
+####################################################################################################
+
+import datetime
+
+####################################################################################################
+
+from FinancialSimulator.Accounting.AccountChart import Account, AccountChart
+from FinancialSimulator.Accounting.FinancialPeriod import FinancialPeriod, Journals
+from FinancialSimulator.Accounting.JournalInMemory import JournalInMemory
+
+####################################################################################################
+
+def make_account_chart():
+
+    """Return the chart of accounts shared by the unit tests"""
+
+    account_chart = AccountChart('test')
+    for number, description, parent in (
+            (4, 'Comptes de tiers', None),
+            (411, 'Clients', 4),
+            (44571, 'TVA collectée', 4),
+            (5, 'Comptes financiers', None),
+            (51, 'Banques', 5),
+            (512, 'Banques', 51),
+            (5121, 'Compte 1', 512),
+            (5122, 'Compte 2', 512),
+            (53, 'Caisse', 5),
+            (6, 'Comptes de charges', None),
+            (60, 'Achats', 6),
+            (601, 'Achats stockés - Matières premières', 60),
+            (604, "Achats d'études et prestations de services", 60),
+            (606, 'Achats non stockés de matière et fournitures', 60),
+            (61, 'Services extérieurs', 6),
+            (613, 'Locations', 61),
+            (7, 'Comptes de produits', None),
+            (706, 'Prestations de services', 7),
+    ):
+        if parent is not None:
+            parent = account_chart[parent]
+        account_chart.add_node(Account(number, description, parent=parent))
+    return account_chart
+
+####################################################################################################
+
+def make_financial_period(journal_factory=JournalInMemory, journals_factory=None):
+
+    """Return a financial period with a sales journal *JV*, whose journals are instances of
+    *journals_factory*, else of a :class:`Journals` subclass which makes *journal_factory*.
+
+    """
+
+    if journals_factory is None:
+        class journals_factory(Journals):
+            __journal_factory__ = journal_factory
+
+    class MyFinancialPeriod(FinancialPeriod):
+        __journals_factory__ = journals_factory
+
+    return MyFinancialPeriod(make_account_chart(), None,
+                             (('JV', 'Journal des ventes'),),
+                             datetime.date(2016, 1, 1), datetime.date(2016, 12, 31))
@@ -0,0 +1,144 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+import datetime
+import unittest
+
+####################################################################################################
+
+from FinancialSimulator.Accounting.AccountBalanceHistory import AccountChartBalanceWithHistory
+from FinancialSimulator.Accounting.FinancialPeriod import FinancialPeriod, Journals
+from FinancialSimulator.Accounting.Journal import (DebitImputationData as Debit,
+                                                   CreditImputationData as Credit,
+                                                   Imputation)
+from FinancialSimulator.Accounting.JournalInMemory import JournalInMemory
+from FinancialSimulator.Units import Money
+
+from AccountingFixture import make_account_chart
+
+####################################################################################################
+
+class MyJournals(Journals):
+    __journal_factory__ = JournalInMemory
+
+class MyFinancialPeriod(FinancialPeriod):
+    __account_chart_factory__ = AccountChartBalanceWithHistory
+    __journals_factory__ = MyJournals
+
+####################################################################################################
+
+class HistoryListener:
+
+    def slot(self, signal, sender, **kwargs):
+        sender.account.history.save(sender)
+
+####################################################################################################
+
+class TestAccountBalanceHistory(unittest.TestCase):
+
+    ##############################################
+
+    def test(self):
+
+        financial_period = MyFinancialPeriod(make_account_chart(), None, (('JV', 'Journal des ventes'),),
+                                             datetime.date(2016, 1, 1), datetime.date(2016, 12, 31))
+        account_chart = financial_period.account_chart
+        journal = financial_period.journals['JV']
+
+        listener = HistoryListener()
+        Imputation.imputed.connect(listener.slot)
+        try:
+            for month, day, amount in (
+                    (1, 10, 100),
+                    (3, 1, 50),
+                    (3, 1, 25),
+                    (6, 30, 10),
+                    (2, 15, 1000), # out of order
+                    (9, 1, 5),
+            ):
+                journal.log_entry(datetime.date(2016, month, day), 'Vente',
+                                  (Debit(512, amount), Credit(706, amount)))
+        finally:
+            Imputation.imputed.disconnect(listener.slot)
+
+        history = account_chart[512].history
+        self.assertEqual(history.balance_at(datetime.date(2016, 1, 9)), 0)
+        self.assertEqual(history.balance_at(datetime.date(2016, 1, 10)), -100)
+        self.assertEqual(history.balance_at(datetime.date(2016, 3, 1)), -1175)
+        self.assertEqual(history.balance_at(datetime.date(2016, 6, 30)), -1185)
+        self.assertEqual(history.balance_at(datetime.date(2017, 1, 1)), -1190)
+        self.assertEqual(history.balance_at(datetime.date(2017, 1, 1)), account_chart[512].balance)
+        self.assertEqual(history.debit_credit_at(datetime.date(2016, 2, 15)), (Money(110000), Money(0)))
+        self.assertEqual(history.balance_between(datetime.date(2016, 2, 15), datetime.date(2016, 3, 1)), -1075)
+        self.assertEqual(account_chart[706].history.balance_between(datetime.date(2016, 3, 2),
+                                                                    datetime.date(2016, 12, 31)), 15)
+
+        snapshots = list(history.snapshots(stop=datetime.date(2016, 3, 1)))
+        self.assertListEqual([snapshot.date.month for snapshot in snapshots], [1, 2, 3, 3])
+        self.assertEqual(snapshots[-1].balance, -1175)
+        self.assertEqual(len(history), 6)
+
+        balances = account_chart.balances_at(datetime.date(2016, 3, 31))
+        self.assertEqual(balances[5].balance, -1175)
+        self.assertEqual(balances[7].balance, 1175)
+
+    ##############################################
+
+    def test_force_balance(self):
+
+        financial_period = MyFinancialPeriod(make_account_chart(), None, (('JV', 'Journal des ventes'),),
+                                             datetime.date(2016, 1, 1), datetime.date(2016, 12, 31))
+        account_chart = financial_period.account_chart
+        journal = financial_period.journals['JV']
+        account = account_chart[512]
+        history = account.history
+
+        listener = HistoryListener()
+        Imputation.imputed.connect(listener.slot)
+        self.addCleanup(Imputation.imputed.disconnect, listener.slot)
+
+        journal.log_entry(datetime.date(2016, 1, 10), 'Vente', (Debit(512, 100), Credit(706, 100)))
+        account.force_balance(debit=30, date=datetime.date(2016, 2, 1))
+        journal.log_entry(datetime.date(2016, 3, 1), 'Vente', (Debit(512, 5), Credit(706, 5)))
+        # out of order, before the reset point
+        journal.log_entry(datetime.date(2016, 1, 20), 'Vente', (Debit(512, 1000), Credit(706, 1000)))
+
+        self.assertEqual(len(history), 3)
+        self.assertEqual(history.balance_at(datetime.date(2016, 1, 31)), -1100)
+        self.assertEqual(history.balance_at(datetime.date(2016, 2, 1)), -30)
+        self.assertEqual(history.balance_at(datetime.date(2016, 3, 1)), -35)
+        snapshots = list(history)
+        self.assertListEqual([snapshot.date.day for snapshot in snapshots], [10, 20, 1])
+        self.assertListEqual([snapshot.balance for snapshot in snapshots], [-100, -1100, -35])
+
+        # the reset point is saved after the last imputation by default
+        account.force_balance(debit=7)
+        self.assertEqual(history.balance_at(datetime.date(2016, 12, 31)), -7)
+        journal.log_entry(datetime.date(2016, 4, 1), 'Vente', (Debit(512, 1), Credit(706, 1)))
+        self.assertEqual(history.balance_at(datetime.date(2016, 12, 31)), -8)
+        self.assertEqual(history.balance_at(datetime.date(2016, 12, 31)), account.balance)
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,71 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+import unittest
+
+####################################################################################################
+
+from FinancialSimulator.Accounting.AccountChart import Account, AccountChart
+from FinancialSimulator.Tools.Hierarchy import NonExistingNodeError
+
+####################################################################################################
+
+class TestAccountChart(unittest.TestCase):
+
+    def test_index(self):
+
+        account_chart = AccountChart('test')
+        for number, parent in (
+                (6, None),
+                (60, 6),
+                (601, 60),
+                (6011, 601),
+                (604, 60),
+                (61, 6),
+                (7, None),
+        ):
+            if parent is not None:
+                parent = account_chart[parent]
+            account_chart.add_node(Account(number, '', parent=parent))
+
+        self.assertListEqual(account_chart.numbers_in_range(60, 699999), [60, 61, 601, 604, 6011])
+        self.assertListEqual(account_chart.numbers_in_range(602, 603), [])
+
+        numbers = [account.number for account in account_chart.accounts_with_prefix(60)]
+        self.assertListEqual(numbers, [60, 601, 6011, 604])
+        self.assertListEqual(account_chart.accounts_with_prefix(8), [])
+
+        self.assertEqual(account_chart.nearest_account(601100).number, 6011)
+        self.assertEqual(account_chart.nearest_account(6029).number, 60)
+        self.assertEqual(account_chart.nearest_account(7).number, 7)
+        with self.assertRaises(NonExistingNodeError):
+            account_chart.nearest_account(812)
+
+        account_chart.add_node(Account(6012, '', parent=account_chart[601]))
+        self.assertEqual(account_chart.nearest_account(60125).number, 6012)
+        self.assertEqual(len(account_chart.accounts_with_prefix(601)), 3)
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,101 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+import os
+import tempfile
+import unittest
+
+####################################################################################################
+
+from FinancialSimulator.Accounting.AccountChart import Account
+from FinancialSimulator.Accounting.AccountChartLoader import AccountChartCache, load_account_chart
+
+####################################################################################################
+
+yaml_chart = '''
+metadata:
+  name: test
+plan:
+  - code: 6
+    description: Comptes de charges
+  - code: 60
+    description: Achats
+  - code: 603
+    description: Variation des stocks
+  - code: 601
+    description: Achats stockés
+  - code: 7
+    description: Comptes de produits
+'''
+
+####################################################################################################
+
+def dump_chart(account_chart):
+
+    return [(account.number, account.description, account.parent.number if account.parent else None)
+            for account in account_chart]
+
+####################################################################################################
+
+class TestAccountChartCache(unittest.TestCase):
+
+    def test(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            yaml_path = os.path.join(directory, 'chart.yml')
+            with open(yaml_path, 'w') as f:
+                f.write(yaml_chart)
+            cache_directory = os.path.join(directory, 'cache')
+
+            reference = dump_chart(load_account_chart(yaml_path, use_cache=False))
+            self.assertListEqual([number for number, *_ in reference], [6, 60, 601, 603, 7])
+
+            cache = AccountChartCache(cache_directory)
+            account_chart = cache.load(yaml_path)
+            self.assertListEqual(dump_chart(account_chart), reference)
+            self.assertEqual(len(os.listdir(cache_directory)), 1)
+            # a copy is returned
+            account_chart.add_node(Account(70, 'Ventes', parent=account_chart[7]))
+            self.assertIsNot(cache.load(yaml_path), account_chart)
+            self.assertListEqual(dump_chart(cache.load(yaml_path)), reference)
+
+            # load the compiled chart
+            cache = AccountChartCache(cache_directory)
+            self.assertListEqual(dump_chart(cache.load(yaml_path)), reference)
+
+            # a tampered compiled chart is not used
+            compiled_path = os.path.join(cache_directory, os.listdir(cache_directory)[0])
+            with open(compiled_path, 'w') as f:
+                f.write('garbage')
+            self.assertListEqual(dump_chart(AccountChartCache(cache_directory).load(yaml_path)), reference)
+
+            # a modified source invalidates the compiled chart
+            with open(yaml_path, 'a') as f:
+                f.write('  - code: 70\n    description: Ventes\n')
+            account_chart = cache.load(yaml_path)
+            self.assertEqual(account_chart[70].parent.number, 7)
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,145 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+import datetime
+import os
+import tempfile
+import unittest
+
+####################################################################################################
+
+from FinancialSimulator.Accounting.BackendStore.File import AccountingStore
+from FinancialSimulator.Accounting.BackendStore import JsonLines
+from FinancialSimulator.Accounting.Journal import (DebitImputationData as Debit,
+                                                   CreditImputationData as Credit)
+
+from AccountingFixture import make_financial_period
+
+####################################################################################################
+
+def log_entries(financial_period, days):
+
+    journal = financial_period.journals['JV']
+    for day in days:
+        journal.log_entry(datetime.date(2016, 1, day), 'vente', (Debit(512, day), Credit(706, day)))
+
+####################################################################################################
+
+class TestAccountingStore(unittest.TestCase):
+
+    ##############################################
+
+    def test_save_load(self):
+
+        financial_period = make_financial_period()
+        log_entries(financial_period, range(1, 6))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'financial_period.json')
+            AccountingStore.save(financial_period, path)
+            loaded_financial_period = make_financial_period()
+            AccountingStore.load(loaded_financial_period, path)
+
+        self.assertEqual(len(loaded_financial_period.journals['JV']), 5)
+        self.assertEqual(loaded_financial_period.account_chart[5].debit, 15)
+        self.assertEqual(loaded_financial_period.account_chart[706].credit, 15)
+        log_entries(loaded_financial_period, (10,))
+        self.assertEqual(loaded_financial_period.journals['JV'][-1].sequence_number, 6)
+
+    ##############################################
+
+    def test_load_balances(self):
+
+        financial_period = make_financial_period()
+        log_entries(financial_period, range(1, 6))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'financial_period.json')
+            AccountingStore.save(financial_period, path)
+            self.assertTrue(os.path.exists(AccountingStore.journal_path(path)))
+            # the journal file is not read
+            os.remove(AccountingStore.journal_path(path))
+            loaded_financial_period = make_financial_period()
+            AccountingStore.load(loaded_financial_period, path, journals=False)
+
+        self.assertEqual(len(loaded_financial_period.journals['JV']), 0)
+        self.assertEqual(loaded_financial_period.account_chart[512].debit, 15)
+        log_entries(loaded_financial_period, (10,))
+        self.assertEqual(loaded_financial_period.journals['JV'][-1].sequence_number, 6)
+
+    ##############################################
+
+    def test_delta(self):
+
+        financial_period = make_financial_period()
+        log_entries(financial_period, range(1, 4))
+        snapshot = AccountingStore.balance_snapshot(financial_period)
+        log_entries(financial_period, (10, 20))
+
+        loaded_financial_period = make_financial_period()
+        loaded_financial_period.journals.load_json(financial_period.journals.to_json())
+        self.assertTrue(AccountingStore.restore_balances(loaded_financial_period, snapshot))
+        self.assertEqual(loaded_financial_period.account_chart[512].debit, 36)
+
+        # the delta is selected by sequence number, not by position
+        tail_financial_period = make_financial_period()
+        tail_financial_period.journals.load_json({'JV': financial_period.journals['JV'].to_json()[3:]})
+        self.assertTrue(AccountingStore.restore_balances(tail_financial_period, snapshot))
+        self.assertEqual(tail_financial_period.account_chart[512].debit, 36)
+
+        snapshot['data']['accounts'][0]['inner_debit'] = 1000
+        self.assertFalse(AccountingStore.restore_balances(make_financial_period(), snapshot))
+
+####################################################################################################
+
+class TestJsonLines(unittest.TestCase):
+
+    ##############################################
+
+    def test(self):
+
+        financial_period = make_financial_period()
+        log_entries(financial_period, range(1, 6))
+        journal_entry = financial_period.journals['JV'][0]
+        journal_entry.validate()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'journals.jsonl')
+            self.assertEqual(JsonLines.AccountingStore.save(financial_period, path), 5)
+            with open(path) as f:
+                self.assertEqual(len(f.readlines()), 5)
+            loaded_financial_period = make_financial_period()
+            self.assertEqual(JsonLines.AccountingStore.load(loaded_financial_period, path), 5)
+
+        journal = loaded_financial_period.journals['JV']
+        self.assertListEqual([journal_entry.to_json() for journal_entry in journal],
+                             financial_period.journals['JV'].to_json())
+        self.assertEqual(journal[0].validation_date, journal_entry.validation_date)
+        self.assertEqual(loaded_financial_period.account_chart[512].debit, 15)
+        log_entries(loaded_financial_period, (10,))
+        self.assertEqual(journal[-1].sequence_number, 6)
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,123 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+import unittest
+
+####################################################################################################
+
+from FinancialSimulator.Accounting.FinancialPeriod import AccountBalance, AccountChartBalance
+from FinancialSimulator.Tools.Hierarchy import NonExistingNodeError
+from FinancialSimulator.Units import Money
+
+from AccountingFixture import make_account_chart
+
+####################################################################################################
+
+class LazyAccountBalance(AccountBalance):
+    __incremental_balance__ = False
+
+class LazyAccountChartBalance(AccountChartBalance):
+    __account_balance_factory__ = LazyAccountBalance
+
+####################################################################################################
+
+class TestAccountBalance(unittest.TestCase):
+
+    ##############################################
+
+    def _test_roll_up(self, account_chart):
+
+        account_chart[5121].apply_debit(100)
+        account_chart[5122].apply_credit(30)
+        account_chart[53].apply_debit(10)
+        self.assertEqual(account_chart[512].debit, 100)
+        self.assertEqual(account_chart[5].balance, -80)
+
+        # ancestors must not be stale after new imputations
+        account_chart[5122].apply_debit(20)
+        self.assertEqual(account_chart[51].debit, 120)
+        self.assertEqual(account_chart[51].credit, 30)
+        self.assertEqual(account_chart[5].balance, -100)
+
+        account_chart[5121].force_balance(debit=50, credit=5)
+        self.assertEqual(account_chart[5121].balance, -45)
+        self.assertEqual(account_chart[512].debit, 70)
+        self.assertEqual(account_chart[5].debit, 80)
+        self.assertEqual(account_chart[5].credit, 35)
+
+        # ancestors must not be stale after the reset of an account
+        account_chart[5121].reset()
+        self.assertEqual(account_chart[5121].balance, 0)
+        self.assertEqual(account_chart[512].debit, 20)
+        self.assertEqual(account_chart[5].debit, 30)
+        self.assertEqual(account_chart[5].credit, 30)
+
+        account_chart.reset()
+        self.assertEqual(account_chart[5].balance, 0)
+        account_chart[53].apply_credit(1)
+        self.assertEqual(account_chart[5].balance, 1)
+
+    ##############################################
+
+    def test_incremental(self):
+
+        account_chart = AccountChartBalance(make_account_chart())
+        self._test_roll_up(account_chart)
+        # aggregated amounts are maintained on posting
+        account_chart[5121].apply_debit(3)
+        self.assertEqual(account_chart[5]._debit, 300)
+
+    ##############################################
+
+    def test_lazy(self):
+
+        self._test_roll_up(LazyAccountChartBalance(make_account_chart()))
+
+####################################################################################################
+
+class TestAccountChartBalances(unittest.TestCase):
+
+    def test(self):
+
+        account_chart = AccountChartBalance(make_account_chart())
+        account_chart[5121].apply_debit(100)
+        account_chart[5122].apply_credit(30)
+        account_chart[53].apply_debit('10.05')
+
+        balances = account_chart.compute_balances()
+        self.assertEqual(len(balances), len(list(account_chart)))
+        for row in balances:
+            account = account_chart[row.number]
+            self.assertEqual(row.debit, account.debit)
+            self.assertEqual(row.credit, account.credit)
+            self.assertEqual(row.balance, account.balance)
+        self.assertEqual(balances[5].balance, Money(-8005))
+        self.assertListEqual([row.number for row in balances.rows(with_imputations=True)],
+                             [5121, 5122, 53])
+        with self.assertRaises(NonExistingNodeError):
+            balances[8]
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,217 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+
+import datetime
+import threading
+import unittest
+
+####################################################################################################
+
+from FinancialSimulator.Accounting.AccountChart import Account, AccountChart
+from FinancialSimulator.Accounting.Error import RejectedBatchError
+from FinancialSimulator.Accounting.Journal import (DebitImputationData as Debit,
+                                                   CreditImputationData as Credit,
+                                                   CompactJournalMixin, Journal)
+from FinancialSimulator.Accounting.JournalColumnar import JournalColumnar
+from FinancialSimulator.Accounting.JournalInMemory import JournalInMemory
+from FinancialSimulator.Units import Money
+
+from AccountingFixture import make_financial_period
+
+####################################################################################################
+
+class CompactJournal(CompactJournalMixin, JournalInMemory):
+    pass
+
+####################################################################################################
+
+class BatchListener:
+
+    def __init__(self):
+        self.batches = []
+
+    def slot(self, signal, sender, journal_entries):
+        self.batches.append(journal_entries)
+
+####################################################################################################
+
+class TestJournal(unittest.TestCase):
+
+    ##############################################
+
+    def test_log_entries(self):
+
+        financial_period = make_financial_period()
+        journal = financial_period.journals['JV']
+        account_chart = financial_period.account_chart
+        journal.log_entry(datetime.date(2016, 1, 1), 'vente', [Debit(512, 12), Credit(706, 12)])
+
+        listener = BatchListener()
+        Journal.logged_entries.connect(listener.slot)
+        self.addCleanup(Journal.logged_entries.disconnect, listener.slot)
+
+        entries = [(datetime.date(2016, 1, 2 + i),
+                    'vente {}'.format(i),
+                    [Debit(512, 120), Credit(706, 100), Credit(44571, 20)])
+                   for i in range(5)]
+        journal_entries = journal.log_entries(entries)
+
+        self.assertListEqual([journal_entry.sequence_number for journal_entry in journal_entries],
+                             [2, 3, 4, 5, 6])
+        self.assertEqual(len(journal), 6)
+        self.assertEqual(account_chart[512].debit, 612)
+        self.assertEqual(account_chart[706].credit, 512)
+        self.assertEqual(account_chart[44571].credit, 100)
+        self.assertEqual(len(listener.batches), 1)
+        self.assertListEqual(listener.batches[0], journal_entries)
+
+        # Unbalanced entry rejects the whole batch
+        entries = [(datetime.date(2016, 2, 1), 'vente', [Debit(512, 120), Credit(706, 120)]),
+                   (datetime.date(2016, 2, 2), 'erreur', [Debit(512, 120), Credit(706, 100)])]
+        with self.assertRaises(RejectedBatchError) as context:
+            journal.log_entries(entries)
+        self.assertEqual(context.exception.index, 1)
+        self.assertEqual(len(journal), 6)
+        self.assertEqual(account_chart[512].debit, 612)
+        self.assertEqual(journal.log_entry(datetime.date(2016, 2, 3), 'vente',
+                                           [Debit(512, 1), Credit(706, 1)]).sequence_number, 7)
+
+    ##############################################
+
+    def test_failed_batch(self):
+
+        for journal_factory in JournalInMemory, JournalColumnar:
+            financial_period = make_financial_period(journal_factory)
+            journal = financial_period.journals['JV']
+            account_chart = financial_period.account_chart
+            journal.log_entry(datetime.date(2016, 1, 1), 'vente', [Debit(512, 12), Credit(706, 12)])
+
+            def write_entries(journal_entries):
+                journal.write_entry(journal_entries[0])
+                raise IOError('disk full')
+            journal.write_entries = write_entries
+
+            entries = [(datetime.date(2016, 1, 2 + i), 'vente', [Debit(512, 120), Credit(706, 120)])
+                       for i in range(3)]
+            with self.assertRaises(IOError):
+                journal.log_entries(entries)
+            del journal.write_entries
+
+            self.assertEqual(len(journal), 1)
+            self.assertEqual(len(list(journal.filter(account=512))), 1)
+            self.assertEqual(account_chart[512].debit, 12)
+            self.assertEqual(account_chart[706].credit, 12)
+            # the numbers of the failed batch are reused
+            self.assertListEqual([journal_entry.sequence_number
+                                  for journal_entry in journal.log_entries(entries)], [2, 3, 4])
+
+            # the failure of the discard doesn't hide the failure of the batch
+            journal.write_entries = write_entries
+            def discard_entries(journal_entries):
+                raise RuntimeError('discard failed')
+            journal._discard_entries = discard_entries
+            with self.assertRaises(IOError) as context:
+                journal.log_entries(entries)
+            self.assertIsInstance(context.exception.__cause__, RuntimeError)
+
+    ##############################################
+
+    def test_compact(self):
+
+        financial_period = make_financial_period(CompactJournal)
+        journal = financial_period.journals['JV']
+        account_chart = financial_period.account_chart
+        journal_entry = journal.log_entry(datetime.date(2016, 1, 1), 'vente',
+                                          [Debit(512, 120), Credit(706, 100), Credit(44571, 20)])
+
+        self.assertFalse(hasattr(journal_entry, '__dict__'))
+        for imputation in journal_entry:
+            self.assertFalse(hasattr(imputation, '__dict__'))
+        self.assertEqual(journal_entry.sum_of_debits(), 120)
+        self.assertEqual(account_chart[512].debit, 120)
+        self.assertEqual(account_chart[706].credit, 100)
+
+    ##############################################
+
+    def test_threads(self):
+
+        journal = make_financial_period().journals['JV']
+
+        def writer(day):
+            for i in range(50):
+                if i % 2:
+                    journal.log_entry(datetime.date(2016, 1, day), 'vente', [Debit(512, 1), Credit(706, 1)])
+                else:
+                    journal.log_entries([(datetime.date(2016, 1, day), 'vente', [Debit(512, 1), Credit(706, 1)])] * 3)
+
+        threads = [threading.Thread(target=writer, args=(day,)) for day in range(1, 5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # the sequence numbers are gap-free and in commit order
+        self.assertListEqual([journal_entry.sequence_number for journal_entry in journal],
+                             list(range(1, 4 * 100 +1)))
+        self.assertEqual(journal.account_chart[512].debit, 400)
+
+    ##############################################
+
+    def test_currency(self):
+
+        account_chart = AccountChart('test')
+        account_chart.add_node(Account(512, 'Banques', devise='USD'))
+        imputation = Debit(512, 12.5).resolve(account_chart, None)
+        self.assertEqual(imputation.amount, Money(1250, 'USD'))
+
+    ##############################################
+
+    def test_filter(self):
+
+        for journal_factory in JournalInMemory, JournalColumnar:
+            financial_period = make_financial_period(journal_factory)
+            journal = financial_period.journals['JV']
+            # out of order
+            for day, amount in ((10, 100), (1, 50), (20, 200), (5, 10)):
+                journal.log_entry(datetime.date(2016, 1, day), 'vente {}'.format(day),
+                                  [Debit(512, amount * 1.2), Credit(706, amount), Credit(44571, amount * .2)])
+            journal.log_entry(datetime.date(2016, 1, 15), 'encaissement', [Debit(512, 30), Credit(706, 30)])
+
+            def days(**kwargs):
+                return [journal_entry.date.day for journal_entry in journal.filter(**kwargs)]
+
+            self.assertListEqual(days(), [1, 5, 10, 15, 20])
+            self.assertListEqual(days(start_date=datetime.date(2016, 1, 5),
+                                      stop_date=datetime.date(2016, 1, 15)), [5, 10, 15])
+            self.assertListEqual(days(account=44571), [1, 5, 10, 20])
+            self.assertListEqual(days(account=financial_period.account_chart[44571],
+                                      stop_date=datetime.date(2016, 1, 9)), [1, 5])
+            self.assertListEqual(days(account=706, min_amount=30, max_amount=100), [1, 10, 15])
+            self.assertListEqual(days(min_amount=100), [10, 20])
+            self.assertListEqual(days(account=4), [])
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,92 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+
+import datetime
+import unittest
+
+####################################################################################################
+
+from FinancialSimulator.Accounting.Journal import DebitImputationData, CreditImputationData
+from FinancialSimulator.Accounting.JournalColumnar import JournalColumnar
+from FinancialSimulator.Accounting.JournalInMemory import JournalInMemory
+
+from AccountingFixture import make_financial_period
+
+####################################################################################################
+
+def log_entries(journal):
+
+    for i in range(10):
+        date = datetime.date(2016, 1, 1 + i)
+        journal.log_entry(date, 'vente {}'.format(i), [
+            DebitImputationData(512, 120 + i),
+            CreditImputationData(706, 100 + i),
+            CreditImputationData(44571, 20),
+        ])
+
+####################################################################################################
+
+class TestJournalColumnar(unittest.TestCase):
+
+    def test(self):
+
+        reference_period = make_financial_period(JournalInMemory)
+        reference_journal = reference_period.journals['JV']
+        log_entries(reference_journal)
+
+        financial_period = make_financial_period(JournalColumnar)
+        journal = financial_period.journals['JV']
+        log_entries(journal)
+
+        self.assertEqual(len(journal), 10)
+        self.assertEqual(journal.store.number_of_imputations, 30)
+        self.assertListEqual(journal.to_json(), reference_journal.to_json())
+
+        account_chart = financial_period.account_chart
+        self.assertEqual(account_chart[512].debit, 1245)
+        self.assertEqual(account_chart[7].credit, 1045)
+
+        journal_entry = journal[-1]
+        self.assertEqual(journal_entry.sequence_number, 10)
+        self.assertEqual(journal_entry.date, datetime.date(2016, 1, 10))
+        self.assertEqual(journal_entry.sum_of_debits(), journal_entry.sum_of_credits())
+        imputation = next(journal_entry.debits)
+        self.assertIs(imputation.account, account_chart[512])
+        self.assertEqual(imputation.amount, 129)
+
+        journal_entry.validate()
+        self.assertIsNotNone(journal[-1].validation_date)
+
+        self.assertDictEqual(journal.sum_by_account(),
+                             {512: (1245, 0), 706: (0, 1045), 44571: (0, 200)})
+
+        account_chart.reset()
+        journal.run()
+        self.assertEqual(account_chart[512].debit, 1245)
+        self.assertEqual(account_chart[44571].credit, 200)
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,112 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+####################################################################################################
+
+import datetime
+import tempfile
+import unittest
+
+####################################################################################################
+
+from FinancialSimulator.Accounting.Journal import DebitImputationData, CreditImputationData
+from FinancialSimulator.Accounting.JournalInMemory import JournalInMemory
+from FinancialSimulator.Accounting.JournalMapped import JournalMapped
+
+from AccountingFixture import make_financial_period
+
+####################################################################################################
+
+class TestJournalMapped(unittest.TestCase):
+
+    def test(self):
+
+        reference_period = make_financial_period(JournalInMemory)
+        reference_journal = reference_period.journals['JV']
+        # dates are not in sequence order
+        for i in (3, 1, 2, 5, 4):
+            reference_journal.log_entry(datetime.date(2016, 1, i), 'vente é{}'.format(i), [
+                DebitImputationData(512, 120 * i),
+                CreditImputationData(706, 100 * i),
+                CreditImputationData(44571, 20 * i),
+            ])
+        reference_journal[1].validate()
+        reference_journal[2].reconcile(42)
+        reference_journal[3].reconcile('R-7')
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            class MyJournal(JournalMapped):
+                __journal_directory__ = directory
+
+            self.assertEqual(MyJournal.save(reference_journal), 5)
+            financial_period = make_financial_period(MyJournal)
+            journal = financial_period.journals['JV']
+
+            self.assertEqual(len(journal), 5)
+            self.assertListEqual(journal.to_json(), reference_journal.to_json())
+
+            journal_entry = journal.entry_by_sequence_number(4)
+            self.assertEqual(journal_entry.description, 'vente é5')
+            self.assertIsNone(journal.entry_by_sequence_number(5).reconciliation_id)
+            self.assertIsNotNone(journal.entry_by_sequence_number(2).validation_date)
+            # the type of the reconciliation id is kept
+            self.assertEqual(journal.entry_by_sequence_number(3).reconciliation_id, 42)
+            self.assertIsInstance(journal.entry_by_sequence_number(3).reconciliation_id, int)
+            self.assertEqual(journal.entry_by_sequence_number(4).reconciliation_id, 'R-7')
+            # the store is read-only
+            with self.assertRaises(NotImplementedError):
+                journal.entry_by_sequence_number(5).validate()
+            with self.assertRaises(NotImplementedError):
+                journal.entry_by_sequence_number(5).reconcile(43)
+            with self.assertRaises(KeyError):
+                journal.entry_by_sequence_number(6)
+
+            self.assertListEqual([journal_entry.date.day
+                                  for journal_entry in journal.entries_between(datetime.date(2016, 1, 2),
+                                                                               datetime.date(2016, 1, 4))],
+                                 [2, 3, 4])
+            self.assertListEqual([journal_entry.date.day
+                                  for journal_entry in journal.filter(account=44571, min_amount=60)],
+                                 [3, 4, 5])
+            self.assertListEqual([journal_entry.date.day
+                                  for journal_entry in journal.filter(max_amount=240)],
+                                 [1, 2])
+
+            self.assertEqual(journal.generate_sequence_number(), 6)
+            with self.assertRaises(NotImplementedError):
+                journal.log_entry(datetime.date(2016, 1, 6), 'vente', [
+                    DebitImputationData(512, 1), CreditImputationData(706, 1)])
+
+            account_chart = financial_period.account_chart
+            journal.run()
+            self.assertEqual(account_chart[512].debit, reference_period.account_chart[512].debit)
+            self.assertEqual(account_chart[7].credit, 1500)
+
+            # release the map before the directory is removed
+            del journal, financial_period
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
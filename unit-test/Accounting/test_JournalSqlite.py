@@ -0,0 +1,179 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+####################################################################################################
+
+import datetime
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+####################################################################################################
+
+from FinancialSimulator.Accounting.Journal import DebitImputationData, CreditImputationData
+from FinancialSimulator.Accounting.JournalSqlite import JournalSqlite, JournalsSqlite
+
+from AccountingFixture import make_financial_period
+
+####################################################################################################
+
+def log_entries(journal):
+
+    for i in (3, 1, 2, 5, 4):
+        journal.log_entry(datetime.date(2016, 1, i), 'vente {}'.format(i), [
+            DebitImputationData(512, 120 * i),
+            CreditImputationData(706, 100 * i),
+            CreditImputationData(44571, 20 * i),
+        ])
+
+####################################################################################################
+
+class TestJournalSqlite(unittest.TestCase):
+
+    def test(self):
+
+        reference_period = make_financial_period()
+        reference_journal = reference_period.journals['JV']
+        log_entries(reference_journal)
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            class MyJournals(JournalsSqlite):
+                __database_path__ = os.path.join(directory, 'journals.sqlite')
+
+            financial_period = make_financial_period(journals_factory=MyJournals)
+            journal = financial_period.journals['JV']
+            log_entries(journal)
+            self.assertEqual(len(journal), 5)
+            self.assertListEqual(journal.to_json(), reference_journal.to_json())
+            self.assertEqual(financial_period.account_chart[512].debit, 1800)
+            financial_period.journals.close()
+
+            # reopen the database
+            financial_period = make_financial_period(journals_factory=MyJournals)
+            journal = financial_period.journals['JV']
+            self.assertListEqual(journal.to_json(), reference_journal.to_json())
+            self.assertEqual(journal.generate_sequence_number(), 6)
+
+            self.assertEqual(journal[-1].description, 'vente 4')
+            self.assertListEqual([journal_entry.sequence_number for journal_entry in journal[1:3]], [2, 3])
+            self.assertEqual(journal.entry_by_sequence_number(4).date, datetime.date(2016, 1, 5))
+            with self.assertRaises(KeyError):
+                journal.entry_by_sequence_number(7)
+
+            self.assertListEqual([journal_entry.date.day
+                                  for journal_entry in journal.entries_between(datetime.date(2016, 1, 2),
+                                                                               datetime.date(2016, 1, 4))],
+                                 [2, 3, 4])
+            self.assertListEqual([journal_entry.date.day
+                                  for journal_entry in journal.filter(account=44571, min_amount=60)],
+                                 [3, 4, 5])
+            self.assertListEqual([journal_entry.date.day
+                                  for journal_entry in journal.filter(max_amount=240)],
+                                 [1, 2])
+            ledger = journal.ledger(706, stop_date=datetime.date(2016, 1, 3))
+            self.assertListEqual([imputation.amount for imputation in ledger], [100, 200, 300])
+            ledger = journal.ledger(706, offset=3, limit=10)
+            self.assertListEqual([imputation.amount for imputation in ledger], [400, 500])
+            self.assertEqual(journal.number_of_postings(706, start_date=datetime.date(2016, 1, 2)), 4)
+            # the imputations are not kept in memory
+            self.assertEqual(financial_period.posting_index.number_of_postings(512), 0)
+            self.assertIsNone(financial_period.journals.posting_index)
+
+            self.assertDictEqual(journal.sum_by_account(),
+                                 {512: (1800, 0), 706: (0, 1500), 44571: (0, 300)})
+            account_chart = financial_period.account_chart
+            journal.run()
+            self.assertEqual(account_chart[512].debit, 1800)
+            self.assertEqual(account_chart[4].credit, 300)
+
+            financial_period.journals.close()
+
+    ##############################################
+
+    def test_state(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            class MyJournals(JournalsSqlite):
+                __database_path__ = os.path.join(directory, 'journals.sqlite')
+
+            financial_period = make_financial_period(journals_factory=MyJournals)
+            journal = financial_period.journals['JV']
+            log_entries(journal)
+            journal.flush()
+            # stored and pending entries
+            journal.entry_by_sequence_number(1).validate()
+            journal.log_entry(datetime.date(2016, 1, 6), 'vente', [
+                DebitImputationData(512, 1), CreditImputationData(706, 1)]).validate()
+            journal.entry_by_sequence_number(2).reconcile('R2')
+            financial_period.journals.close()
+
+            journal = make_financial_period(journals_factory=MyJournals).journals['JV']
+            self.assertIsNotNone(journal.entry_by_sequence_number(1).validation_date)
+            self.assertIsNotNone(journal.entry_by_sequence_number(6).validation_date)
+            self.assertIsNone(journal.entry_by_sequence_number(3).validation_date)
+            self.assertEqual(journal.entry_by_sequence_number(2).reconciliation_id, 'R2')
+            journal.connection.close()
+
+    ##############################################
+
+    def test_flush_interval(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'journals.sqlite')
+
+            class MyJournal(JournalSqlite):
+                __flush_interval__ = .05
+
+            class MyJournals(JournalsSqlite):
+                __journal_factory__ = MyJournal
+                __database_path__ = path
+
+            def stored():
+                connection = sqlite3.connect(path)
+                try:
+                    return (connection.execute('SELECT COUNT(*) FROM journal_entry').fetchone()[0],
+                            connection.execute('SELECT high_water_mark FROM sequence').fetchone())
+                finally:
+                    connection.close()
+
+            financial_period = make_financial_period(journals_factory=MyJournals)
+            journal = financial_period.journals['JV']
+            for day in 1, 2:
+                journal.log_entry(datetime.date(2016, 1, day), 'vente', [
+                    DebitImputationData(512, 1), CreditImputationData(706, 1)])
+            self.assertEqual(stored(), (0, None))
+            time.sleep(.1)
+            journal.log_entry(datetime.date(2016, 1, 3), 'vente', [
+                DebitImputationData(512, 1), CreditImputationData(706, 1)])
+            # the entries and the high-water mark are written together
+            self.assertEqual(stored(), (3, (3,)))
+            financial_period.journals.close()
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
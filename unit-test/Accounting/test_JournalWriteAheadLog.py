@@ -0,0 +1,158 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+import datetime
+import os
+import tempfile
+import time
+import unittest
+
+####################################################################################################
+
+from FinancialSimulator.Accounting.BackendStore.WriteAheadLog import WriteAheadLog
+from FinancialSimulator.Accounting.Journal import (DebitImputationData as Debit,
+                                                   CreditImputationData as Credit)
+from FinancialSimulator.Accounting.JournalWriteAheadLog import JournalWriteAheadLog
+
+import AccountingFixture
+
+####################################################################################################
+
+def make_financial_period(directory, compaction_threshold=1000):
+
+    class MyJournal(JournalWriteAheadLog):
+        __log_directory__ = directory
+        __compaction_threshold__ = compaction_threshold
+
+    return AccountingFixture.make_financial_period(MyJournal)
+
+####################################################################################################
+
+class TestJournalWriteAheadLog(unittest.TestCase):
+
+    ##############################################
+
+    def _log_entries(self, journal, days):
+
+        for day in days:
+            journal.log_entry(datetime.date(2016, 1, day), 'vente {}'.format(day),
+                              (Debit(512, day), Credit(706, day)))
+
+    ##############################################
+
+    def test_recovery(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            journal = make_financial_period(directory).journals['JV']
+            self._log_entries(journal, range(1, 11))
+            journal.log_entries([(datetime.date(2016, 2, 1), 'vente', (Debit(512, 1.5), Credit(706, 1.5)))])
+            journal.close()
+
+            # torn record
+            with open(journal.log.path, 'ab') as f:
+                f.write(b'\x10\x00\x00\x00garbage')
+
+            financial_period = make_financial_period(directory)
+            journal = financial_period.journals['JV']
+            self.assertEqual(len(journal), 11)
+            self.assertListEqual([journal_entry.sequence_number for journal_entry in journal], list(range(1, 12)))
+            self.assertEqual(journal[-1].sum_of_debits(), 1.5)
+            journal.run()
+            self.assertEqual(financial_period.account_chart[512].debit, 56.5)
+
+            self._log_entries(journal, (20,))
+            self.assertEqual(journal[-1].sequence_number, 12)
+            journal.close()
+            self.assertEqual(len(make_financial_period(directory).journals['JV']), 12)
+
+    ##############################################
+
+    def test_validation(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            journal = make_financial_period(directory).journals['JV']
+            self._log_entries(journal, range(1, 4))
+            journal[0].validate()
+            journal[1].reconcile('R1')
+            journal.close()
+
+            journal = make_financial_period(directory).journals['JV']
+            self.assertIsNotNone(journal[0].validation_date)
+            self.assertIsNone(journal[2].validation_date)
+            self.assertEqual(journal[1].reconciliation_id, 'R1')
+            self.assertIsNotNone(journal[1].reconciliation_date)
+
+    ##############################################
+
+    def test_high_water_mark(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            journal = make_financial_period(directory).journals['JV']
+            self._log_entries(journal, range(1, 4))
+            # the numbers are allocated on commit
+            self.assertEqual(journal.sequence_allocator.high_water_mark, 3)
+            # crash
+            journal.log.close()
+
+            # no number is skipped nor reused
+            journal = make_financial_period(directory).journals['JV']
+            self._log_entries(journal, (4,))
+            self.assertEqual(journal[-1].sequence_number, 4)
+
+    ##############################################
+
+    def test_compaction(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            journal = make_financial_period(directory, compaction_threshold=5).journals['JV']
+            self._log_entries(journal, range(1, 13))
+            journal.close()
+            self.assertTrue(os.path.exists(os.path.join(directory, 'JV.snapshot.json')))
+            self.assertLessEqual(len(journal.log), 5)
+
+            journal = make_financial_period(directory, compaction_threshold=5).journals['JV']
+            self.assertListEqual([journal_entry.date.day for journal_entry in journal], list(range(1, 13)))
+
+####################################################################################################
+
+class TestWriteAheadLog(unittest.TestCase):
+
+    ##############################################
+
+    def test_timer(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'test.log')
+            log = WriteAheadLog(path, group_size=64, fsync_interval=.05)
+            for i in range(3):
+                log.append({'i': i})
+            self.assertEqual(os.path.getsize(path) if os.path.exists(path) else 0, 0)
+            # the pending records are written by the timer, without commit
+            time.sleep(.5)
+            self.assertListEqual(WriteAheadLog(path).replay(), [{'i': i} for i in range(3)])
+            log.close()
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
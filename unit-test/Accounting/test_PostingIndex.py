@@ -0,0 +1,95 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+import datetime
+import unittest
+
+####################################################################################################
+
+from FinancialSimulator.Accounting.FinancialPeriod import FinancialPeriod, Journals
+from FinancialSimulator.Accounting.Journal import (DebitImputationData as Debit,
+                                                   CreditImputationData as Credit)
+from FinancialSimulator.Accounting.JournalColumnar import JournalColumnar
+from FinancialSimulator.Accounting.JournalInMemory import JournalInMemory
+
+from AccountingFixture import make_account_chart
+
+####################################################################################################
+
+class MyJournals(Journals):
+    __journal_factory__ = JournalInMemory
+
+class MyFinancialPeriod(FinancialPeriod):
+    __journals_factory__ = MyJournals
+
+class ColumnarJournals(Journals):
+    __journal_factory__ = JournalColumnar
+
+class ColumnarFinancialPeriod(FinancialPeriod):
+    __journals_factory__ = ColumnarJournals
+
+####################################################################################################
+
+class TestPostingIndex(unittest.TestCase):
+
+    ##############################################
+
+    def test(self):
+
+        for financial_period_factory in MyFinancialPeriod, ColumnarFinancialPeriod:
+
+            financial_period = financial_period_factory(make_account_chart(), None,
+                                                        (('JV', 'Journal des ventes'),
+                                                         ('Liq', 'Liquidités')),
+                                                        datetime.date(2016, 1, 1), datetime.date(2016, 12, 31))
+            journals = financial_period.journals
+            posting_index = financial_period.posting_index
+            self.assertIs(journals.posting_index, posting_index)
+
+            for i in range(10):
+                date = datetime.date(2016, 1, 1 + i)
+                journals['JV'].log_entry(date, 'vente', (Debit(512, 100), Credit(706, 100)))
+                journals['Liq'].log_entry(date, 'vente', (Debit(53, 10), Credit(706, 10)))
+            journals['JV'].log_entries([(datetime.date(2016, 2, 1), 'vente', (Debit(512, 1), Credit(706, 1)))])
+
+            self.assertEqual(posting_index.number_of_postings(706), 21)
+            self.assertEqual(posting_index.number_of_postings(financial_period.account_chart[512]), 11)
+            self.assertEqual(posting_index.number_of_postings(5), 0)
+            self.assertEqual(posting_index.number_of_pages(21, 10), 3)
+
+            postings = posting_index.page(512, page=1, page_size=4)
+            self.assertListEqual([posting.date.day for posting in postings], [5, 6, 7, 8])
+            self.assertEqual(postings[-1].balance, -800)
+            self.assertEqual(posting_index.postings(706)[-1].balance, financial_period.account_chart[706].balance)
+            self.assertEqual(posting_index.postings(706)[1].journal_entry.journal.label, 'Liq')
+
+            postings = posting_index.subtree_page(5, page=0, page_size=5)
+            self.assertListEqual([int(posting.imputation.account.number) for posting in postings],
+                                 [512, 53, 512, 53, 512])
+            self.assertEqual(len(list(posting_index.iter_subtree(5))), 21)
+            self.assertEqual(len(posting_index.subtree_page(7, page=2, page_size=10)), 1)
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,139 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+import datetime
+import threading
+import unittest
+
+####################################################################################################
+
+from FinancialSimulator.Accounting import Results
+from FinancialSimulator.Accounting.AccountChartLoader import load_account_chart_for_country
+from FinancialSimulator.Accounting.FinancialPeriod import FinancialPeriod, AccountChartBalanceSeries
+
+####################################################################################################
+
+def row_values(table, computation_visitor):
+
+    return [float(computation_visitor[row])
+            for column in table
+            for row in column
+            if row is not None and not isinstance(row, Results.EmptyRow)]
+
+####################################################################################################
+
+class TestTable(unittest.TestCase):
+
+    ##############################################
+
+    def test_incremental(self):
+
+        financial_period = FinancialPeriod(load_account_chart_for_country('fr'), None, (),
+                                           datetime.date(2016, 1, 1), datetime.date(2016, 12, 31))
+        account_chart = financial_period.account_chart
+        account_chart[706].apply_credit(1000)
+        account_chart[601].apply_debit(400)
+
+        yaml_file = 'systeme-base-resultat-tableau.yml'
+        table = Results.YamlLoader(yaml_file).table
+        computation_visitor = table.compute(account_chart)
+        values = row_values(table, computation_visitor)
+        self.assertIs(table.compute(account_chart), computation_visitor)
+
+        for number, debit, credit in (
+                (706, 0, 500),
+                (6011, 120, 0),
+                (512, 10, 0),
+        ):
+            account = account_chart[number]
+            account.apply_debit(debit)
+            account.apply_credit(credit)
+            new_values = row_values(table, table.compute(account_chart))
+            # compare to a table computed from scratch
+            reference_table = Results.YamlLoader(yaml_file).table
+            self.assertListEqual(new_values, row_values(reference_table,
+                                                        reference_table.compute(account_chart)))
+            if number == 512:
+                # a bank account doesn't appear in the income statement
+                self.assertListEqual(new_values, values)
+            else:
+                self.assertNotEqual(new_values, values)
+            values = new_values
+
+    ##############################################
+
+    def test_compiled_computations(self):
+
+        financial_period = FinancialPeriod(load_account_chart_for_country('fr'), None, (),
+                                           datetime.date(2016, 1, 1), datetime.date(2016, 12, 31))
+        account_chart = financial_period.account_chart
+
+        table = Results.YamlLoader('systeme-base-resultat-tableau.yml').table
+        value_rows = [row
+                      for column in table
+                      for row in column.node.depth_first_search()
+                      if isinstance(row, Results.ValueRow) and row.computation is not None]
+        for i in range(5):
+            account_chart[706].apply_credit(100)
+            series = AccountChartBalanceSeries.from_balances(account_chart, [account_chart.compute_balances()])
+            for computation_visitor in (table.compute(series, array_evaluator=True),
+                                        table.compute(account_chart)):
+                for row in value_rows:
+                    computation_visitor.compute(row)
+        for row in value_rows:
+            # one chart structure, one entry per compiler
+            self.assertEqual(len(row._compiled_computations), 1)
+            self.assertEqual(len(row._compiled_computations[account_chart.flatten()]), 2)
+
+    ##############################################
+
+    def test_threads(self):
+
+        financial_period = FinancialPeriod(load_account_chart_for_country('fr'), None, (),
+                                           datetime.date(2016, 1, 1), datetime.date(2016, 12, 31))
+        account_chart = financial_period.account_chart
+        account_chart[706].apply_credit(1000)
+
+        yaml_file = 'systeme-base-resultat-tableau.yml'
+        table = Results.YamlLoader(yaml_file).table
+        table.compute(account_chart)
+        account_chart[601].apply_debit(400)
+
+        results = []
+        def compute():
+            results.append(row_values(table, table.compute(account_chart)))
+        threads = [threading.Thread(target=compute) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        reference_table = Results.YamlLoader(yaml_file).table
+        reference_values = row_values(reference_table, reference_table.compute(account_chart))
+        for values in results:
+            self.assertListEqual(values, reference_values)
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,143 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+import os
+import sys
+import threading
+import unittest
+
+import numpy as np
+
+####################################################################################################
+
+from FinancialSimulator.Accounting.FinancialPeriod import AccountChartBalance, AccountChartBalanceSeries
+from FinancialSimulator.HDL.Compiler import Compiler, ArrayCompiler
+from FinancialSimulator.HDL.Evaluator import AccountEvaluator, ArrayAccountEvaluator
+from FinancialSimulator.HDL.HdlParser import HdlAccountParser
+
+# the fixtures are shared with the accounting tests
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'Accounting'))
+from AccountingFixture import make_account_chart
+
+####################################################################################################
+
+class TestCompiler(unittest.TestCase):
+
+    ##############################################
+
+    def test(self):
+
+        account_chart = AccountChartBalance(make_account_chart())
+        account_chart[601].apply_debit(100)
+        account_chart[604].apply_debit(20)
+        account_chart[606].apply_credit(5)
+        account_chart[61].apply_debit(7)
+
+        parser = HdlAccountParser()
+        compiler = Compiler()
+        for source, value in (
+                ('60D', 120),
+                ('[604:606]D + 61D - 606C', 22),
+                ('- 6B * 61D', 122 * 7),
+                ('min_zero(6B) + max_zero(60C)', -122 + 5),
+                ('x = 601D / 606C', 20),
+                ('y = (x - 61D) * 606C', 90),
+        ):
+            program = parser.parse(source)
+            evaluator = AccountEvaluator(account_chart)
+            evaluator['x'] = 25.
+            compiled_program = compiler.compile(program, account_chart)
+            self.assertEqual(compiled_program(evaluator), value)
+            self.assertEqual(evaluator.run_ast_program(program), value)
+
+        compiled_program = compiler.compile(parser.parse('z = 60D + 60D - 601D + [602:700]D + 62D'), account_chart)
+        self.assertListEqual(compiled_program.slots,
+                             [(60, 60, 'D'), (601, 601, 'D'), (602, 700, 'D'), (62, 62, 'D')])
+        flat_hierarchy = account_chart.flatten()
+        self.assertListEqual([([flat_hierarchy[position].number for position in positions], dcb)
+                              for positions, dcb in compiled_program.positions],
+                             [([60], 'D'), ([601], 'D'), ([604, 606, 613], 'D'), ([], 'D')])
+        evaluator = AccountEvaluator(account_chart)
+        self.assertEqual(evaluator.run_compiled_program(compiled_program), 160)
+        self.assertEqual(evaluator['z'], 160)
+
+    ##############################################
+
+    def test_threads(self):
+
+        account_chart = AccountChartBalance(make_account_chart())
+        parser = HdlAccountParser()
+        programs = [parser.parse(source) for source in ('60D + 61D', '[604:606]C - 6B', '601D')]
+        compiler = Compiler()
+        compiled_slots = []
+
+        def compile_programs():
+            for i in range(100):
+                for program in programs:
+                    compiled_slots.append((program, compiler.compile(program, account_chart).slots))
+
+        threads = [threading.Thread(target=compile_programs) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        expected_slots = {id(program):compiler.compile(program, account_chart).slots for program in programs}
+        for program, slots in compiled_slots:
+            self.assertListEqual(slots, expected_slots[id(program)])
+
+####################################################################################################
+
+class TestArrayAccountEvaluator(unittest.TestCase):
+
+    ##############################################
+
+    def test(self):
+
+        account_chart = AccountChartBalance(make_account_chart())
+        snapshots = []
+        for debit_601, credit_606 in ((0, 0), (100, 5), (150, 200), (10, 400)):
+            account_chart[601].apply_debit(debit_601)
+            account_chart[606].apply_credit(credit_606)
+            snapshots.append(account_chart.compute_balances())
+        series = AccountChartBalanceSeries.from_balances(account_chart, snapshots, shape=(2, 2))
+        self.assertEqual(series.shape, (2, 2))
+
+        parser = HdlAccountParser()
+        for source in (
+                '60D - [604:606]C',
+                'x = min_zero(6B) + max_zero(60B)',
+                '- 60B',
+        ):
+            program = parser.parse(source)
+            evaluator = ArrayAccountEvaluator(series)
+            values = evaluator.run_ast_program(program)
+            compiled_values = evaluator.run_compiled_program(ArrayCompiler().compile(program, series))
+            expected_values = [AccountEvaluator(snapshot).run_ast_program(program) for snapshot in snapshots]
+            self.assertListEqual(list(np.ravel(values)), expected_values)
+            self.assertListEqual(list(np.ravel(compiled_values)), expected_values)
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
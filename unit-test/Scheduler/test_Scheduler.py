@@ -30,6 +30,7 @@ logger = Logging.setup_logging('financial-simulator')
 ####################################################################################################
 
 import datetime
+import random
 import unittest
 
 ####################################################################################################
@@ -38,6 +39,7 @@ from FinancialSimulator.Scheduler import (SingleAction,
                                           ReccurentAction,
                                           MonthlyAction,
                                           WeeklyAction,
+                                          RandomAction,
                                           Scheduler)
 
 ####################################################################################################
@@ -61,6 +63,52 @@ class TestAccounting(unittest.TestCase):
         for planned_action in scheduler.iter(start_day, stop_day):
             print(planned_action)
 
+    ##############################################
+
+    def test_order(self):
+
+        start_date = datetime.date(2016, 1, 1)
+        stop_date = datetime.date(2016, 3, 31)
+
+        scheduler = Scheduler()
+        scheduler.add_action(MonthlyAction(datetime.date(2016, 1, 15), label='monthly'))
+        scheduler.add_action(SingleAction(datetime.date(2016, 2, 15), label='single'))
+        scheduler.add_action(SingleAction(datetime.date(2017, 1, 1), label='out of range'))
+        scheduler.add_action(WeeklyAction(datetime.date(2016, 1, 29), label='weekly'))
+
+        planned_actions = [(planned_action.date, planned_action.action.label)
+                           for planned_action in scheduler.iter(start_date, stop_date)]
+        self.assertListEqual(planned_actions[:4], [
+            (datetime.date(2016, 1, 15), 'monthly'),
+            (datetime.date(2016, 1, 29), 'weekly'),
+            (datetime.date(2016, 2, 5), 'weekly'),
+            (datetime.date(2016, 2, 12), 'weekly'),
+        ])
+        self.assertIn((datetime.date(2016, 2, 15), 'single'), planned_actions)
+        self.assertEqual(planned_actions.index((datetime.date(2016, 2, 15), 'monthly')) +1,
+                         planned_actions.index((datetime.date(2016, 2, 15), 'single')))
+        dates = [date for date, label in planned_actions]
+        self.assertListEqual(dates, sorted(dates))
+        self.assertEqual(len(planned_actions), 3 + 1 + 9)
+
+    ##############################################
+
+    def test_random_action(self):
+
+        start_date = datetime.date(2016, 1, 1)
+        stop_date = datetime.date(2016, 12, 31)
+
+        def next_dates(seed):
+            action = RandomAction(start_date, mean_period=10, random_generator=random.Random(seed))
+            return list(action.next_dates(start_date, stop_date))
+
+        dates = next_dates(1)
+        self.assertListEqual(dates, next_dates(1))
+        self.assertNotEqual(dates, next_dates(2))
+        self.assertTrue(all(start_date < date <= stop_date for date in dates))
+        self.assertTrue(all(date1 < date2 for date1, date2 in zip(dates, dates[1:])))
+        self.assertTrue(20 < len(dates) < 60)
+
 ####################################################################################################
 
 if __name__ == '__main__':
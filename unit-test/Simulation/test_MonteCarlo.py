@@ -0,0 +1,133 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+import datetime
+import gc
+import os
+import sys
+import unittest
+
+import numpy as np
+
+####################################################################################################
+
+from FinancialSimulator.Accounting import Results
+from FinancialSimulator.Simulator.MonteCarlo import MonteCarloSimulation
+from FinancialSimulator.Simulator.YamlLoader import JournalEntryDefinition
+
+# the fixtures are shared with the accounting tests
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'Accounting'))
+from AccountingFixture import make_account_chart
+
+####################################################################################################
+
+def make_simulation(**kwargs):
+
+    account_chart = make_account_chart()
+
+    transaction_definitions = (
+        JournalEntryDefinition({
+            'journal': 'JV', 'label': 'Vente', 'date': datetime.date(2016, 1, 5),
+            'recurrence': 'aléatoire', 'period': 10,
+            'debit 411': 120, 'credit 706': 100, 'credit 44571': 20,
+        }),
+        JournalEntryDefinition({
+            'journal': 'JA', 'label': 'Loyer', 'date': datetime.date(2016, 1, 1),
+            'recurrence': 'mensuel',
+            'debit 613': 50, 'credit 512': 50,
+        }),
+    )
+
+    return MonteCarloSimulation(account_chart, None,
+                                (('JV', 'Journal des ventes'), ('JA', 'Journal des achats')),
+                                transaction_definitions,
+                                datetime.date(2016, 1, 1), datetime.date(2016, 12, 31),
+                                number_of_samples=4,
+                                **kwargs)
+
+####################################################################################################
+
+class TestMonteCarloSimulation(unittest.TestCase):
+
+    ##############################################
+
+    def test(self):
+
+        simulation = make_simulation(seed=1)
+        self.assertListEqual(simulation.account_numbers, [4, 5, 6, 7, 51, 61, 411, 512, 613, 706, 44571])
+
+        result = simulation.run(8, max_workers=1)
+        self.assertEqual(result.trajectories.shape, (8, 4, 11))
+        # entries are balanced
+        self.assertFalse(result.trajectories[:, :, :4].sum(axis=2).any())
+
+        # without noise the rent is deterministic
+        rent = make_simulation(amount_sigma=0).run(8, max_workers=1).account_trajectories(613)
+        self.assertListEqual(list(rent[:, -1]), [-600.] * 8)
+        # balances are sampled at the end of the day, on April 1st, July 1st, October 1st and December 31st
+        self.assertListEqual(list(rent[0]), [-200., -350., -500., -600.])
+
+        sales = result.account_trajectories(706)
+        self.assertTrue((sales[:, 1:] >= sales[:, :-1]).all())
+        self.assertGreater(sales[:, -1].std(), 0)
+
+        bands = result.account_bands(706, (5, 50, 95))
+        self.assertEqual(bands.shape, (3, 4))
+        self.assertTrue((bands[0] <= bands[1]).all() and (bands[1] <= bands[2]).all())
+
+        # scenarios are reproducible in the worker processes
+        parallel_result = simulation.run(8, max_workers=2)
+        self.assertTrue((parallel_result.trajectories == result.trajectories).all())
+        other_result = make_simulation(seed=2).run(8, max_workers=1)
+        self.assertFalse((other_result.trajectories == result.trajectories).all())
+
+    ##############################################
+
+    def test_result_tables(self):
+
+        yaml_file = 'systeme-base-resultat-tableau.yml'
+        simulation = make_simulation(result_tables=(yaml_file,))
+        result = simulation.run(6, max_workers=1)
+
+        row_titles = result.row_titles[yaml_file]
+        row_values = result.row_values[yaml_file]
+        self.assertEqual(row_values.shape, (6, len(row_titles), 4))
+        self.assertEqual(result.row_bands(yaml_file, (5, 95)).shape, (2, len(row_titles), 4))
+        # the turnover is the balance of the sales
+        turnover = row_values[:, row_titles.index('Production vendue [biens et services] dont à l\'exportation')]
+        self.assertTrue(np.allclose(turnover, result.account_trajectories(706)))
+
+        # the compiled computations of a scenario are released with its account chart
+        for scenario in range(6):
+            simulation.run_scenario(scenario)
+        gc.collect()
+        table, = simulation._load_tables()
+        for column in table:
+            for row in column.node.depth_first_search():
+                if isinstance(row, Results.ValueRow):
+                    self.assertLessEqual(len(row._compiled_computations), 1)
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
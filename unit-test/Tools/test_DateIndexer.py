@@ -26,7 +26,7 @@ import unittest
 ####################################################################################################
 
 from FinancialSimulator.Tools.Date import date_iterator
-from FinancialSimulator.Tools.DateIndexer import DateIndexer
+from FinancialSimulator.Tools.DateIndexer import DateIndexer, OutOfDateError
 
 ####################################################################################################
 
@@ -48,6 +48,8 @@ class DateObj:
 
 class TestDateIndexer(unittest.TestCase):
 
+    ##############################################
+
     def test(self):
 
         start = datetime.date(2016, 1, 1)
@@ -57,13 +59,60 @@ class TestDateIndexer(unittest.TestCase):
         for date in date_iterator(start, stop):
             for i in range(date.day):
                 date_indexer.append(DateObj(date))
-        for date_list in date_indexer:
+        for date_list in date_indexer.date_lists():
             self.assertEqual(len(date_list), date_list.date.day)
 
         # import time
         # for i in range(1000000):
         #     time.sleep(.001)
 
+    ##############################################
+
+    def test_sparse(self):
+
+        date_indexer = DateIndexer()
+        dates = [datetime.date(year, month, day)
+                 for year, month, day in (
+                         (1990, 5, 1),
+                         (2016, 3, 31),
+                         (2016, 1, 15),
+                         (2016, 1, 15),
+                         (2016, 4, 1),
+                         (2040, 12, 31),
+                 )]
+        for date in dates:
+            date_indexer.append(DateObj(date))
+
+        self.assertEqual(len(date_indexer), 5)
+        self.assertEqual(date_indexer.start, datetime.date(1990, 5, 1))
+        self.assertEqual(date_indexer.stop, datetime.date(2040, 12, 31))
+        self.assertEqual([obj.date for obj in date_indexer], sorted(dates))
+        self.assertIsNone(date_indexer[datetime.date(2000, 1, 1)])
+        self.assertEqual(len(date_indexer[datetime.date(2016, 1, 15)]), 2)
+        self.assertEqual(list(date_indexer.iter_on_date(datetime.date(2000, 1, 1))), [])
+
+        self.assertEqual([obj.date for obj in date_indexer[datetime.date(2016, 1, 15):datetime.date(2016, 4, 1)]],
+                         sorted(dates)[1:5])
+        self.assertEqual(len(list(date_indexer.iter_quarter(2016, 1))), 3)
+        self.assertEqual(len(list(date_indexer.iter_quarter(2016, 2))), 1)
+        self.assertEqual(len(list(date_indexer.iter_month(2016, 1))), 2)
+        self.assertEqual(len(list(date_indexer.iter_year(2040))), 1)
+        self.assertEqual(date_indexer.years, [1990, 2016, 2040])
+        self.assertEqual([month_date for month_date, date_lists in date_indexer.monthly_iter()],
+                         [datetime.date(1990, 5, 1), datetime.date(2016, 1, 1), datetime.date(2016, 3, 1),
+                          datetime.date(2016, 4, 1), datetime.date(2040, 12, 1)])
+
+    ##############################################
+
+    def test_bounded(self):
+
+        date_indexer = DateIndexer(datetime.date(2016, 1, 1), datetime.date(2016, 12, 31))
+        date_indexer.append(DateObj(datetime.date(2016, 6, 1)))
+        with self.assertRaises(OutOfDateError):
+            date_indexer.append(DateObj(datetime.date(2017, 1, 1)))
+        with self.assertRaises(OutOfDateError):
+            date_indexer[datetime.date(2015, 1, 1)]
+
 ####################################################################################################
 
 if __name__ == '__main__':
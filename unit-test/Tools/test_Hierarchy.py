@@ -24,7 +24,7 @@ import unittest
 
 ####################################################################################################
 
-from FinancialSimulator.Tools.Hierarchy import Node, Hierarchy
+from FinancialSimulator.Tools.Hierarchy import Node, Hierarchy, NonExistingNodeError
 
 ####################################################################################################
 
@@ -109,6 +109,48 @@ class TestHierarchy(unittest.TestCase):
         ]
         self.assertListEqual(flat_list, flat_list_true)
 
+    ##############################################
+
+    def test_flatten(self):
+
+        node_1 = MyNode(1)
+        node_11 = MyNode(11, parent=node_1)
+        node_111 = MyNode(111, parent=node_11)
+        node_12 = MyNode(12, parent=node_1)
+        node_2 = MyNode(2)
+        node_21 = MyNode(21, parent=node_2)
+
+        hierarchy = Hierarchy()
+        for node in (node_1, node_2):
+            hierarchy.add_node(node)
+        flat_hierarchy = hierarchy.flatten()
+        self.assertIs(hierarchy.flatten(), flat_hierarchy)
+
+        self.assertListEqual(list(flat_hierarchy), [node_1, node_11, node_111, node_12, node_2, node_21])
+        self.assertListEqual(list(flat_hierarchy.parents), [-1, 0, 1, 0, -1, 4])
+        self.assertListEqual(list(flat_hierarchy.ends), [4, 3, 3, 4, 6, 6])
+        self.assertEqual(flat_hierarchy.subtree(11), slice(1, 3))
+        with self.assertRaises(NonExistingNodeError):
+            flat_hierarchy.position(3)
+
+        totals = flat_hierarchy.roll_up([1, 2, 4, 8, 16, 32])
+        self.assertListEqual(list(totals), [15, 6, 4, 8, 48, 32])
+
+        hierarchy.add_node(MyNode(3))
+        self.assertEqual(len(hierarchy.flatten()), 7)
+
+    ##############################################
+
+    def test_range(self):
+
+        hierarchy = Hierarchy()
+        for number in (30, 1, 20, 2, 10):
+            hierarchy.add_node(MyNode(number))
+        self.assertListEqual(hierarchy.hashes_in_range(2, 20), [2, 10, 20])
+        self.assertListEqual(hierarchy.hashes_in_range(3, 9), [])
+        hierarchy.add_node(MyNode(5))
+        self.assertListEqual([repr(node) for node in hierarchy.nodes_in_range(3, 9)], ['Node 5'])
+
 ####################################################################################################
 
 if __name__ == '__main__':
@@ -20,11 +20,12 @@
 
 ####################################################################################################
 
+import threading
 import unittest
 
 ####################################################################################################
 
-from FinancialSimulator.Tools.Observer import Observer, Signal, receiver_decorator
+from FinancialSimulator.Tools.Observer import AsyncDispatcher, Observer, Signal, receiver_decorator
 
 ####################################################################################################
 
@@ -61,6 +62,27 @@ class Receiver:
         print(signal, sender, message)
         return self
 
+class RecordingReceiver:
+
+    ##############################################
+
+    def __init__(self):
+
+        self.messages = []
+        self.batches = []
+
+    ##############################################
+
+    def slot(self, signal, sender, message):
+
+        self.messages.append(message)
+
+    ##############################################
+
+    def batched_slot(self, signal, events):
+
+        self.batches.append([kwargs['message'] for sender, kwargs in events])
+
 ####################################################################################################
 
 class TestSignal(unittest.TestCase):
@@ -86,6 +108,94 @@ class TestSignal(unittest.TestCase):
         del receiver2
         self.assertFalse(emitter.signal.has_listeners())
 
+    ##############################################
+
+    def test_batch(self):
+
+        signal = Signal()
+        sender1 = Emitter()
+        sender2 = Emitter()
+        receiver = RecordingReceiver()
+        signal.connect(receiver.slot)
+        signal.connect(receiver.batched_slot, batched=True)
+        signal.connect(receiver.slot) # already connected
+
+        signal.emit(sender1, message=1)
+        self.assertListEqual(receiver.messages, [1])
+        self.assertListEqual(receiver.batches, [[1]])
+
+        with signal.batch():
+            signal.emit(sender1, message=2)
+            with signal.batch():
+                signal.emit(sender2, message=3)
+            signal.emit(sender1, message=4)
+            self.assertListEqual(receiver.messages, [1])
+        self.assertListEqual(receiver.messages, [1, 2, 3, 4])
+        self.assertListEqual(receiver.batches, [[1], [2, 3, 4]])
+
+        with signal.batch(coalesce=True):
+            signal.emit(sender1, message=5)
+            signal.emit(sender2, message=6)
+            signal.emit(sender1, message=7)
+        self.assertListEqual(receiver.batches[-1], [7, 6])
+
+        signal.disconnect(receiver.slot)
+        signal.disconnect(receiver.batched_slot)
+        self.assertFalse(signal.has_listeners())
+
+    ##############################################
+
+    def test_async(self):
+
+        signal = Signal()
+        dispatcher = AsyncDispatcher(number_of_workers=2, queue_size=4)
+        receiver1 = RecordingReceiver()
+        receiver2 = RecordingReceiver()
+        signal.connect(receiver1.slot, executor=dispatcher)
+        signal.connect(receiver2.batched_slot, batched=True, executor=dispatcher)
+
+        sender = Emitter()
+        self.assertListEqual(signal.send(sender, message=0), [])
+        for i in range(1, 100):
+            signal.emit(sender, message=i)
+        with signal.batch():
+            signal.emit(sender, message=100)
+            signal.emit(sender, message=101)
+        signal.flush()
+        self.assertListEqual(receiver1.messages, list(range(102)))
+        self.assertListEqual(receiver2.batches[-1], [100, 101])
+        self.assertEqual(len(receiver2.batches), 101)
+
+        dispatcher.join()
+        signal.emit(sender, message=102) # restart the workers
+        dispatcher.join()
+        self.assertEqual(receiver1.messages[-1], 102)
+
+    ##############################################
+
+    def test_async_threads(self):
+
+        # the workers are started by concurrent submits
+        dispatcher = AsyncDispatcher(number_of_workers=4)
+        lock = threading.Lock()
+        calls = []
+
+        def call(i):
+            with lock:
+                calls.append(i)
+
+        def submit(start):
+            for i in range(start, start + 100):
+                dispatcher.submit(i, call, i=i)
+
+        threads = [threading.Thread(target=submit, args=(i*100,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        dispatcher.join()
+        self.assertListEqual(sorted(calls), list(range(800)))
+
 ####################################################################################################
 
 if __name__ == '__main__':
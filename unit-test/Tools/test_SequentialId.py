@@ -0,0 +1,121 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+import threading
+import unittest
+
+####################################################################################################
+
+from FinancialSimulator.Tools.SequentialId import SequenceAllocator
+
+####################################################################################################
+
+class MemoryStore:
+
+    def __init__(self):
+        self.marks = {}
+
+    def save_high_water_mark(self, key, value):
+        self.marks[key] = value
+
+####################################################################################################
+
+class TestSequenceAllocator(unittest.TestCase):
+
+    ##############################################
+
+    def test_single_writer(self):
+
+        store = MemoryStore()
+        allocator = SequenceAllocator(block_size=4, store=store, key='JV')
+        self.assertListEqual([allocator.allocate() for i in range(6)], [1, 2, 3, 4, 5, 6])
+        # the blocks are not persisted
+        self.assertNotIn('JV', store.marks)
+        self.assertEqual(allocator.reserve(2), range(7, 9))
+        self.assertEqual(allocator.reserve(3), range(9, 12))
+        self.assertEqual(allocator.allocate(), 12)
+        allocator.release()
+        self.assertEqual(allocator.high_water_mark, 12)
+        # the committed mark is persisted
+        self.assertEqual(allocator.commit(2), range(13, 15))
+        self.assertEqual(store.marks['JV'], 14)
+        allocator.cancel(range(13, 15))
+        self.assertEqual(store.marks['JV'], 12)
+
+        # restart from the persisted mark
+        allocator = SequenceAllocator(store.marks['JV'], block_size=4)
+        self.assertEqual(allocator.allocate(), 13)
+        # the block 13-16 is dropped
+        allocator.advance_to(14)
+        self.assertEqual(allocator.allocate(), 17)
+
+    ##############################################
+
+    def test_threads(self):
+
+        allocator = SequenceAllocator(block_size=16)
+        results = []
+
+        def writer():
+            numbers = [allocator.allocate() for i in range(1000)]
+            allocator.release()
+            results.append(numbers)
+
+        threads = [threading.Thread(target=writer) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for numbers in results:
+            self.assertListEqual(numbers, sorted(numbers))
+        numbers = [number for numbers in results for number in numbers]
+        self.assertEqual(len(set(numbers)), 4000)
+        self.assertGreaterEqual(allocator.high_water_mark, 4000)
+
+    ##############################################
+
+    def test_commit(self):
+
+        allocator = SequenceAllocator()
+        lock = threading.Lock()
+        committed = []
+
+        def writer():
+            for i in range(500):
+                with lock:
+                    committed.extend(allocator.commit(1 + i % 3))
+
+        threads = [threading.Thread(target=writer) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # gap-free and in commit order
+        self.assertListEqual(committed, list(range(1, len(committed) +1)))
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,98 @@
+####################################################################################################
+#
+# pyFinancialSimulator - A Financial Simulator
+# Copyright (C) 2015 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+####################################################################################################
+####################################################################################################
+
+from decimal import Decimal
+from fractions import Fraction
+import unittest
+
+####################################################################################################
+
+from FinancialSimulator.Units import AmountValue, Money, to_money
+
+####################################################################################################
+
+class TestMoney(unittest.TestCase):
+
+    def test(self):
+
+        amount = Money.from_value(120.1)
+        self.assertEqual(amount.minor_units, 12010)
+        # a number is rounded to minor units as by to_money
+        self.assertEqual(amount, 120.1)
+        self.assertEqual(to_money(120.1), 120.1)
+        self.assertEqual(float(amount), 120.1)
+        self.assertEqual(amount, Fraction(1201, 10))
+        self.assertEqual(amount, Decimal('120.1'))
+        self.assertNotEqual(amount, 120.2)
+        self.assertTrue(amount < 120.2 and amount <= 120.1 and amount > 120)
+        self.assertEqual(len({amount, 120.1}), 1)
+        self.assertEqual(hash(Money(250)), hash(2.5))
+        self.assertEqual(hash(Money(200)), hash(2))
+        with self.assertRaises(TypeError):
+            amount < 'a'
+        self.assertEqual(str(amount), '120.10')
+        self.assertEqual(Money.from_value('0,285').minor_units, 29)
+        self.assertEqual(Money.from_value(0.285).minor_units, 29)
+
+        # exact sums
+        self.assertEqual(sum([Money.from_value(0.1)]*3), Money.from_value(0.3))
+        self.assertEqual(sum([Money.from_value(0.1)]*10), 1)
+
+        self.assertEqual(str(-amount), '-120.10')
+        self.assertTrue(-amount < 0)
+        self.assertEqual(amount * 1.2, Money(14412))
+
+        # mixed arithmetic
+        self.assertEqual(amount * Fraction(1, 3), Money(4003))
+        self.assertEqual(Money(1) * Fraction(1, 2), Money(1))
+        self.assertEqual(Money(-1) * Fraction(1, 2), Money(-1))
+        self.assertEqual(amount * Decimal('0.5'), Money(6005))
+        self.assertEqual(amount + 0.1, Money(12020))
+        self.assertEqual(0.1 + amount, Money(12020))
+        self.assertEqual(amount - Fraction(1, 10), Money(12000))
+        self.assertEqual(200 - amount, Money(7990))
+        self.assertEqual(Money.from_value(Fraction(1, 3)), Money(33))
+        self.assertFalse(Money(0))
+
+        with self.assertRaises(ValueError):
+            Money(1, '€') + Money(1, 'USD')
+
+####################################################################################################
+
+class TestAmountValue(unittest.TestCase):
+
+    def test(self):
+
+        amount = AmountValue('€', 100, 20, is_inclusive=True)
+        self.assertEqual(float(amount), 100)
+        self.assertEqual(to_money(amount.ht), Money(8333))
+        self.assertEqual(to_money(amount.tva), Money(1667))
+
+        amount = AmountValue('€', 100, 20, is_inclusive=False)
+        self.assertEqual(to_money(amount.ttc), 120)
+
+####################################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()